@@ -0,0 +1,41 @@
+# backend/analysis_cache.py
+"""
+Analysis Cache
+Persists AI reports keyed by document content so re-uploads of the same
+file skip PDF extraction and the Groq call entirely
+"""
+
+import json
+from typing import Dict, Optional
+
+from sqlite_cache import SQLiteCache
+
+
+class AnalysisCache(SQLiteCache):
+    """AI reports keyed by (document hash, document type, prompt version)"""
+
+    def __init__(self, db_path: str, max_entries: int = 5000, ttl: int = 30 * 24 * 3600):
+        super().__init__(
+            db_path,
+            table="analysis_cache",
+            key_columns=("document_hash", "document_type", "prompt_version"),
+            value_column="report",
+            max_entries=max_entries,
+            ttl=ttl,
+            name="Analysis cache"
+        )
+
+    def get(self, document_hash: str, document_type: str, prompt_version: str) -> Optional[Dict]:
+        """Return the cached report or None on a miss / expired entry"""
+        report = self._get((document_hash, document_type, prompt_version))
+        return json.loads(report) if report is not None else None
+
+    def put(self, document_hash: str, document_type: str, prompt_version: str, report: Dict):
+        self._put((document_hash, document_type, prompt_version), json.dumps(report))
+
+    def stats(self) -> Dict:
+        stats = super().stats()
+        # /analysis/cache-status has always used these names
+        stats["cacheSize"] = stats.pop("size")
+        stats["cacheTTL"] = stats.pop("ttl")
+        return {"enabled": True, **stats}
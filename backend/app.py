@@ -1,22 +1,35 @@
 # backend/app.py - FOCUSED DOCUMENT ANALYSIS BY TYPE
-from flask import Flask, request, jsonify
+from flask import Flask, request, jsonify, Response, g
 from dotenv import load_dotenv
 import os
 import json
 from flask_cors import CORS
 import pypdf
-import requests
-import io
+import zipfile
+import numpy as np
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
 import re
-from pypdf import PdfReader # ✅ Specific import needed for extraction logic
-from groq_service import GroqService # ✅ Import GroqService
+from pdf_extraction import DocumentTooLargeError, SpooledDocument, extract_document_text, get_process_pool
+from groq_service import GroqService, is_partial_report, parse_report # ✅ Import GroqService
+from groq_pool import GroqRateLimitedError, GroqUnavailableError
 from oracle_service import OracleService
 from web3 import Web3
 from contract_info import ARIAMARKETPLACE_ADDRESS, ARIAMARKETPLACE_ABI, ORACLE_ADDRESS
 # Import our blockchain service and QIEDEX service
 from blockchain_service import BlockchainService
 from qiedex_service import QIEDEXService
+from job_service import JobManager
+from analysis_cache import AnalysisCache
+from web3_provider import Web3Registry
+from marketplace_reads import MarketplaceReader
+from marketplace_indexer import MarketplaceIndexer
+from currency_rates import to_json_list
+from price_stream import PriceStream, StreamFullError
+from ipfs_client import PinQueueFullError, create_pinata_client
+from stage_graph import StageGraph
+from metrics import REGISTRY, gauge, histogram
+import threading
 import time
 
 # --- CONFIGURATION LOADING ---
@@ -31,14 +44,12 @@ else:
 app = Flask(__name__)
 CORS(app)
 
-import random
-
 # --- API KEY CONFIGURATION ---
-# Support multiple keys for rotation to avoid rate limits
-GEMINI_API_KEYS = []
-# PINATA API keys are still needed
-PINATA_API_KEY = os.getenv("PINATA_API_KEY")
-PINATA_SECRET_API_KEY = os.getenv("PINATA_SECRET_API_KEY")
+# Groq key rotation lives in GroqService (set GROQ_API_KEYS=key1,key2,...)
+# Pinata keys are read by the IPFS client (PINATA_API_KEY, PINATA_SECRET_API_KEY),
+# which skips the upload for metadata already in its pin index (PIN_INDEX_PATH)
+ipfs_client = create_pinata_client()
+IPFS_PIN_TIMEOUT = float(os.getenv("IPFS_PIN_TIMEOUT", "120"))
 
 # ✅ NEW: Initialize Groq instead of Gemini
 try:
@@ -51,6 +62,104 @@ except Exception as e:
     print(f"❌ Failed to initialize Groq: {e}")
     groq_service = None
 
+# Background workers for the async /analyze_and_mint/jobs API
+job_manager = JobManager(
+    max_workers=int(os.getenv("ANALYSIS_WORKERS", "4")),
+    job_ttl=int(os.getenv("ANALYSIS_JOB_TTL", "3600"))
+)
+
+# Persistent cache of AI reports keyed by document hash + type + prompt version
+analysis_cache = AnalysisCache(
+    os.getenv("ANALYSIS_CACHE_PATH", os.path.join(os.path.dirname(__file__), "analysis_cache.db")),
+    max_entries=int(os.getenv("ANALYSIS_CACHE_MAX_ENTRIES", "5000")),
+    ttl=int(os.getenv("ANALYSIS_CACHE_TTL", str(30 * 24 * 3600)))
+)
+
+# Local index of marketplace listings, built from AriaMarketplace events
+marketplace_index = MarketplaceIndexer(
+    os.getenv("MARKETPLACE_INDEX_PATH", os.path.join(os.path.dirname(__file__), "marketplace_index.db")),
+    MarketplaceReader.get_marketplace(),
+    # Unset: found from the contract's deployment block on first sync
+    start_block=int(os.getenv("MARKETPLACE_INDEX_START_BLOCK")) if os.getenv("MARKETPLACE_INDEX_START_BLOCK") else None,
+    confirmations=int(os.getenv("MARKETPLACE_INDEX_CONFIRMATIONS", "2")),
+    block_range=int(os.getenv("MARKETPLACE_INDEX_BLOCK_RANGE", "2000")),
+    poll_interval=float(os.getenv("MARKETPLACE_INDEX_POLL_INTERVAL", "5"))
+)
+indexer_enabled = os.getenv("MARKETPLACE_INDEXER_ENABLED", "true").lower() == "true"
+
+# Pushes feed changes to /oracle/stream subscribers instead of per-client polling
+price_stream = PriceStream(
+    listing_prices=MarketplaceReader.get_live_prices,
+    listing_version=(lambda: marketplace_index.version) if indexer_enabled else None,
+    max_clients=int(os.getenv("PRICE_STREAM_MAX_CLIENTS", "500")),
+    max_tokens_per_client=int(os.getenv("PRICE_STREAM_MAX_TOKENS", "5000")),
+    listing_chunk=int(os.getenv("PRICE_STREAM_LISTING_CHUNK", "100"))
+)
+
+_background_started = False
+_background_lock = threading.Lock()
+
+def start_background_services():
+    """
+    Start the marketplace indexer, RPC health checks and oracle feed.
+
+    Called at the bottom of this module, so any WSGI server that imports
+    it (gunicorn included) gets them. Safe to call more than once.
+    """
+    global _background_started
+    with _background_lock:
+        if _background_started:
+            return
+        _background_started = True
+
+    if indexer_enabled:
+        marketplace_index.start()
+
+    # Probe RPC endpoints on a timer; requests skip endpoints whose circuit is open
+    Web3Registry.start_health_checks()
+
+    # Keep oracle prices in memory so price endpoints never wait on the RPC
+    if os.getenv("ORACLE_FEED_ENABLED", "true").lower() == "true":
+        OracleService.start_feed()
+
+    if OracleService.feed:
+        OracleService.feed.add_listener(price_stream.on_snapshot)
+        if OracleService.feed.snapshot:
+            price_stream.on_snapshot(OracleService.feed.snapshot)
+
+# --- METRICS (scraped from /metrics) ---
+HTTP_REQUEST_SECONDS = histogram(
+    "aria_http_request_seconds", "Request handling time by route", ["method", "route", "status"]
+)
+PIPELINE_STAGE_SECONDS = histogram(
+    "aria_pipeline_stage_seconds", "analyze_and_mint stage durations", ["pipeline", "stage"]
+)
+QUEUE_DEPTH = gauge("aria_queue_depth", "Work waiting or in progress", ["queue", "state"])
+QUEUE_DEPTH.set_function(lambda: BlockchainService.mint_queue.stats()["queued"], queue="mint", state="queued")
+QUEUE_DEPTH.set_function(lambda: BlockchainService.mint_queue.stats()["pending"], queue="mint", state="pending")
+QUEUE_DEPTH.set_function(lambda: job_manager.stats()["queued"], queue="jobs", state="queued")
+QUEUE_DEPTH.set_function(lambda: job_manager.stats()["running"], queue="jobs", state="running")
+QUEUE_DEPTH.set_function(lambda: ipfs_client.stats()["inFlight"], queue="ipfs", state="pending")
+gauge("aria_price_stream_clients", "Connected /oracle/stream clients").set_function(
+    lambda: price_stream.stats()["clients"]
+)
+
+@app.before_request
+def start_request_timer():
+    g.request_started = time.perf_counter()
+
+@app.after_request
+def record_request_time(response):
+    started = getattr(g, "request_started", None)
+    if started is not None:
+        HTTP_REQUEST_SECONDS.observe(
+            time.perf_counter() - started,
+            method=request.method,
+            route=request.url_rule.rule if request.url_rule else "unmatched",
+            status=response.status_code
+        )
+    return response
+
 # --- DOCUMENT TYPE DEFINITIONS WITH FOCUSED ANALYSIS ---
 DOCUMENT_TYPES = {
     "invoice": {
@@ -113,42 +222,19 @@ DOCUMENT_TYPES = {
 
 def upload_to_ipfs(json_data: dict) -> tuple:
     """Upload JSON metadata to IPFS via Pinata and return (full_url, hash_only)"""
-    if not PINATA_API_KEY or not PINATA_SECRET_API_KEY:
-        raise Exception("Pinata API keys not set in .env")
-    
-    headers = {
-        "Content-Type": "application/json",
-        "pinata_api_key": PINATA_API_KEY,
-        "pinata_secret_api_key": PINATA_SECRET_API_KEY
-    }
-    
-    body = {
-        "pinataContent": json_data,
-        "pinataMetadata": {
-            "name": json_data.get("name", "rwa_metadata.json")
-        }
-    }
-    
-    response = requests.post(
-        "https://api.pinata.cloud/pinning/pinJSONToIPFS",
-        json=body,
-        headers=headers
-    )
-    response.raise_for_status()
-    
-    ipfs_hash_only = response.json().get("IpfsHash")
-    if not ipfs_hash_only:
-        raise Exception("Failed to get IPFS hash from Pinata response")
-    
-    return (f"https://gateway.pinata.cloud/ipfs/{ipfs_hash_only}", ipfs_hash_only)
+    return ipfs_client.pin_json(json_data, timeout=IPFS_PIN_TIMEOUT)
 
 # QR Code Logic Removed for Render Compatibility
-def find_and_decode_qr(image_bytes, mime_type):
+def find_and_decode_qr(document, mime_type):
     """(Disabled) Placeholder for QR Code Scanning"""
     return None
 
 # ✅ LOCAL FALLBACK REMOVED AS REQUESTED
 
+# Bump whenever the prompt template below changes so cached reports
+# produced by the old prompt are no longer served
+PROMPT_VERSION = "1"
+
 def generate_focused_prompt(doc_type: str) -> str:
     """Generate AI prompt focused on specific document type"""
     
@@ -227,195 +313,775 @@ CRITICAL: Return ONLY valid JSON. No markdown, no explanations, just the JSON ob
     
     return prompt
 
-@app.route('/analyze_and_mint', methods=['POST'])
-def analyze_and_mint():
-    """Analyze document with focused AI analysis based on selected type"""
-    
-    # Validate request
+class AnalysisError(Exception):
+    """Pipeline failure carrying the HTTP status the route should return"""
+
+    def __init__(self, message: str, status_code: int = 500, details: str = None, retry_after: float = None):
+        super().__init__(message)
+        self.message = message
+        self.status_code = status_code
+        self.details = details
+        self.retry_after = retry_after
+
+    def to_dict(self) -> dict:
+        error = {"error": self.message}
+        if self.details:
+            error["details"] = self.details
+        if self.retry_after is not None:
+            error["retryAfter"] = round(self.retry_after, 1)
+        return error
+
+    def to_response(self):
+        response = jsonify(self.to_dict())
+        response.status_code = self.status_code
+        if self.retry_after is not None:
+            response.headers["Retry-After"] = str(max(1, int(self.retry_after + 0.999)))
+        return response
+
+
+def validate_analyze_request():
+    """
+    Validate an /analyze_and_mint style upload.
+
+    Returns (params, None) on success or (None, error_response) on failure.
+    The upload is spooled to a temp file here because the request stream is
+    closed once the request ends; the caller must close params["document"].
+    """
     if 'document' not in request.files:
-        return jsonify({"error": "No document part"}), 400
+        return None, (jsonify({"error": "No document part"}), 400)
     
     document_file = request.files['document']
     recipient_address = request.form.get("owner_address")
     document_type = request.form.get("document_type", "invoice")  # Get selected type
     
     if document_file.filename == '':
-        return jsonify({"error": "No selected document"}), 400
+        return None, (jsonify({"error": "No selected document"}), 400)
     
     if not recipient_address:
-        return jsonify({"error": "No owner_address provided"}), 400
+        return None, (jsonify({"error": "No owner_address provided"}), 400)
     
     if document_type not in DOCUMENT_TYPES:
-        return jsonify({"error": f"Invalid document type: {document_type}"}), 400
-    
+        return None, (jsonify({"error": f"Invalid document type: {document_type}"}), 400)
+
     try:
-        # Read document bytes
-        document_bytes = document_file.read()
+        document = SpooledDocument.from_stream(document_file.stream)
+    except DocumentTooLargeError as e:
+        return None, (jsonify({"error": str(e)}), 413)
 
-        # EXTRACT TEXT FROM PDF (Since we are using Text-Based Llama 3.3)
-        extracted_text = ""
-        try:
-            # Check content type or filename
-            if "pdf" in document_file.content_type.lower() or document_file.filename.lower().endswith('.pdf'):
-                pdf_file = io.BytesIO(document_bytes)
-                reader = PdfReader(pdf_file)
-                for page in reader.pages:
-                    text_content = page.extract_text()
-                    if text_content:
-                        extracted_text += text_content + "\n"
-            else:
-                # Fallback implementation or warning for non-PDFs
-                # For images, we can't extract text without OCR libraries like Tesseract
-                # But for the demo, we assume PDFs.
-                extracted_text = "Non-PDF document provided. Analysis limited."
-                
-            if len(extracted_text) < 5:
-                # If extraction fails or is empty
-                extracted_text = "No machine-readable text found in document."
-                
-        except Exception as e:
-            app.logger.error(f"Text extraction failed: {e}")
-            extracted_text = "Error extracting text from document."
+    return {
+        "document": document,
+        "filename": document_file.filename,
+        "content_type": document_file.content_type or "",
+        "document_type": document_type,
+        "recipient_address": recipient_address
+    }, None
 
-        # Get document info
-        doc_info = DOCUMENT_TYPES[document_type]
-        
-        # Generate focused AI prompt
-        prompt = generate_focused_prompt(document_type)
-        
-        app.logger.info(f"Analyzing {doc_info['name']}: {document_file.filename} using Llama 3.3")
-        
-        # Check Groq service
-        if not groq_service or not groq_service.client:
-             return jsonify({"error": "Groq Service unavailable"}), 503
-        else:
-            try:
-                # ✅ NEW: Analyze Text with Llama 3.3
-                response_text = groq_service.analyze_text(
-                    text_content=extracted_text,
-                    prompt=prompt
-                )
-                
-                # Parse AI response
-                response_text = response_text.strip()
-                response_text = response_text.replace("```json", "").replace("```", "").strip()
-                ai_report_json = json.loads(response_text)
-                
-                ai_report_json["ai_model"] = "Llama 3.3 70B (Groq)"
 
-            except Exception as e:
-                app.logger.error(f"Groq Analysis Failed: {e}")
-                return jsonify({"error": f"AI Analysis Failed: {str(e)}"}), 500
+def analyze_extracted_text(extracted_text: str, filename: str, document_type: str,
+                           report_stage=None, report_partial=None) -> dict:
+    """
+    Run the focused Groq analysis on already-extracted text.
+
+    When report_partial is given the completion is streamed and it is called
+    with each report field (e.g. authenticity_score) as soon as it parses.
+    """
+    doc_info = DOCUMENT_TYPES[document_type]
+
+    # Generate focused AI prompt
+    prompt = generate_focused_prompt(document_type)
+    
+    app.logger.info(f"Analyzing {doc_info['name']}: {filename} using Llama 3.3")
+    
+    # Check Groq service
+    if not groq_service or not groq_service.client:
+        raise AnalysisError("Groq Service unavailable", 503)
 
+    if report_stage:
+        report_stage("analyzing")
+    try:
+        # ✅ NEW: Analyze Text with Llama 3.3
+        response_text = groq_service.analyze_text(
+            text_content=extracted_text,
+            prompt=prompt,
+            on_partial=report_partial
+        )
         
-        # Ensure document_type is set correctly
-        ai_report_json["document_type"] = document_type
+        # Parse AI response
+        ai_report_json = parse_report(response_text)
         
-        # Post-process suspicious elements to remove false positives about past dates
-        if "suspicious_elements" in ai_report_json:
-            suspicious = ai_report_json["suspicious_elements"]
-            if isinstance(suspicious, list):
-                # Filter out any mentions of dates being "in the future" if they're actually in the past
-                filtered_suspicious = []
-                for item in suspicious:
-                    if isinstance(item, str):
-                        # Skip if it mentions future dates for dates that are clearly past
-                        lower_item = item.lower()
-                        if "future" in lower_item or "after" in lower_item:
-                            # Check if it mentions a date
-                            import re
-                            # Look for dates in various formats
-                            date_patterns = [
-                                r'\d{2}\.\d{2}\.\d{4}',  # DD.MM.YYYY
-                                r'\d{4}-\d{2}-\d{2}',    # YYYY-MM-DD
-                                r'\d{2}/\d{2}/\d{4}',    # MM/DD/YYYY
-                            ]
-                            
-                            has_date = any(re.search(pattern, item) for pattern in date_patterns)
-                            if has_date:
-                                # Extract year from the suspicious element
-                                year_match = re.search(r'20\d{2}', item)
-                                if year_match:
-                                    doc_year = int(year_match.group())
-                                    current_year = datetime.now().year
-                                    # Only keep if document year is genuinely in the future
-                                    if doc_year > current_year:
-                                        filtered_suspicious.append(item)
-                                    # Skip if document year is current or past
-                                    continue
+        ai_report_json["ai_model"] = "Llama 3.3 70B (Groq)"
+
+    except GroqRateLimitedError as e:
+        app.logger.error(f"Groq rate limited: {e}")
+        raise AnalysisError("AI service is busy, please retry shortly", 429, details=str(e), retry_after=e.retry_after)
+
+    except GroqUnavailableError as e:
+        app.logger.error(f"Groq unavailable: {e}")
+        raise AnalysisError("AI service is unavailable, please try again later", 502, details=str(e))
+
+    except Exception as e:
+        app.logger.error(f"Groq Analysis Failed: {e}")
+        raise AnalysisError(f"AI Analysis Failed: {str(e)}", 500)
+
+    return ai_report_json
+
+def cache_report(document_hash: str, document_type: str, ai_report_json: dict):
+    """Store a report for identical re-uploads; partial (chunk-dropping) reports are not reused"""
+    if is_partial_report(ai_report_json):
+        app.logger.warning(f"Not caching partial analysis ({ai_report_json.get('chunks_analyzed')}"
+                           f" of {ai_report_json.get('chunks_total')} chunks)")
+        return
+    analysis_cache.put(document_hash, document_type, PROMPT_VERSION, ai_report_json)
+
+def finalize_report(ai_report_json: dict, document_type: str, document: SpooledDocument, content_type: str) -> dict:
+    """Post-process the AI report and stamp verification details onto it"""
+    # Ensure document_type is set correctly
+    ai_report_json["document_type"] = document_type
+    
+    # Post-process suspicious elements to remove false positives about past dates
+    if "suspicious_elements" in ai_report_json:
+        suspicious = ai_report_json["suspicious_elements"]
+        if isinstance(suspicious, list):
+            # Filter out any mentions of dates being "in the future" if they're actually in the past
+            filtered_suspicious = []
+            for item in suspicious:
+                if isinstance(item, str):
+                    # Skip if it mentions future dates for dates that are clearly past
+                    lower_item = item.lower()
+                    if "future" in lower_item or "after" in lower_item:
+                        # Look for dates in various formats
+                        date_patterns = [
+                            r'\d{2}\.\d{2}\.\d{4}',  # DD.MM.YYYY
+                            r'\d{4}-\d{2}-\d{2}',    # YYYY-MM-DD
+                            r'\d{2}/\d{2}/\d{4}',    # MM/DD/YYYY
+                        ]
                         
-                        # Keep all other suspicious elements
-                        filtered_suspicious.append(item)
-                
-                ai_report_json["suspicious_elements"] = filtered_suspicious
-        
-        # QR Code verification
-        qr_content = find_and_decode_qr(document_bytes, document_file.content_type)
-        verification_method = "AI Analysis Only"
-        if qr_content:
-            verification_method = "✅ QR Code + AI Verified"
-            app.logger.info(f"QR Code found: {qr_content}")
-            ai_report_json["qr_code_content"] = qr_content
-            # Boost authenticity score if QR code is present
-            if "authenticity_score" in ai_report_json:
-                ai_report_json["authenticity_score"] = min(100, ai_report_json["authenticity_score"] + 10)
-        
-        ai_report_json["verification_method"] = verification_method
-        ai_report_json["verified_at"] = datetime.utcnow().isoformat()
-        
-        # Prepare enhanced NFT metadata
-        nft_metadata = {
-            "name": f"{doc_info['icon']} {doc_info['name']}: {document_file.filename}",
-            "description": f"AI-verified {doc_info['name']} tokenized as RWA NFT with comprehensive verification report",
-            "image": "https://gateway.pinata.cloud/ipfs/Qma5Fpw3Y2jL6vAacgEAA418f2f2KJEaJkkhq2tYmS3a1V",
-            "attributes": [
-                {"trait_type": "Document Type", "value": doc_info['name']},
-                {"trait_type": "Verification Method", "value": verification_method},
-                {"trait_type": "Authenticity Score", "value": str(ai_report_json.get("authenticity_score", 0))},
-                {"trait_type": "Confidence", "value": str(ai_report_json.get("confidence", 0))},
-                {"trait_type": "Verified Date", "value": datetime.utcnow().strftime("%Y-%m-%d")}
-            ],
-            "properties": {
-                "ai_report": ai_report_json,
-                "document_category": document_type,
-                "verification_platform": "A.R.I.A. on QIE Blockchain",
-                "ai_model": "Gemini 2.5 Pro"
-            }
+                        has_date = any(re.search(pattern, item) for pattern in date_patterns)
+                        if has_date:
+                            # Extract year from the suspicious element
+                            year_match = re.search(r'20\d{2}', item)
+                            if year_match:
+                                doc_year = int(year_match.group())
+                                current_year = datetime.now().year
+                                # Only keep if document year is genuinely in the future
+                                if doc_year > current_year:
+                                    filtered_suspicious.append(item)
+                                # Skip if document year is current or past
+                                continue
+                    
+                    # Keep all other suspicious elements
+                    filtered_suspicious.append(item)
+            
+            ai_report_json["suspicious_elements"] = filtered_suspicious
+    
+    # QR Code verification
+    qr_content = find_and_decode_qr(document, content_type)
+    verification_method = "AI Analysis Only"
+    if qr_content:
+        verification_method = "✅ QR Code + AI Verified"
+        app.logger.info(f"QR Code found: {qr_content}")
+        ai_report_json["qr_code_content"] = qr_content
+        # Boost authenticity score if QR code is present
+        if "authenticity_score" in ai_report_json:
+            ai_report_json["authenticity_score"] = min(100, ai_report_json["authenticity_score"] + 10)
+    
+    ai_report_json["verification_method"] = verification_method
+    ai_report_json["verified_at"] = datetime.utcnow().isoformat()
+    return ai_report_json
+
+def build_nft_metadata(ai_report_json: dict, document_type: str, filename: str) -> dict:
+    """Prepare enhanced NFT metadata for IPFS"""
+    doc_info = DOCUMENT_TYPES[document_type]
+    verification_method = ai_report_json.get("verification_method", "AI Analysis Only")
+    return {
+        "name": f"{doc_info['icon']} {doc_info['name']}: {filename}",
+        "description": f"AI-verified {doc_info['name']} tokenized as RWA NFT with comprehensive verification report",
+        "image": "https://gateway.pinata.cloud/ipfs/Qma5Fpw3Y2jL6vAacgEAA418f2f2KJEaJkkhq2tYmS3a1V",
+        "attributes": [
+            {"trait_type": "Document Type", "value": doc_info['name']},
+            {"trait_type": "Verification Method", "value": verification_method},
+            {"trait_type": "Authenticity Score", "value": str(ai_report_json.get("authenticity_score", 0))},
+            {"trait_type": "Confidence", "value": str(ai_report_json.get("confidence", 0))},
+            {"trait_type": "Verified Date", "value": datetime.utcnow().strftime("%Y-%m-%d")}
+        ] + ([
+            {"trait_type": "Analysis Coverage",
+             "value": f"{ai_report_json.get('chunks_analyzed')}/{ai_report_json.get('chunks_total')} chunks"}
+        ] if is_partial_report(ai_report_json) else []),
+        "properties": {
+            "ai_report": ai_report_json,
+            "document_category": document_type,
+            "verification_platform": "A.R.I.A. on QIE Blockchain",
+            "ai_model": "Gemini 2.5 Pro"
         }
-        
-        # Upload to IPFS
+    }
+
+def build_mint_result(document_type: str, tx_hash: str, ai_report_json: dict, ipfs_url: str, cached: bool) -> dict:
+    doc_info = DOCUMENT_TYPES[document_type]
+
+    # Ensure tx_hash has 0x prefix
+    if not tx_hash.startswith('0x'):
+        tx_hash = '0x' + tx_hash
+
+    return {
+        "success": True,
+        "txId": tx_hash,
+        "document_type": document_type,
+        "document_icon": doc_info['icon'],
+        "document_name": doc_info['name'],
+        "ai_report_display": ai_report_json,
+        "ipfs_link": ipfs_url,
+        "analysis_cached": cached
+    }
+
+# Stage threads for run_analyze_and_mint; shared by every request and job
+PIPELINE_WORKERS = int(os.getenv("PIPELINE_WORKERS", "32"))
+pipeline_pool = ThreadPoolExecutor(max_workers=PIPELINE_WORKERS, thread_name_prefix="pipeline")
+
+def run_analyze_and_mint(document: SpooledDocument, filename: str, content_type: str,
+                         document_type: str, recipient_address: str,
+                         report_stage=None, report_partial=None) -> dict:
+    """
+    Run the full extraction -> AI analysis -> IPFS -> mint pipeline.
+
+    The stages run as a graph: mint preparation (nonce, fee data, gas
+    estimate) overlaps extraction and the Groq call, and the mint goes
+    out against the locally computed CID while Pinata stores the
+    metadata. Per-stage timings are returned in stageSeconds.
+
+    report_stage(name) is called as each stage starts and report_partial
+    (fields) as AI report fields stream in, so async jobs can surface
+    progress. Raises AnalysisError on failure.
+    """
+    # Get document info
+    doc_info = DOCUMENT_TYPES[document_type]
+
+    # Identical uploads of the same type reuse the stored AI report
+    document_hash = document.sha256
+    cached_report = analysis_cache.get(document_hash, document_type, PROMPT_VERSION)
+    if cached_report is not None:
+        app.logger.info(f"Analysis cache hit for {filename} ({document_hash[:12]})")
+
+    def extract(results):
+        if cached_report is not None:
+            return None
+        # EXTRACT TEXT FROM PDF (Since we are using Text-Based Llama 3.3)
+        return extract_document_text(document, filename, content_type)
+
+    def analyze(results):
+        if cached_report is not None:
+            return cached_report
+        ai_report_json = analyze_extracted_text(results["extracting"], filename, document_type, None, report_partial)
+        cache_report(document_hash, document_type, ai_report_json)
+        return ai_report_json
+
+    def pin(results):
+        ai_report_json = finalize_report(results["analyzing"], document_type, document, content_type)
+        nft_metadata = build_nft_metadata(ai_report_json, document_type, filename)
+        # Upload to IPFS. The CID is computed locally, so the mint goes out
+        # while Pinata is still storing the content
         app.logger.info("Uploading metadata to IPFS...")
-        ipfs_url, ipfs_hash_only = upload_to_ipfs(nft_metadata)
-        app.logger.info(f"IPFS upload successful: {ipfs_hash_only}")
-        
+        try:
+            ticket = ipfs_client.submit(nft_metadata)
+        except PinQueueFullError as e:
+            raise AnalysisError("IPFS pinning is busy, please retry shortly", 503, details=str(e), retry_after=5)
+        return {"report": ai_report_json, "ticket": ticket, "cid": ticket.cid or ticket.result(timeout=IPFS_PIN_TIMEOUT)}
+
+    def mint(results):
         # Mint NFT on blockchain
         app.logger.info(f"Minting {doc_info['name']} NFT for {recipient_address}")
-        tx_hash = BlockchainService.mint_nft(recipient_address, ipfs_hash_only)
+        tx_hash = BlockchainService.mint_nft(recipient_address, results["pinning"]["cid"])
         app.logger.info(f"Minting successful! Tx Hash: {tx_hash}")
-        
-        # Ensure tx_hash has 0x prefix
-        if not tx_hash.startswith('0x'):
-            tx_hash = '0x' + tx_hash
-        
-        return jsonify({
-            "success": True,
-            "txId": tx_hash,
-            "document_type": document_type,
-            "document_icon": doc_info['icon'],
-            "document_name": doc_info['name'],
-            "ai_report_display": ai_report_json,
-            "ipfs_link": ipfs_url
-        }), 200
-        
-    except json.JSONDecodeError as e:
-        app.logger.error(f"Failed to parse AI response as JSON: {e}", exc_info=True)
-        app.logger.error(f"AI Response was: {response_text}")
-        return jsonify({"error": "AI returned invalid JSON response", "details": str(e)}), 500
+        return tx_hash
+
+    def confirm_pin(results):
+        # Don't report success until the token's metadata is actually pinned
+        pinning = results["pinning"]
+        try:
+            cid = pinning["ticket"].result(timeout=IPFS_PIN_TIMEOUT)
+        except Exception as e:
+            raise AnalysisError("IPFS pinning failed after the mint was sent", 502,
+                                details=f"txId {results['minting']}, cid {pinning['cid']}: {e}")
+        app.logger.info(f"IPFS upload successful: {cid}")
+        return cid
+
+    analysis_needed = cached_report is None
+    graph = StageGraph(report_stage)
+    graph.add("extracting", extract, report=analysis_needed)
+    graph.add("preparing", lambda results: BlockchainService.prepare_mint(recipient_address), report=False)
+    graph.add("analyzing", analyze, ["extracting"], report=analysis_needed)
+    graph.add("pinning", pin, ["analyzing"])
+    graph.add("minting", mint, ["pinning", "preparing"])
+    graph.add("pinned", confirm_pin, ["pinning", "minting"], report=False)
+    results = graph.run(pipeline_pool)
+    app.logger.info(f"Pipeline stages for {filename}: {graph.stage_seconds()}")
+
+    mint_result = build_mint_result(
+        document_type, results["minting"], results["pinning"]["report"],
+        ipfs_client.gateway_link(results["pinned"]), not analysis_needed
+    )
+    mint_result["stageSeconds"] = graph.stage_seconds()
+    for stage, seconds in mint_result["stageSeconds"].items():
+        PIPELINE_STAGE_SECONDS.observe(seconds, pipeline="single", stage=stage)
+    return mint_result
+
+@app.route('/analyze_and_mint', methods=['POST'])
+def analyze_and_mint():
+    """Analyze document with focused AI analysis based on selected type"""
+    
+    params, error_response = validate_analyze_request()
+    if error_response:
+        return error_response
+    
+    try:
+        return jsonify(run_analyze_and_mint(**params)), 200
+
+    except AnalysisError as e:
+        return e.to_response()
     
     except Exception as e:
         app.logger.error(f"Error in /analyze_and_mint: {e}", exc_info=True)
         return jsonify({"error": f"Internal server error: {str(e)}"}), 500
 
+    finally:
+        params["document"].close()
+
+def _run_analysis_job(job, params):
+    """Job body for the async analyze-and-mint endpoint"""
+    try:
+        return run_analyze_and_mint(report_stage=job.set_stage, report_partial=job.set_partial, **params)
+    except AnalysisError as e:
+        job.fail(e.message, e.status_code, e.details)
+        raise
+    finally:
+        params["document"].close()
+
+@app.route('/analyze_and_mint/jobs', methods=['POST'])
+def submit_analysis_job():
+    """
+    Queue a document for analysis and minting and return immediately
+
+    POST /analyze_and_mint/jobs  (same form fields as /analyze_and_mint)
+    Returns 202: {"jobId": "...", "status": "queued", "statusUrl": "...", "eventsUrl": "..."}
+    """
+    params, error_response = validate_analyze_request()
+    if error_response:
+        return error_response
+
+    try:
+        job = job_manager.submit(_run_analysis_job, params, kind="analyze_and_mint")
+        return jsonify({
+            "jobId": job.id,
+            "status": job.status,
+            "statusUrl": f"/analyze_and_mint/jobs/{job.id}",
+            "eventsUrl": f"/analyze_and_mint/jobs/{job.id}/events"
+        }), 202
+    except Exception as e:
+        app.logger.error(f"Failed to queue analysis job: {e}", exc_info=True)
+        return jsonify({"error": str(e)}), 503
+
+@app.route('/analyze_and_mint/jobs/<job_id>', methods=['GET'])
+def get_analysis_job(job_id):
+    """
+    Poll an analysis job
+
+    GET /analyze_and_mint/jobs/<job_id>
+    Returns: {"jobId": "...", "status": "running", "stage": "analyzing", "stages": [...],
+              "partial": {"document_type": "invoice", "authenticity_score": 85}, "result": null, "error": null}
+    """
+    job = job_manager.get(job_id)
+    if not job:
+        return jsonify({"error": f"Unknown job {job_id}"}), 404
+    return jsonify(job.to_dict()), 200
+
+@app.route('/analyze_and_mint/jobs/<job_id>/events', methods=['GET'])
+def stream_analysis_job(job_id):
+    """
+    Server-sent events stream of job progress; closes once the job finishes
+
+    GET /analyze_and_mint/jobs/<job_id>/events
+    """
+    if not job_manager.get(job_id):
+        return jsonify({"error": f"Unknown job {job_id}"}), 404
+
+    def generate():
+        for snapshot in job_manager.watch(job_id):
+            yield f"event: {snapshot['status']}\ndata: {json.dumps(snapshot)}\n\n"
+
+    return Response(generate(), mimetype='text/event-stream', headers={
+        "Cache-Control": "no-cache",
+        "X-Accel-Buffering": "no"
+    })
+
+@app.route('/analyze_and_mint/jobs/status', methods=['GET'])
+def analysis_jobs_status():
+    """
+    Get job pool status
+
+    GET /analyze_and_mint/jobs/status
+    Returns: {"workers": 4, "queued": 0, "running": 1, "succeeded": 10, "failed": 0}
+    """
+    return jsonify(job_manager.stats()), 200
+
+# --- BATCH TOKENIZATION ---
+BATCH_MAX_DOCUMENTS = int(os.getenv("BATCH_MAX_DOCUMENTS", "500"))
+BATCH_ANALYSIS_CONCURRENCY = int(os.getenv("BATCH_ANALYSIS_CONCURRENCY", "8"))
+
+def read_batch_documents():
+    """
+    Collect batch documents from the request.
+
+    Accepts repeated `documents` files with a matching repeated
+    `document_types` field (or one `document_type` for all), and/or a zip
+    `archive` whose optional manifest.json maps file names to types.
+    Every document is spooled to a temp file; the caller must close them.
+    Returns (documents, None) or (None, error_response).
+    """
+    default_type = request.form.get("document_type", "invoice")
+    documents = []
+
+    def close_all():
+        for doc in documents:
+            doc["document"].close()
+
+    try:
+        files = request.files.getlist("documents")
+        types = request.form.getlist("document_types")
+        for index, document_file in enumerate(files):
+            if document_file.filename == '':
+                continue
+            documents.append({
+                "document": SpooledDocument.from_stream(document_file.stream),
+                "filename": document_file.filename,
+                "content_type": document_file.content_type or "",
+                "document_type": types[index] if index < len(types) else default_type
+            })
+
+        archive = request.files.get("archive")
+        if archive and archive.filename:
+            # zipfile needs a seekable file; werkzeug already spools large uploads to disk
+            with zipfile.ZipFile(archive.stream) as zf:
+                manifest = {}
+                if "manifest.json" in zf.namelist():
+                    manifest = json.loads(zf.read("manifest.json"))
+                members = [
+                    info for info in zf.infolist()
+                    if not info.is_dir() and info.filename != "manifest.json"
+                ]
+                if len(documents) + len(members) > BATCH_MAX_DOCUMENTS:
+                    raise ValueError(f"Batch too large (max {BATCH_MAX_DOCUMENTS} documents)")
+                for info in members:
+                    with zf.open(info) as member:
+                        document = SpooledDocument.from_stream(member)
+                    documents.append({
+                        "document": document,
+                        "filename": os.path.basename(info.filename),
+                        "content_type": "application/pdf" if info.filename.lower().endswith(".pdf") else "",
+                        "document_type": manifest.get(info.filename, default_type)
+                    })
+    except DocumentTooLargeError as e:
+        close_all()
+        return None, (jsonify({"error": str(e)}), 413)
+    except (zipfile.BadZipFile, ValueError) as e:
+        close_all()
+        return None, (jsonify({"error": f"Invalid archive: {e}"}), 400)
+
+    if not documents:
+        return None, (jsonify({"error": "No documents provided"}), 400)
+    if len(documents) > BATCH_MAX_DOCUMENTS:
+        close_all()
+        return None, (jsonify({"error": f"Batch too large (max {BATCH_MAX_DOCUMENTS} documents)"}), 400)
+    return documents, None
+
+def run_batch_analyze_and_mint(documents: list, recipient_address: str, report_stage=None) -> dict:
+    """
+    Tokenize many documents at once.
+
+    Extraction runs in a process pool, Groq analysis in a bounded thread
+    pool and IPFS pinning on the IPFS client's workers; all mints are
+    queued in input order (against locally computed CIDs, while pins
+    complete) so they take consecutive nonces. Returns per-document results plus throughput.
+    The spooled documents are closed when the batch finishes.
+    """
+    try:
+        return _run_batch(documents, recipient_address, report_stage or (lambda stage: None))
+    finally:
+        for doc in documents:
+            doc["document"].close()
+
+def _run_batch(documents: list, recipient_address: str, report_stage) -> dict:
+    started = time.time()
+    stage_seconds = {}
+    results = [
+        {"index": i, "filename": doc["filename"], "document_type": doc["document_type"], "success": False}
+        for i, doc in enumerate(documents)
+    ]
+    reports = {}
+
+    def fail(index, error):
+        results[index]["error"] = error.message if isinstance(error, AnalysisError) else str(error)
+
+    # Cache lookups
+    for i, doc in enumerate(documents):
+        if doc["document_type"] not in DOCUMENT_TYPES:
+            fail(i, f"Invalid document type: {doc['document_type']}")
+            continue
+        doc["document_hash"] = doc["document"].sha256
+        cached = analysis_cache.get(doc["document_hash"], doc["document_type"], PROMPT_VERSION)
+        if cached is not None:
+            reports[i] = cached
+            results[i]["analysis_cached"] = True
+    misses = [i for i, doc in enumerate(documents) if "document_hash" in doc and i not in reports]
+
+    # Text extraction (CPU bound, one process per core)
+    report_stage("extracting")
+    stage_start = time.time()
+    texts = {}
+    if misses:
+        # Workers open the spooled file by path and extract serially, so
+        # parallelism comes from running one document per process
+        pool = get_process_pool()
+        futures = {
+            i: pool.submit(extract_document_text, documents[i]["document"].path(),
+                           documents[i]["filename"], documents[i]["content_type"], False)
+            for i in misses
+        }
+        for i, future in futures.items():
+            try:
+                texts[i] = future.result()
+            except Exception as e:
+                fail(i, e)
+    stage_seconds["extracting"] = time.time() - stage_start
+
+    # Groq analysis (network bound, limited by rate limits)
+    report_stage("analyzing")
+    stage_start = time.time()
+    with ThreadPoolExecutor(max_workers=BATCH_ANALYSIS_CONCURRENCY) as pool:
+        futures = {
+            i: pool.submit(analyze_extracted_text, text, documents[i]["filename"], documents[i]["document_type"])
+            for i, text in texts.items()
+        }
+        for i, future in futures.items():
+            try:
+                reports[i] = future.result()
+                doc = documents[i]
+                cache_report(doc["document_hash"], doc["document_type"], reports[i])
+                results[i]["analysis_cached"] = False
+            except Exception as e:
+                fail(i, e)
+    stage_seconds["analyzing"] = time.time() - stage_start
+
+    # IPFS pinning
+    report_stage("pinning")
+    stage_start = time.time()
+    pins = {}
+    cids = {}
+    for i in sorted(reports):
+        doc = documents[i]
+        reports[i] = finalize_report(reports[i], doc["document_type"], doc["document"], doc["content_type"])
+        metadata = build_nft_metadata(reports[i], doc["document_type"], doc["filename"])
+        try:
+            pins[i] = ipfs_client.submit(metadata, block=True)
+        except Exception as e:
+            fail(i, e)
+    # Mint against the locally computed CIDs; only oversized metadata waits for Pinata
+    for i, pin in list(pins.items()):
+        try:
+            cids[i] = pin.cid or pin.result(timeout=IPFS_PIN_TIMEOUT)
+        except Exception as e:
+            fail(i, e)
+            del pins[i]
+    stage_seconds["pinning"] = time.time() - stage_start
+
+    # Minting through the single ordered nonce stream
+    report_stage("minting")
+    stage_start = time.time()
+    order = sorted(cids)
+    tx_hashes = BlockchainService.mint_nft_batch([(recipient_address, cids[i]) for i in order])
+    for i, tx_hash in zip(order, tx_hashes):
+        if isinstance(tx_hash, Exception):
+            fail(i, tx_hash)
+            continue
+        try:
+            cid = pins[i].result(timeout=IPFS_PIN_TIMEOUT)
+        except Exception as e:
+            fail(i, AnalysisError("IPFS pinning failed after the mint was sent", 502,
+                                  details=f"txId {tx_hash}, cid {cids[i]}: {e}"))
+            results[i]["txId"] = tx_hash
+            continue
+        doc = documents[i]
+        results[i].update(build_mint_result(
+            doc["document_type"], tx_hash, reports[i], ipfs_client.gateway_link(cid),
+            results[i].get("analysis_cached", False)
+        ))
+    stage_seconds["minting"] = time.time() - stage_start
+
+    elapsed = time.time() - started
+    for stage, seconds in {**stage_seconds, "total": elapsed}.items():
+        PIPELINE_STAGE_SECONDS.observe(seconds, pipeline="batch", stage=stage)
+    succeeded = sum(1 for result in results if result["success"])
+    return {
+        "results": results,
+        "throughput": {
+            "documents": len(documents),
+            "succeeded": succeeded,
+            "failed": len(documents) - succeeded,
+            "cacheHits": sum(1 for result in results if result.get("analysis_cached")),
+            "elapsedSeconds": round(elapsed, 3),
+            "documentsPerSecond": round(len(documents) / elapsed, 3) if elapsed > 0 else None,
+            "stageSeconds": {stage: round(seconds, 3) for stage, seconds in stage_seconds.items()}
+        }
+    }
+
+@app.route('/analyze_and_mint/batch', methods=['POST'])
+def batch_analyze_and_mint():
+    """
+    Analyze and mint many documents in one request
+
+    POST /analyze_and_mint/batch  (multipart)
+      documents: files (repeated)       document_types: per-file types (repeated)
+      archive: zip with optional manifest.json {"file.pdf": "invoice"}
+      owner_address: recipient for every NFT
+      async: "true" to run as a background job (returns 202 + jobId)
+    Returns: {"results": [...], "throughput": {"documentsPerSecond": ..., "stageSeconds": {...}}}
+    """
+    recipient_address = request.form.get("owner_address")
+    if not recipient_address:
+        return jsonify({"error": "No owner_address provided"}), 400
+
+    documents, error_response = read_batch_documents()
+    if error_response:
+        return error_response
+
+    try:
+        if request.form.get("async", "").lower() in ("1", "true", "yes"):
+            job = job_manager.submit(
+                lambda job, docs, owner: run_batch_analyze_and_mint(docs, owner, job.set_stage),
+                documents, recipient_address, kind="batch_analyze_and_mint"
+            )
+            return jsonify({
+                "jobId": job.id,
+                "status": job.status,
+                "documents": len(documents),
+                "statusUrl": f"/analyze_and_mint/jobs/{job.id}",
+                "eventsUrl": f"/analyze_and_mint/jobs/{job.id}/events"
+            }), 202
+
+        return jsonify(run_batch_analyze_and_mint(documents, recipient_address)), 200
+
+    except Exception as e:
+        app.logger.error(f"Error in /analyze_and_mint/batch: {e}", exc_info=True)
+        return jsonify({"error": f"Internal server error: {str(e)}"}), 500
+
+@app.route('/mint/status/<tx_hash>', methods=['GET'])
+def get_mint_status(tx_hash):
+    """
+    Get confirmation status of a mint broadcast by the mint queue
+
+    Example: GET /mint/status/0xabc...
+    Returns: {"status": "pending", "nonce": 42, "txHashes": [...], "minedTxHash": null, "blockNumber": null}
+    """
+    try:
+        status = BlockchainService.get_mint_status(tx_hash)
+        if not status:
+            return jsonify({"error": f"Unknown mint transaction {tx_hash}"}), 404
+        return jsonify(status), 200
+    except Exception as e:
+        print(f"Mint status error: {e}")
+        return jsonify({"error": str(e)}), 500
+
+@app.route('/mint/queue-status', methods=['GET'])
+def mint_queue_status():
+    """
+    Get mint queue counters (queued, pending, confirmed, replaced...)
+
+    GET /mint/queue-status
+    """
+    try:
+        return jsonify(BlockchainService.mint_queue.stats()), 200
+    except Exception as e:
+        print(f"Mint queue status error: {e}")
+        return jsonify({"error": str(e)}), 500
+
+@app.route('/transactions/status', methods=['GET'])
+def receipt_tracker_status():
+    """
+    Get shared receipt tracker counters (pending, mined, confirmed, RPC batches)
+
+    GET /transactions/status
+    """
+    try:
+        return jsonify(BlockchainService.receipt_tracker.stats()), 200
+    except Exception as e:
+        print(f"Receipt tracker status error: {e}")
+        return jsonify({"error": str(e)}), 500
+
+@app.route('/ipfs/status', methods=['GET'])
+def ipfs_status():
+    """
+    Get IPFS pinning counters (pinned, failed, retries, queue occupancy)
+
+    GET /ipfs/status
+    """
+    try:
+        return jsonify(ipfs_client.stats()), 200
+    except Exception as e:
+        print(f"IPFS status error: {e}")
+        return jsonify({"error": str(e)}), 500
+
+@app.route('/transactions/gas', methods=['GET'])
+def gas_oracle_status():
+    """
+    Get the shared gas oracle's cached fees and memoized gas estimates
+
+    GET /transactions/gas
+    """
+    try:
+        return jsonify(BlockchainService.gas_oracle.stats()), 200
+    except Exception as e:
+        print(f"Gas oracle status error: {e}")
+        return jsonify({"error": str(e)}), 500
+
+@app.route('/transactions/<tx_hash>', methods=['GET'])
+def get_transaction_status(tx_hash):
+    """
+    Get confirmation status of any transaction the backend sent
+
+    Example: GET /transactions/0xabc...
+    Returns: {"status": "mined", "label": "mint nonce 42", "txHashes": [...], "blockNumber": 123, "confirmations": 3, ...}
+    """
+    try:
+        tracked = BlockchainService.receipt_tracker.get(tx_hash)
+        if not tracked:
+            return jsonify({"error": f"Unknown transaction {tx_hash}"}), 404
+        return jsonify(tracked.to_dict()), 200
+    except Exception as e:
+        print(f"Transaction status error: {e}")
+        return jsonify({"error": str(e)}), 500
+
+@app.route('/metrics', methods=['GET'])
+def metrics():
+    """
+    Prometheus scrape endpoint: per-stage latency histograms (PDF
+    extraction, Groq, Pinata, mint, oracle reads, HTTP routes), price
+    cache hit/miss counters and queue depths
+
+    GET /metrics
+    """
+    return Response(REGISTRY.render(), content_type="text/plain; version=0.0.4; charset=utf-8")
+
+@app.route('/rpc/status', methods=['GET'])
+def rpc_status():
+    """
+    Get health of the shared RPC endpoints (circuit state, latency, failures, cooldowns)
+
+    GET /rpc/status
+    """
+    try:
+        return jsonify(Web3Registry.stats()), 200
+    except Exception as e:
+        print(f"RPC status error: {e}")
+        return jsonify({"error": str(e)}), 500
+
 @app.route('/oracle/price/<path:pair>', methods=['GET'])
 def get_oracle_price(pair):
 
@@ -463,71 +1129,120 @@ def get_nft_live_price(token_id):
     }
     """
     try:
-        w3 = Web3(Web3.HTTPProvider(os.getenv("QIE_RPC_URL", "http://127.0.0.1:8545/")))
-        marketplace = w3.eth.contract(address=ARIAMARKETPLACE_ADDRESS, abi=ARIAMARKETPLACE_ABI)
+        live_price = MarketplaceReader.get_live_prices([token_id])[0]
+        if "error" in live_price:
+            raise Exception(live_price["error"])
+        return jsonify(live_price), 200
 
+    except Exception as e:
+        print(f"Error fetching NFT live price: {e}")
+        return jsonify({"error": str(e)}), 500
+
+
+@app.route('/oracle/nft-prices', methods=['POST'])
+def get_nft_live_prices():
+    """
+    Get live prices for many NFT listings in one request
+
+    POST /oracle/nft-prices
+    Body: {"tokenIds": [1, 2, 3]}
+    Returns:
+    {
+        "results": [{...same shape as /oracle/nft-price...}, ...],
+        "errors": {"3": "execution reverted: Not listed"}
+    }
+    """
+    try:
+        data = request.get_json(silent=True) or {}
+        token_ids = data.get('tokenIds')
+        if not isinstance(token_ids, list) or not token_ids:
+            return jsonify({"error": "tokenIds must be a non-empty list"}), 400
         try:
-            # NEW contract returns 7 values
-            listing_details = marketplace.functions.getListingDetails(token_id).call()
-
-            (
-                seller,
-                static_price_wei,
-                current_price_wei,
-                name,
-                use_dynamic,
-                price_pair,
-                price_in_usd_e8,
-                disputed
-            ) = listing_details
-
-            static_price_tokens = static_price_wei / 1e18
-            current_price_tokens = current_price_wei / 1e18
-
-            # If USD-pegged, USD value is authoritative from contract
-            if use_dynamic and price_in_usd_e8 > 0:
-                price_in_usd = price_in_usd_e8 / 1e8
-            else:
-                price_in_usd = None  # fallback later
-        
-        except Exception as e:
-            print(f"[Fallback listing] {e}")
-            listing = marketplace.functions.listings(token_id).call()
-            
-            seller = listing[0]
-            static_price_wei = listing[1]
-            static_price_tokens = static_price_wei / 1e18
-            current_price_tokens = static_price_tokens  # no oracle baseline
-            
-            use_dynamic = False
-            price_in_usd = None
-        
-        oracle_enabled = marketplace.functions.useOracle().call()
+            token_ids = list(dict.fromkeys(int(token_id) for token_id in token_ids))
+        except (TypeError, ValueError):
+            return jsonify({"error": "tokenIds must be integers"}), 400
+        if len(token_ids) > MarketplaceReader.MAX_TOKENS:
+            return jsonify({"error": f"At most {MarketplaceReader.MAX_TOKENS} tokenIds per request"}), 400
+
+        live_prices = MarketplaceReader.get_live_prices(token_ids)
+        return jsonify({
+            "results": [price for price in live_prices if "error" not in price],
+            "errors": {str(price["tokenId"]): price["error"] for price in live_prices if "error" in price}
+        }), 200
+
+    except Exception as e:
+        print(f"Error fetching NFT live prices: {e}")
+        return jsonify({"error": str(e)}), 500
 
-        # Convert ARIA current → USD/INR/etc
-        prices = OracleService.get_nft_price_in_currencies(current_price_tokens)
 
-        # If price_in_usd was missing, fallback to computed USD
-        if price_in_usd is None:
-            price_in_usd = prices.get("USD", 0)
+@app.route('/marketplace/listings', methods=['GET'])
+def get_marketplace_listings():
+    """
+    Browse marketplace listings from the local event index
 
+    GET /marketplace/listings?status=listed&seller=0x..&mode=usd&pair=ARIA/USD
+        &disputed=false&minAriaPrice=10&maxUsdPrice=500&sort=ariaPrice&order=asc
+        &page=1&pageSize=20
+    Returns:
+    {
+        "listings": [{"tokenId": 5, "seller": "0x..", "ariaPrice": 1000.0, ...}],
+        "page": 1, "pageSize": 20, "total": 42, "indexedBlock": 123456
+    }
+    """
+    try:
+        args = request.args
+
+        def number(name):
+            value = args.get(name)
+            return float(value) if value not in (None, "") else None
+
+        disputed = args.get('disputed')
+        page = max(1, int(args.get('page', 1)))
+        page_size = min(100, max(1, int(args.get('pageSize', 20))))
+
+        listings, total = marketplace_index.query_listings(
+            status=args.get('status', 'listed'),
+            seller=args.get('seller') or None,
+            mode=args.get('mode') or None,
+            pair=args.get('pair') or None,
+            disputed=None if disputed in (None, "") else disputed.lower() == "true",
+            min_aria_price=number('minAriaPrice'),
+            max_aria_price=number('maxAriaPrice'),
+            min_usd_price=number('minUsdPrice'),
+            max_usd_price=number('maxUsdPrice'),
+            sort=args.get('sort', 'newest'),
+            order=args.get('order', 'desc'),
+            page=page,
+            page_size=page_size
+        )
         return jsonify({
-            "tokenId": token_id,
-            "staticPrice": static_price_tokens,
-            "currentPrice": current_price_tokens,
-            "prices": prices,
-            "oracleEnabled": oracle_enabled,
-            "useDynamicPricing": use_dynamic,
-            "priceInUSD": price_in_usd,
-            "name": name if 'name' in locals() else None,
-            "seller": seller
+            "listings": listings,
+            "page": page,
+            "pageSize": page_size,
+            "total": total,
+            "indexedBlock": marketplace_index.stats()["indexedBlock"]
         }), 200
 
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
     except Exception as e:
-        print(f"Error fetching NFT live price: {e}")
+        print(f"Marketplace listings error: {e}")
         return jsonify({"error": str(e)}), 500
 
 
+@app.route('/marketplace/indexer-status', methods=['GET'])
+def marketplace_indexer_status():
+    """
+    Get marketplace indexer progress (indexed block, events, reorgs)
+
+    GET /marketplace/indexer-status
+    """
+    try:
+        return jsonify(marketplace_index.stats()), 200
+    except Exception as e:
+        print(f"Marketplace indexer status error: {e}")
+        return jsonify({"error": str(e)}), 500
+
 
 @app.route('/oracle/convert', methods=['POST'])
 def convert_currency():
@@ -566,6 +1281,63 @@ def convert_currency():
         return jsonify({"error": str(e)}), 500
 
 
+BULK_CONVERT_MAX_ITEMS = int(os.getenv("BULK_CONVERT_MAX_ITEMS", "100000"))
+
+
+@app.route('/oracle/convert-bulk', methods=['POST'])
+def convert_currency_bulk():
+    """
+    Convert many amounts at once against one consistent rate snapshot
+
+    POST /oracle/convert-bulk
+    Body: {
+        "amounts": [1000, 250.5, 3],
+        "from": "INR" | ["INR", "ARIA", "ETH"],
+        "to": "USD" | ["USD", "USD", "INR"],
+        "includeMatrix": true
+    }
+    Returns: {
+        "results": [11.1, 125.25, 851303.0],
+        "total": 851439.35,          # only when "to" is a single currency
+        "rates": {"currencies": [...], "usdRates": {...}, "matrix": [[...]]}
+    }
+    Unknown currencies produce null results.
+    """
+    try:
+        data = request.get_json(silent=True) or {}
+        amounts = data.get('amounts')
+        from_currencies = data.get('from', 'USD')
+        to_currencies = data.get('to', 'USD')
+
+        if not isinstance(amounts, list) or not amounts:
+            return jsonify({"error": "amounts must be a non-empty list"}), 400
+        if len(amounts) > BULK_CONVERT_MAX_ITEMS:
+            return jsonify({"error": f"At most {BULK_CONVERT_MAX_ITEMS} amounts per request"}), 400
+        for currencies in (from_currencies, to_currencies):
+            if not isinstance(currencies, str) and (
+                not isinstance(currencies, list) or len(currencies) != len(amounts)
+            ):
+                return jsonify({"error": "from/to must be a currency or a list matching amounts"}), 400
+
+        try:
+            results, snapshot = OracleService.convert_bulk(amounts, from_currencies, to_currencies)
+        except (TypeError, ValueError) as e:
+            return jsonify({"error": f"Invalid amounts: {e}"}), 400
+
+        response = {
+            "results": to_json_list(results),
+            "rates": snapshot.to_dict(include_matrix=bool(data.get('includeMatrix')))
+        }
+        if isinstance(to_currencies, str):
+            response["total"] = float(results[~np.isnan(results)].sum())
+            response["to"] = to_currencies
+        return jsonify(response), 200
+
+    except Exception as e:
+        print(f"Bulk currency conversion error: {e}")
+        return jsonify({"error": str(e)}), 500
+
+
 @app.route('/oracle/property-value', methods=['POST'])
 def update_property_value():
     """
@@ -603,8 +1375,8 @@ def get_batch_prices():
     Get multiple oracle prices in one request
     
     POST /oracle/batch-prices
-    Body: {"pairs": ["ARIA/USD", "ETH/USD", "INR/USD"]}
-    Returns: {"prices": {"ARIA/USD": {...}, "ETH/USD": {...}}}
+    Body: {"pairs": ["ARIA/USD", "ETH/USD", "INR/USD"], "deadlineMs": 1500}
+    Returns: {"prices": {"ARIA/USD": {...}, "ETH/USD": {...}}, "missing": [], "partial": false}
     """
     try:
         data = request.get_json()
@@ -612,11 +1384,23 @@ def get_batch_prices():
         
         if not pairs:
             return jsonify({"error": "No pairs specified"}), 400
+
+        deadline = data.get('deadlineMs')
+        if deadline is not None:
+            try:
+                deadline = float(deadline)
+            except (TypeError, ValueError):
+                return jsonify({"error": "deadlineMs must be a number of milliseconds"}), 400
+            if not deadline > 0:
+                return jsonify({"error": "deadlineMs must be greater than 0"}), 400
+            deadline = min(deadline, OracleService.BATCH_DEADLINE * 1000) / 1000
         
-        results = OracleService.get_live_prices_batch(pairs)
+        results, missing = OracleService.get_prices_batch(pairs, deadline=deadline)
         
         return jsonify({
             "prices": results,
+            "missing": missing,
+            "partial": bool(missing),
             "timestamp": int(time.time())
         }), 200
         
@@ -628,14 +1412,18 @@ def get_batch_prices():
 @app.route('/oracle/clear-cache', methods=['POST'])
 def clear_oracle_cache():
     """
-    Clear the oracle price cache (force refresh)
+    Clear the oracle price cache and re-poll the feed (force refresh)
     
     POST /oracle/clear-cache
-    Returns: {"message": "Cache cleared"}
+    Returns: {"message": "Cache cleared", "feedRefreshed": true}
     """
     try:
-        OracleService.clear_cache()
-        return jsonify({"message": "Oracle cache cleared successfully"}), 200
+        feed_refreshed = OracleService.clear_cache()
+        return jsonify({
+            "message": "Oracle cache cleared successfully",
+            # Feed pairs are served from the snapshot, re-polled just now
+            "feedRefreshed": feed_refreshed
+        }), 200
     except Exception as e:
         print(f"Cache clear error: {e}")
         return jsonify({"error": str(e)}), 500
@@ -659,6 +1447,9 @@ def oracle_status():
             "enabled": True,
             "cacheSize": len(OracleService.price_cache),
             "cacheTTL": OracleService.CACHE_TTL,
+            "cache": OracleService.price_cache.stats(),
+            "feed": OracleService.feed.stats() if OracleService.feed else None,
+            "history": OracleService.history.stats(),
             "availablePairs": [
                 "ARIA/USD",
                 "ETH/USD",
@@ -671,6 +1462,137 @@ def oracle_status():
         print(f"Status check error: {e}")
         return jsonify({"error": str(e)}), 500
 
+@app.route('/oracle/feed-status', methods=['GET'])
+def oracle_feed_status():
+    """
+    Get freshness of the background oracle feed (snapshot age, per-pair sources)
+
+    GET /oracle/feed-status
+    """
+    try:
+        if not OracleService.feed:
+            return jsonify({"running": False, "error": "Oracle feed is disabled"}), 200
+        return jsonify({**OracleService.feed.stats(), "stream": price_stream.stats()}), 200
+    except Exception as e:
+        print(f"Oracle feed status error: {e}")
+        return jsonify({"error": str(e)}), 500
+
+@app.route('/oracle/stream', methods=['GET'])
+def oracle_price_stream():
+    """
+    Server-sent events stream of price changes for the requested pairs and
+    listings. The current values are sent first, then only changes; a
+    client that falls behind gets the latest value per pair/token.
+
+    GET /oracle/stream?pairs=ARIA/USD,ETH/USD&tokens=1,2
+    Event: prices  data: {"pairs": {"ARIA/USD": {...}}, "tokens": {"1": {...same shape as /oracle/nft-price...}}}
+    """
+    pairs = [pair.strip() for pair in request.args.get('pairs', 'ARIA/USD').split(',') if pair.strip()]
+    try:
+        tokens = [int(token) for token in request.args.get('tokens', '').split(',') if token.strip()]
+    except ValueError:
+        return jsonify({"error": "tokens must be a comma-separated list of integers"}), 400
+
+    try:
+        subscription = price_stream.subscribe(pairs, tokens)
+    except StreamFullError as e:
+        return jsonify({"error": str(e)}), 503
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+
+    def generate():
+        try:
+            for batch in subscription.events():
+                if batch is None:
+                    # Comment line keeps proxies from closing idle streams
+                    yield ": keep-alive\n\n"
+                else:
+                    yield f"event: prices\ndata: {json.dumps(batch)}\n\n"
+        finally:
+            subscription.close()
+
+    return Response(generate(), mimetype='text/event-stream', headers={
+        "Cache-Control": "no-cache",
+        "X-Accel-Buffering": "no"
+    })
+
+@app.route('/oracle/history/<path:pair>', methods=['GET'])
+def oracle_price_history(pair):
+    """
+    Get a downsampled price series for a pair
+
+    GET /oracle/history/ARIA/USD?from=1700000000&to=1702592000&resolution=auto&maxPoints=500
+    GET /oracle/history/ARIA/USD?last=10   (last 10 raw updates, for sparklines)
+    Returns: {"pair": "ARIA/USD", "resolution": "hour", "points": [{"t", "open", "high", "low", "close", "count"}]}
+    """
+    try:
+        last = request.args.get('last', type=int)
+        if last is not None:
+            if last < 1:
+                return jsonify({"error": "last must be positive"}), 400
+            points = OracleService.history.last(pair, min(last, 1000))
+            return jsonify({"pair": pair, "resolution": "raw", "points": points}), 200
+
+        max_points = min(max(request.args.get('maxPoints', 500, type=int), 1), 5000)
+        series = OracleService.get_price_history(
+            pair,
+            start=request.args.get('from', type=float),
+            end=request.args.get('to', type=float),
+            resolution=request.args.get('resolution', 'auto'),
+            max_points=max_points
+        )
+        if series is None:
+            return jsonify({"error": f"No price history for {pair}"}), 404
+        return jsonify({"pair": pair, **series}), 200
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    except Exception as e:
+        print(f"Price history error: {e}")
+        return jsonify({"error": str(e)}), 500
+
+@app.route('/analysis/cache-status', methods=['GET'])
+def analysis_cache_status():
+    """
+    Get AI analysis cache status
+
+    GET /analysis/cache-status
+    Returns: {"enabled": true, "hits": 12, "misses": 30, "hitRate": 0.28, "cacheSize": 30, ...}
+    """
+    try:
+        return jsonify({**analysis_cache.stats(), "promptVersion": PROMPT_VERSION}), 200
+    except Exception as e:
+        print(f"Analysis cache status error: {e}")
+        return jsonify({"error": str(e)}), 500
+
+
+@app.route('/analysis/groq-status', methods=['GET'])
+def groq_pool_status():
+    """
+    Get per-key Groq rate-limit headroom
+
+    GET /analysis/groq-status
+    Returns: {"keys": [{"key": 0, "remainingRequests": 28, "remainingTokens": 5400, "coolingDownFor": 0, ...}]}
+    """
+    if not groq_service or not groq_service.pool:
+        return jsonify({"error": "Groq Service unavailable"}), 503
+    return jsonify(groq_service.pool.stats()), 200
+
+
+@app.route('/analysis/clear-cache', methods=['POST'])
+def clear_analysis_cache():
+    """
+    Clear the AI analysis cache (force re-analysis)
+
+    POST /analysis/clear-cache
+    Returns: {"message": "Analysis cache cleared successfully"}
+    """
+    try:
+        analysis_cache.clear()
+        return jsonify({"message": "Analysis cache cleared successfully"}), 200
+    except Exception as e:
+        print(f"Analysis cache clear error: {e}")
+        return jsonify({"error": str(e)}), 500
+
 @app.route('/supported_documents', methods=['GET'])
 def get_supported_documents():
     """Return list of supported document types with metadata"""
@@ -697,5 +1619,14 @@ def health_check():
         "ai_model": "Gemini 2.5 Pro"
     }), 200
 
+def _is_reloader_watcher() -> bool:
+    """True in the debug reloader's watcher process, which never serves requests"""
+    return __name__ == '__main__' and os.environ.get("WERKZEUG_RUN_MAIN") != "true"
+
+# Started on import so WSGI servers get them too; the reloader re-runs this
+# file in a serving child (WERKZEUG_RUN_MAIN), and only that child starts them
+if not _is_reloader_watcher():
+    start_background_services()
+
 if __name__ == '__main__':
     app.run(debug=True, port=5001)
\ No newline at end of file
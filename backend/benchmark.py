@@ -0,0 +1,363 @@
+# backend/benchmark.py
+"""
+Benchmark
+Offline end-to-end load test: starts a local EVM with the contracts
+deployed, local Groq and Pinata stand-ins, and the backend itself, then
+drives the mint and oracle routes at a fixed concurrency and reports
+throughput and latency percentiles as JSON.
+
+    python benchmark.py --requests 50 --concurrency 8 --output bench.json
+    python benchmark.py --scenarios mint,batch --groq-latency 2 --batch-size 20
+
+The local chain needs eth-tester (pip install "web3[tester]"). To use a
+hardhat node instead pass --rpc-url and --server-key with its account #0 key.
+"""
+
+import argparse
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Dict, List, Tuple
+
+import requests
+from werkzeug.serving import WSGIRequestHandler, make_server
+
+from local_chain import DEFAULT_PRICES, DEPLOYER_PRIVATE_KEY, LocalChain, deploy_contracts
+from local_groq import LocalGroqServer
+from local_pinata import LocalPinataServer
+
+SCENARIOS = ["mint", "mint-cached", "batch", "oracle-price", "oracle-batch", "nft-price", "nft-prices"]
+REQUEST_TIMEOUT = 300
+
+# A request returns (status code, JSON body or None)
+Call = Callable[[int], Tuple[int, Dict]]
+
+
+def make_pdf(text: str) -> bytes:
+    """Smallest valid one-page PDF showing `text`, for extraction to chew on"""
+    escaped = text.replace("\\", "\\\\").replace("(", "\\(").replace(")", "\\)")
+    lines = escaped.split("\n")
+    stream = "BT /F1 12 Tf 72 720 Td 14 TL " + " ".join(f"({line}) '" for line in lines) + " ET"
+    objects = [
+        "<< /Type /Catalog /Pages 2 0 R >>",
+        "<< /Type /Pages /Kids [3 0 R] /Count 1 >>",
+        "<< /Type /Page /Parent 2 0 R /MediaBox [0 0 612 792] "
+        "/Resources << /Font << /F1 5 0 R >> >> /Contents 4 0 R >>",
+        f"<< /Length {len(stream)} >>\nstream\n{stream}\nendstream",
+        "<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica >>"
+    ]
+    pdf = b"%PDF-1.4\n"
+    offsets = []
+    for number, body in enumerate(objects, start=1):
+        offsets.append(len(pdf))
+        pdf += f"{number} 0 obj\n{body}\nendobj\n".encode("latin-1")
+    xref = len(pdf)
+    pdf += f"xref\n0 {len(objects) + 1}\n0000000000 65535 f \n".encode()
+    pdf += "".join(f"{offset:010d} 00000 n \n" for offset in offsets).encode()
+    pdf += f"trailer\n<< /Size {len(objects) + 1} /Root 1 0 R >>\nstartxref\n{xref}\n%%EOF\n".encode()
+    return pdf
+
+
+def invoice_text(label: str) -> str:
+    return "\n".join([
+        f"INVOICE {label}",
+        "Acme Supplies Pvt Ltd, GSTIN 27AAACA1234A1Z5",
+        "Bill to: ARIA Benchmarks",
+        "Date: 01/08/2025",
+        "Item: Widgets x 10 @ 125.00",
+        "Total: 1250.00 INR"
+    ])
+
+
+def percentile(values: List[float], pct: float) -> float:
+    """Nearest-rank percentile of already sorted values"""
+    if not values:
+        return 0.0
+    rank = max(int(round(pct / 100 * len(values) + 0.5)) - 1, 0)
+    return values[min(rank, len(values) - 1)]
+
+
+def summarize(latencies: List[float], statuses: List[int], elapsed: float, items_per_request: int = 1) -> Dict:
+    ordered = sorted(latencies)
+    ms = lambda seconds: round(seconds * 1000, 2)
+    codes = {}
+    for status in statuses:
+        codes[str(status)] = codes.get(str(status), 0) + 1
+    count = len(latencies)
+    return {
+        "requests": count,
+        "errors": sum(1 for status in statuses if status != 200),
+        "statusCodes": codes,
+        "elapsedSeconds": round(elapsed, 3),
+        "requestsPerSecond": round(count / elapsed, 3) if elapsed > 0 else None,
+        "itemsPerSecond": round(count * items_per_request / elapsed, 3) if elapsed > 0 else None,
+        "latencyMs": {
+            "mean": ms(statistics.mean(ordered)) if ordered else 0.0,
+            "p50": ms(percentile(ordered, 50)),
+            "p90": ms(percentile(ordered, 90)),
+            "p95": ms(percentile(ordered, 95)),
+            "p99": ms(percentile(ordered, 99)),
+            "min": ms(ordered[0]) if ordered else 0.0,
+            "max": ms(ordered[-1]) if ordered else 0.0
+        }
+    }
+
+
+def mean_stage_seconds(bodies: List[Dict]) -> Dict[str, float]:
+    """Average the per-stage timings the mint routes report"""
+    totals, counts = {}, {}
+    for body in bodies:
+        stages = (body or {}).get("stageSeconds") or ((body or {}).get("throughput") or {}).get("stageSeconds") or {}
+        for stage, seconds in stages.items():
+            totals[stage] = totals.get(stage, 0.0) + seconds
+            counts[stage] = counts.get(stage, 0) + 1
+    return {stage: round(totals[stage] / counts[stage], 3) for stage in totals}
+
+
+def run_scenario(call: Call, total: int, concurrency: int, items_per_request: int = 1) -> Dict:
+    """One warmup call, then `total` calls spread over `concurrency` threads"""
+    call(-1)
+
+    def timed(index: int):
+        started = time.perf_counter()
+        try:
+            status, body = call(index)
+        except Exception as e:
+            status, body = 599, {"error": str(e)}
+        return time.perf_counter() - started, status, body
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        outcomes = list(pool.map(timed, range(total)))
+    elapsed = time.perf_counter() - started
+
+    result = summarize([o[0] for o in outcomes], [o[1] for o in outcomes], elapsed, items_per_request)
+    stages = mean_stage_seconds([o[2] for o in outcomes if o[1] == 200])
+    if stages:
+        result["meanStageSeconds"] = stages
+    errors = [o[2].get("error") for o in outcomes if o[1] != 200 and isinstance(o[2], dict)]
+    if errors:
+        result["sampleErrors"] = list(dict.fromkeys(errors))[:5]
+    return result
+
+
+class Client:
+    """Thread-local requests sessions against the backend under test"""
+
+    def __init__(self, base_url: str):
+        self.base_url = base_url
+        self._local = threading.local()
+
+    def _session(self) -> requests.Session:
+        if not hasattr(self._local, "session"):
+            self._local.session = requests.Session()
+        return self._local.session
+
+    def request(self, method: str, path: str, **kwargs) -> Tuple[int, Dict]:
+        response = self._session().request(method, self.base_url + path, timeout=REQUEST_TIMEOUT, **kwargs)
+        try:
+            return response.status_code, response.json()
+        except ValueError:
+            return response.status_code, None
+
+
+def build_scenarios(client: Client, owner: str, token_ids: List[int], batch_size: int) -> Dict[str, Tuple[Call, int]]:
+    """Scenario name -> (call, items per request)"""
+    run_id = uuid.uuid4().hex[:8]
+    cached_pdf = make_pdf(invoice_text(f"CACHED-{run_id}"))
+    pairs = list(DEFAULT_PRICES)
+
+    def mint(index: int):
+        pdf = make_pdf(invoice_text(f"{run_id}-{index}"))
+        return client.request("POST", "/analyze_and_mint", data={
+            "owner_address": owner, "document_type": "invoice"
+        }, files={"document": (f"invoice-{index}.pdf", pdf, "application/pdf")})
+
+    def mint_cached(index: int):
+        return client.request("POST", "/analyze_and_mint", data={
+            "owner_address": owner, "document_type": "invoice"
+        }, files={"document": ("invoice-cached.pdf", cached_pdf, "application/pdf")})
+
+    def batch(index: int):
+        files = [
+            ("documents", (f"batch-{index}-{n}.pdf", make_pdf(invoice_text(f"{run_id}-B{index}-{n}")), "application/pdf"))
+            for n in range(batch_size)
+        ]
+        return client.request("POST", "/analyze_and_mint/batch", data={
+            "owner_address": owner, "document_types": ["invoice"] * batch_size
+        }, files=files)
+
+    def oracle_price(index: int):
+        return client.request("GET", f"/oracle/price/{pairs[index % len(pairs)]}")
+
+    def oracle_batch(index: int):
+        return client.request("POST", "/oracle/batch-prices", json={"pairs": pairs})
+
+    def nft_price(index: int):
+        return client.request("GET", f"/oracle/nft-price/{token_ids[index % len(token_ids)]}")
+
+    def nft_prices(index: int):
+        return client.request("POST", "/oracle/nft-prices", json={"tokenIds": token_ids})
+
+    return {
+        "mint": (mint, 1),
+        "mint-cached": (mint_cached, 1),
+        "batch": (batch, batch_size),
+        "oracle-price": (oracle_price, 1),
+        "oracle-batch": (oracle_batch, len(pairs)),
+        "nft-price": (nft_price, 1),
+        "nft-prices": (nft_prices, len(token_ids))
+    }
+
+
+class _QuietHandler(WSGIRequestHandler):
+    def log_request(self, *args, **kwargs):
+        pass
+
+
+def start_environment(args, work_dir: str) -> Dict:
+    """Start the stand-ins, point the backend's env at them and serve the app"""
+    chain = None
+    rpc_url = args.rpc_url
+    if not rpc_url:
+        chain = LocalChain().start()
+        rpc_url = chain.url
+    print(f"⛓️ Deploying contracts to {rpc_url}")
+    deployed = deploy_contracts(rpc_url, listings=args.listings)
+    token_ids = deployed.pop("listedTokenIds")
+
+    groq = LocalGroqServer(latency=args.groq_latency, jitter=args.groq_jitter).start()
+    pinata = LocalPinataServer(latency=args.pinata_latency, jitter=args.pinata_jitter).start()
+
+    # setdefault, so anything exported by the caller still wins
+    settings = {
+        "QIE_RPC_URL": rpc_url,
+        "SERVER_WALLET_PRIVATE_KEY": args.server_key,
+        "GROQ_API_KEY": "local",
+        "GROQ_BASE_URL": groq.url,
+        "PINATA_API_KEY": "local",
+        "PINATA_SECRET_API_KEY": "local",
+        "PINATA_API_URL": pinata.url,
+        "PINATA_GATEWAY_URL": f"{pinata.url}/ipfs",
+        "ANALYSIS_CACHE_PATH": os.path.join(work_dir, "analysis_cache.db"),
+        "PIN_INDEX_PATH": os.path.join(work_dir, "pin_index.db"),
+        "MARKETPLACE_INDEX_PATH": os.path.join(work_dir, "marketplace_index.db"),
+        "RECEIPT_TRACKER_PATH": os.path.join(work_dir, "receipts.db"),
+        "PRICE_HISTORY_DIR": os.path.join(work_dir, "price_history"),
+        **deployed
+    }
+    for name, value in settings.items():
+        os.environ.setdefault(name, str(value))
+
+    # Imported only now: services read their configuration, and the
+    # background threads start, at import time
+    import app as backend
+
+    server = make_server("127.0.0.1", 0, backend.app, threaded=True, request_handler=_QuietHandler)
+    threading.Thread(target=server.serve_forever, name="benchmark-backend", daemon=True).start()
+    owner = backend.BlockchainService.server_account.address
+
+    return {
+        "chain": chain,
+        "groq": groq,
+        "pinata": pinata,
+        "server": server,
+        "baseUrl": f"http://127.0.0.1:{server.server_port}",
+        "owner": owner,
+        "tokenIds": token_ids,
+        "contracts": deployed
+    }
+
+
+def git_commit() -> str:
+    try:
+        return subprocess.check_output(
+            ["git", "rev-parse", "HEAD"], cwd=os.path.dirname(os.path.abspath(__file__)),
+            stderr=subprocess.DEVNULL, text=True
+        ).strip()
+    except Exception:
+        return None
+
+
+def main(argv=None) -> Dict:
+    parser = argparse.ArgumentParser(description="Offline end-to-end benchmark of the ARIA backend")
+    parser.add_argument("--scenarios", default=",".join(SCENARIOS), help=f"Comma separated, from {', '.join(SCENARIOS)}")
+    parser.add_argument("--requests", type=int, default=20, help="Measured requests per scenario")
+    parser.add_argument("--concurrency", type=int, default=4, help="Concurrent clients")
+    parser.add_argument("--batch-size", type=int, default=10, help="Documents per batch request")
+    parser.add_argument("--listings", type=int, default=10, help="Marketplace listings to create")
+    parser.add_argument("--groq-latency", type=float, default=1.0, help="Seconds per Groq completion")
+    parser.add_argument("--groq-jitter", type=float, default=0.0)
+    parser.add_argument("--pinata-latency", type=float, default=0.3, help="Seconds per Pinata request")
+    parser.add_argument("--pinata-jitter", type=float, default=0.0)
+    parser.add_argument("--rpc-url", help="Use this node (e.g. npx hardhat node) instead of the in-process chain")
+    parser.add_argument("--server-key", default=DEPLOYER_PRIVATE_KEY, help="Key of the node's first account")
+    parser.add_argument("--output", help="Write the JSON results here instead of stdout")
+    args = parser.parse_args(argv)
+
+    scenarios = [name.strip() for name in args.scenarios.split(",") if name.strip()]
+    unknown = [name for name in scenarios if name not in SCENARIOS]
+    if unknown:
+        parser.error(f"Unknown scenarios: {', '.join(unknown)}")
+
+    work_dir = tempfile.mkdtemp(prefix="aria-bench-")
+    env = start_environment(args, work_dir)
+    client = Client(env["baseUrl"])
+    calls = build_scenarios(client, env["owner"], env["tokenIds"], args.batch_size)
+
+    results = {}
+    for name in scenarios:
+        call, items = calls[name]
+        print(f"🏁 {name}: {args.requests} requests at concurrency {args.concurrency}")
+        results[name] = run_scenario(call, args.requests, args.concurrency, items)
+        latency = results[name]["latencyMs"]
+        print(f"   {results[name]['requestsPerSecond']} req/s, p50 {latency['p50']}ms, "
+              f"p99 {latency['p99']}ms, {results[name]['errors']} errors")
+
+    report = {
+        "run": {
+            "timestamp": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime()),
+            "gitCommit": git_commit(),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "cpuCount": os.cpu_count(),
+            "config": vars(args),
+            "chain": "external" if args.rpc_url else "eth-tester",
+            "contracts": env["contracts"],
+            "workDir": work_dir
+        },
+        "scenarios": results,
+        "standIns": {
+            "groq": requests.get(f"{env['groq'].url}/stats", timeout=10).json(),
+            "pinata": requests.get(f"{env['pinata'].url}/stats", timeout=10).json()
+        }
+    }
+
+    output = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, "w") as f:
+            f.write(output + "\n")
+        print(f"✅ Results written to {args.output}")
+    else:
+        print(output)
+
+    env["server"].shutdown()
+    env["groq"].stop()
+    env["pinata"].stop()
+    if env["chain"]:
+        env["chain"].stop()
+    return report
+
+
+if __name__ == "__main__":
+    main()
+    # Background services (indexer, oracle feed, receipt tracker) run on daemon threads
+    sys.exit(0)
@@ -1,11 +1,21 @@
 # backend/blockchain_service.py
 import os
+from typing import List, Optional, Tuple, Union
 from web3 import Web3
 from dotenv import load_dotenv
 from contract_info import ARIANFT_ADDRESS, ARIANFT_ABI
+from mint_queue import MintQueue
+from gas_oracle import get_gas_oracle
+from receipt_tracker import get_receipt_tracker
+from metrics import histogram
+from web3_provider import Web3Registry
 
 load_dotenv()
 
+MINT_SUBMIT_SECONDS = histogram(
+    "aria_mint_submit_seconds", "BlockchainService.mint_nft time until broadcast (or receipt)", ["outcome"]
+)
+
 class BlockchainService:
     # --- CONFIGURATION ---
     PROVIDER_URL = os.getenv("QIE_RPC_URL", "https://rpc1testnet.qie.digital")
@@ -15,44 +25,123 @@ class BlockchainService:
     SERVER_PRIVATE_KEY = os.getenv("SERVER_WALLET_PRIVATE_KEY")
     
     # --- INITIALIZATION ---
-    w3 = Web3(Web3.HTTPProvider(PROVIDER_URL))
+    # Shared pooled provider (set QIE_RPC_URLS=url1,url2 for failover)
+    w3 = Web3Registry.get_web3(PROVIDER_URL)
     server_account = w3.eth.account.from_key(SERVER_PRIVATE_KEY)
     
     # Instantiate the NFT contract object
-    nft_contract = w3.eth.contract(address=ARIANFT_ADDRESS, abi=ARIANFT_ABI)
+    nft_contract = Web3Registry.get_contract(ARIANFT_ADDRESS, ARIANFT_ABI, w3)
+
+    # Shared with every other service sending transactions on this provider
+    receipt_tracker = get_receipt_tracker(w3)
+    gas_oracle = get_gas_oracle(w3)
+
+    # Every mint goes through one queue so the server account's nonce is
+    # owned locally and transactions are pipelined instead of sent one per block
+    mint_queue = MintQueue(
+        w3,
+        nft_contract,
+        server_account,
+        SERVER_PRIVATE_KEY,
+        receipt_tracker,
+        gas_oracle,
+        gas_limit=2000000, # Fallback when estimate_gas fails
+        max_batch=int(os.getenv("MINT_QUEUE_MAX_BATCH", "25")),
+        stuck_after=float(os.getenv("MINT_QUEUE_STUCK_AFTER", "120"))
+    )
+    SUBMIT_TIMEOUT = float(os.getenv("MINT_SUBMIT_TIMEOUT", "60"))
 
     @classmethod
-    def mint_nft(cls, recipient_address: str, ipfs_hash: str) -> str:
+    @MINT_SUBMIT_SECONDS.time()
+    def mint_nft(cls, recipient_address: str, ipfs_hash: str, wait_for_receipt: bool = False) -> str:
         """
         Mints a new AriaNFT and returns the transaction hash.
+
+        The hash is returned as soon as the transaction is broadcast; the
+        receipt is tracked in the background by the mint queue. Pass
+        wait_for_receipt=True to block until it is mined.
         """
         try:
             print(f"[Blockchain Service] Minting NFT for {recipient_address} with IPFS hash {ipfs_hash}")
 
-            # 1. Build the transaction
-            tx_data = cls.nft_contract.functions.safeMint(
-                recipient_address,
-                ipfs_hash
-            ).build_transaction({
-                'from': cls.server_account.address,
-                'nonce': cls.w3.eth.get_transaction_count(cls.server_account.address),
-                'gas': 2000000, # You can adjust gas settings as needed
-                'gasPrice': cls.w3.eth.gas_price
-            })
-
-            # 2. Sign the transaction with the server's private key
-            signed_tx = cls.w3.eth.account.sign_transaction(tx_data, private_key=cls.SERVER_PRIVATE_KEY)
-
-            # 3. Send the raw transaction to the blockchain
-            tx_hash = cls.w3.eth.send_raw_transaction(signed_tx.raw_transaction)
+            ticket = cls.mint_queue.submit(recipient_address, ipfs_hash)
+            tx_hash = ticket.tx_hash.result(timeout=cls.SUBMIT_TIMEOUT)
 
-            # 4. Wait for the transaction to be mined and get the receipt
-            tx_receipt = cls.w3.eth.wait_for_transaction_receipt(tx_hash)
+            if wait_for_receipt:
+                tx_receipt = ticket.receipt.result()
+                tx_hash = Web3.to_hex(tx_receipt.transactionHash)
+                print(f"[Blockchain Service] Minting successful. Tx Hash: {tx_hash}")
+            else:
+                print(f"[Blockchain Service] Mint broadcast. Tx Hash: {tx_hash}")
 
-            print(f"[Blockchain Service] Minting successful. Tx Hash: {tx_receipt.transactionHash.hex()}")
-            
-            return tx_receipt.transactionHash.hex()
+            return tx_hash
 
         except Exception as e:
             print(f"[Blockchain Service] Error minting NFT: {e}")
-            raise e
\ No newline at end of file
+            raise e
+
+    @classmethod
+    def prepare_mint(cls, recipient_address: str):
+        """
+        Warm the mint queue for an upcoming mint while other work (e.g. the
+        AI analysis) is in flight. Failures are logged, not raised; the
+        mint itself will retry anything that wasn't prefetched.
+        """
+        try:
+            cls.mint_queue.warm(recipient_address)
+        except Exception as e:
+            print(f"[Blockchain Service] Mint preparation failed: {e}")
+
+    @classmethod
+    def mint_nft_batch(cls, mints: List[Tuple[str, str]]) -> List[Union[str, Exception]]:
+        """
+        Queues (recipient_address, ipfs_hash) mints in order so they take
+        consecutive nonces, and returns a tx hash or the error for each.
+        """
+        print(f"[Blockchain Service] Queueing batch of {len(mints)} mint(s)")
+        tickets = [cls.mint_queue.submit(recipient, ipfs_hash) for recipient, ipfs_hash in mints]
+
+        results = []
+        for ticket in tickets:
+            try:
+                results.append(ticket.tx_hash.result(timeout=cls.SUBMIT_TIMEOUT))
+            except Exception as e:
+                print(f"[Blockchain Service] Error minting NFT for {ticket.recipient_address}: {e}")
+                results.append(e)
+        return results
+
+    @classmethod
+    def get_mint_status(cls, tx_hash: str) -> Optional[dict]:
+        """
+        Returns the queue status of a mint, following gas-price replacements.
+        """
+        ticket = cls.mint_queue.get_ticket(tx_hash)
+        if not ticket:
+            # Sent before a restart: only the receipt tracker remembers it
+            tracked = cls.receipt_tracker.get(tx_hash)
+            if not tracked:
+                return None
+            status = tracked.to_dict()
+            return {
+                "status": {"reverted": "failed", "dropped": "failed", "mined": "pending"}.get(
+                    status["status"], status["status"]
+                ),
+                "nonce": None,
+                "txHashes": status["txHashes"],
+                "minedTxHash": status["minedTxHash"],
+                "blockNumber": status["blockNumber"]
+            }
+
+        status = {
+            "status": ticket.status,
+            "nonce": ticket.nonce,
+            "txHashes": list(ticket.hashes),
+            "minedTxHash": None,
+            "blockNumber": None
+        }
+        if ticket.receipt.done() and not ticket.receipt.exception():
+            # Reverted mints are "failed" but still name the mined tx
+            receipt = ticket.receipt.result()
+            status["minedTxHash"] = Web3.to_hex(receipt.transactionHash)
+            status["blockNumber"] = receipt.blockNumber
+        return status
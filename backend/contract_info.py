@@ -4,13 +4,14 @@ import os
 
 # --- DEPLOYED CONTRACT ADDRESSES ---
 # --- DEPLOYED CONTRACT ADDRESSES ---
-ARIANFT_ADDRESS = "0xA1396CAe4A1Bf6C7Bd2e322F916967905E8d85e4"
-ARIATOKEN_ADDRESS = "0xaE2a6140DC27a73501eb3e26e656fA5Cfd8dec3e"
-ARIAMARKETPLACE_ADDRESS = "0xD504D75D5ebfaBEfF8d35658e85bbc52CC66d880"
+# Each can be overridden from the environment (e.g. for a local chain)
+ARIANFT_ADDRESS = os.getenv("ARIANFT_ADDRESS", "0xA1396CAe4A1Bf6C7Bd2e322F916967905E8d85e4")
+ARIATOKEN_ADDRESS = os.getenv("ARIATOKEN_ADDRESS", "0xaE2a6140DC27a73501eb3e26e656fA5Cfd8dec3e")
+ARIAMARKETPLACE_ADDRESS = os.getenv("ARIAMARKETPLACE_ADDRESS", "0xD504D75D5ebfaBEfF8d35658e85bbc52CC66d880")
 
-FRACTIONALNFT_ADDRESS = "0x3e2B64f8d927447C370CD6a84FAdf92f6B95C806"
+FRACTIONALNFT_ADDRESS = os.getenv("FRACTIONALNFT_ADDRESS", "0x3e2B64f8d927447C370CD6a84FAdf92f6B95C806")
 
-ORACLE_ADDRESS = "0xf37F527E7b50A07Fa7fd49D595132a1f2fDC5f98"
+ORACLE_ADDRESS = os.getenv("ORACLE_ADDRESS", "0xf37F527E7b50A07Fa7fd49D595132a1f2fDC5f98")
 
 # --- DYNAMIC ABI LOADING ---
 
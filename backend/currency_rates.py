@@ -0,0 +1,89 @@
+# backend/currency_rates.py
+"""
+Currency Rate Snapshots
+One consistent set of USD rates and the NumPy math to convert many amounts
+(or build a full cross-rate matrix) against it in a single pass
+"""
+
+import time
+from typing import Dict, List, Sequence, Union
+
+import numpy as np
+
+QUOTE_CURRENCY = "USD"
+
+
+class RateSnapshot:
+    """
+    USD value of one unit of each currency, captured at one moment so that
+    every conversion in a request uses the same rates.
+    """
+
+    def __init__(self, usd_rates: Dict[str, float], sources: Dict[str, str] = None):
+        self.currencies: List[str] = list(usd_rates)
+        self.index = {currency: i for i, currency in enumerate(self.currencies)}
+        self.usd_rates = np.array([usd_rates[currency] for currency in self.currencies], dtype=np.float64)
+        self.sources = dict(sources or {})
+        self.taken_at = time.time()
+
+    def __contains__(self, currency: str) -> bool:
+        return currency in self.index
+
+    def indices(self, currencies: Union[str, Sequence[str]], count: int) -> np.ndarray:
+        """
+        Positions of currencies in the snapshot, -1 for unknown ones. A
+        single currency is broadcast to count entries.
+        """
+        if isinstance(currencies, str):
+            return np.full(count, self.index.get(currencies, -1), dtype=np.int64)
+        return np.fromiter(
+            (self.index.get(currency, -1) for currency in currencies), dtype=np.int64, count=len(currencies)
+        )
+
+    def convert(
+        self,
+        amounts: Sequence[float],
+        from_currencies: Union[str, Sequence[str]],
+        to_currencies: Union[str, Sequence[str]]
+    ) -> np.ndarray:
+        """
+        amount * usd[from] / usd[to] for every element; NaN where either
+        currency is unknown.
+        """
+        amounts = np.asarray(amounts, dtype=np.float64)
+        from_idx = self.indices(from_currencies, amounts.size)
+        to_idx = self.indices(to_currencies, amounts.size)
+        if from_idx.size != amounts.size or to_idx.size != amounts.size:
+            raise ValueError("from/to lists must be the same length as amounts")
+
+        # Index position -1 would silently pick the last currency; mask it out
+        rates_with_nan = np.append(self.usd_rates, np.nan)
+        from_rates = rates_with_nan[np.where(from_idx < 0, len(self.usd_rates), from_idx)]
+        to_rates = rates_with_nan[np.where(to_idx < 0, len(self.usd_rates), to_idx)]
+        with np.errstate(divide="ignore", invalid="ignore"):
+            results = amounts * from_rates / to_rates
+        results[~np.isfinite(results)] = np.nan
+        return results
+
+    def cross_matrix(self) -> np.ndarray:
+        """matrix[i, j] = units of currency j per unit of currency i"""
+        with np.errstate(divide="ignore", invalid="ignore"):
+            return np.divide.outer(self.usd_rates, self.usd_rates)
+
+    def to_dict(self, include_matrix: bool = False) -> Dict:
+        snapshot = {
+            "currencies": self.currencies,
+            "usdRates": dict(zip(self.currencies, self.usd_rates.tolist())),
+            "sources": self.sources,
+            "takenAt": self.taken_at
+        }
+        if include_matrix:
+            snapshot["matrix"] = to_json_list(self.cross_matrix())
+        return snapshot
+
+
+def to_json_list(values: np.ndarray) -> list:
+    """ndarray -> nested lists with NaN/inf as None, since JSON has no NaN"""
+    as_object = values.astype(object)
+    as_object[~np.isfinite(values)] = None
+    return as_object.tolist()
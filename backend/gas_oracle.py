@@ -0,0 +1,227 @@
+# backend/gas_oracle.py
+"""
+Gas Oracle
+Shared fee data and gas limits for transaction builders. Fee fields are
+fetched in one batched request and reused for fee_ttl seconds (about a
+block); gas estimates are memoized per contract function selector for
+calls whose cost doesn't depend on their arguments.
+"""
+
+import math
+import os
+import threading
+import time
+from typing import Dict, Optional, Tuple
+
+from eth_utils import function_abi_to_4byte_selector, to_hex
+from web3 import Web3
+
+
+class GasOracle:
+    """
+    Builds the 'gas' and fee fields for a transaction.
+
+    On chains whose blocks carry a base fee the fee fields are EIP-1559
+    (maxFeePerGas = 2 * baseFee + tip, which survives several full
+    blocks of base fee growth); otherwise a legacy gasPrice is used.
+    Gas limits come from estimate_gas * margin, cached per
+    (contract, selector) for estimate_ttl seconds and keeping the largest
+    estimate seen, so calls whose cost depends on storage state don't
+    shrink the limit. Calls whose cost depends on their arguments (e.g.
+    fractionalizeNFT deploying a token with caller-chosen name and symbol)
+    pass memoize=False and are estimated every time.
+    """
+
+    def __init__(
+        self,
+        w3: Web3,
+        fee_ttl: float = 3.0,
+        margin: float = 1.2,
+        estimate_ttl: float = 600.0,
+        priority_fee: Optional[int] = None,
+        mode: str = "auto"
+    ):
+        if mode not in ("auto", "legacy", "eip1559"):
+            raise ValueError(f"Unknown gas mode '{mode}'")
+        self.w3 = w3
+        self.fee_ttl = fee_ttl
+        self.margin = margin
+        self.estimate_ttl = estimate_ttl
+        self.priority_fee = priority_fee
+        self.mode = mode
+
+        self._lock = threading.Lock()
+        self._fees: Optional[Dict] = None
+        # Block the cached fees were read at; reported in stats only, the
+        # cache itself expires on fee_ttl
+        self._fees_block: Optional[int] = None
+        self._fees_at = 0.0
+        # (contract address, selector) -> (largest estimate, estimated_at)
+        self._estimates: Dict[Tuple[str, str], Tuple[int, float]] = {}
+        self._stats = {
+            "feeRequests": 0, "feeHits": 0,
+            "estimates": 0, "estimateHits": 0, "estimateFailures": 0
+        }
+
+    # --- FEES ---
+
+    def fees(self) -> Dict:
+        """
+        Fee fields for a transaction sent now: either
+        {"maxFeePerGas", "maxPriorityFeePerGas"} or {"gasPrice"}.
+        """
+        with self._lock:
+            if self._fees is not None and time.time() - self._fees_at < self.fee_ttl:
+                self._stats["feeHits"] += 1
+                return dict(self._fees)
+
+        fees, block_number = self._fetch_fees()
+        with self._lock:
+            self._fees = fees
+            self._fees_block = block_number
+            self._fees_at = time.time()
+            self._stats["feeRequests"] += 1
+        return dict(fees)
+
+    def _fetch_fees(self) -> Tuple[Dict, Optional[int]]:
+        """Latest block, suggested tip and gas price in a single round trip"""
+        requests = [
+            ("eth_getBlockByNumber", ["latest", False]),
+            ("eth_maxPriorityFeePerGas", []),
+            ("eth_gasPrice", []),
+        ]
+        responses = self.w3.provider.make_batch_request(requests)
+        if not isinstance(responses, list):
+            # Node refused the batch as a whole; fall back to one call each
+            responses = [self.w3.provider.make_request(method, params) for method, params in requests]
+        block, tip, gas_price = (
+            response.get("result") if isinstance(response, dict) else None for response in responses
+        )
+        if gas_price is None:
+            # Nothing usable came back; let web3 raise the real error
+            gas_price = self.w3.eth.gas_price
+
+        block_number = self._to_int(block.get("number")) if block else None
+        base_fee = self._to_int(block.get("baseFeePerGas")) if block else None
+        gas_price = self._to_int(gas_price)
+
+        use_1559 = self.mode == "eip1559" or (self.mode == "auto" and base_fee is not None)
+        if not use_1559:
+            return {"gasPrice": gas_price}, block_number
+
+        if self.priority_fee is not None:
+            tip = self.priority_fee
+        elif tip is not None:
+            tip = self._to_int(tip)
+        else:
+            # Node doesn't implement eth_maxPriorityFeePerGas
+            tip = max(gas_price - (base_fee or 0), 0)
+        if base_fee is None:
+            base_fee = max(gas_price - tip, 0)
+        return {"maxFeePerGas": 2 * base_fee + tip, "maxPriorityFeePerGas": tip}, block_number
+
+    def bump(self, fees: Dict, factor: float) -> Dict:
+        """
+        Fees for a replacement transaction: every field of fees raised by
+        factor (nodes require >= 10% on each), and never below current fees.
+        """
+        current = self.fees()
+        if set(current) != set(fees):
+            # Mode changed since the original was sent; price off the original
+            current = {}
+        return {
+            field: max(int(value * factor) + 1, current.get(field, 0))
+            for field, value in fees.items()
+        }
+
+    # --- GAS LIMITS ---
+
+    def gas_limit(self, fn, sender: str, default: int, value: int = 0, memoize: bool = True) -> int:
+        """
+        Gas limit for a bound contract call: the memoized estimate for its
+        selector plus the safety margin, or default if estimation fails.
+        With memoize=False this call's own estimate is used and not cached.
+        """
+        key = (fn.address.lower(), to_hex(function_abi_to_4byte_selector(fn.abi)))
+        now = time.time()
+        cached = None
+        if memoize:
+            with self._lock:
+                cached = self._estimates.get(key)
+                if cached and now - cached[1] < self.estimate_ttl:
+                    self._stats["estimateHits"] += 1
+                    return math.ceil(cached[0] * self.margin)
+
+        try:
+            estimate = fn.estimate_gas({"from": sender, "value": value})
+        except Exception as e:
+            with self._lock:
+                self._stats["estimateFailures"] += 1
+            print(f"[Gas Oracle] estimate_gas failed for {fn.abi.get('name')}, using {default}: {e}")
+            return default
+
+        with self._lock:
+            self._stats["estimates"] += 1
+            if memoize:
+                if cached:
+                    estimate = max(estimate, cached[0])
+                self._estimates[key] = (estimate, now)
+        return math.ceil(estimate * self.margin)
+
+    def tx_params(
+        self, fn, sender: str, default_gas: int, fees: Optional[Dict] = None, memoize: bool = True, **extra
+    ) -> Dict:
+        """
+        Everything build_transaction would otherwise fetch over RPC:
+        from, gas and fee fields, plus any extra fields (nonce, value, ...).
+        """
+        return {
+            "from": sender,
+            "gas": self.gas_limit(fn, sender, default_gas, extra.get("value", 0), memoize=memoize),
+            **(fees if fees is not None else self.fees()),
+            **extra,
+        }
+
+    def stats(self) -> Dict:
+        with self._lock:
+            return {
+                **self._stats,
+                "mode": self.mode,
+                "fees": dict(self._fees) if self._fees else None,
+                "feesBlock": self._fees_block,
+                "feesAge": round(time.time() - self._fees_at, 1) if self._fees else None,
+                "cachedEstimates": {
+                    f"{address}:{selector}": estimate
+                    for (address, selector), (estimate, _) in self._estimates.items()
+                },
+            }
+
+    @staticmethod
+    def _to_int(value) -> Optional[int]:
+        if value is None:
+            return None
+        return int(value, 16) if isinstance(value, str) else int(value)
+
+
+_oracles: Dict[int, GasOracle] = {}
+_oracles_lock = threading.Lock()
+
+
+def get_gas_oracle(w3: Web3) -> GasOracle:
+    """
+    The shared gas oracle for a Web3 instance (configured from GAS_* env
+    vars), so every builder reuses the same fee data and estimates.
+    """
+    with _oracles_lock:
+        oracle = _oracles.get(id(w3))
+        if oracle is None:
+            priority_fee = os.getenv("GAS_PRIORITY_FEE")
+            oracle = _oracles[id(w3)] = GasOracle(
+                w3,
+                fee_ttl=float(os.getenv("GAS_FEE_TTL", "3")),
+                margin=float(os.getenv("GAS_LIMIT_MARGIN", "1.2")),
+                estimate_ttl=float(os.getenv("GAS_ESTIMATE_TTL", "600")),
+                priority_fee=int(priority_fee) if priority_fee else None,
+                mode=os.getenv("GAS_MODE", "auto")
+            )
+        return oracle
@@ -0,0 +1,221 @@
+# backend/groq_pool.py
+"""
+Groq Client Pool
+Spreads completions across several API keys using the rate-limit headers
+Groq returns, with jittered backoff when every key is throttled
+"""
+
+import random
+import re
+import threading
+import time
+from typing import Dict, List, Optional
+
+from groq import APIConnectionError, APIStatusError, Groq, RateLimitError
+
+_DURATION_PART = re.compile(r"(\d+(?:\.\d+)?)(ms|h|m|s)")
+_DURATION_SECONDS = {"h": 3600.0, "m": 60.0, "s": 1.0, "ms": 0.001}
+
+
+class GroqRateLimitedError(Exception):
+    """Every key stayed rate limited through all retries"""
+
+    def __init__(self, message: str, retry_after: float):
+        super().__init__(message)
+        self.retry_after = retry_after
+
+
+class GroqUnavailableError(Exception):
+    """Groq kept failing with server or connection errors through all retries"""
+
+
+def parse_duration(value: Optional[str]) -> Optional[float]:
+    """Parse Groq reset headers like '2m59.56s', '7.66s' or '250ms' into seconds"""
+    if not value:
+        return None
+    try:
+        return float(value)
+    except ValueError:
+        pass
+    parts = _DURATION_PART.findall(value)
+    if not parts:
+        return None
+    return sum(float(amount) * _DURATION_SECONDS[unit] for amount, unit in parts)
+
+
+def _int_header(headers, name: str) -> Optional[int]:
+    try:
+        return int(headers.get(name))
+    except (TypeError, ValueError):
+        return None
+
+
+class GroqKeyState:
+    """Client plus the last known rate-limit budget for one API key"""
+
+    def __init__(self, index: int, api_key: str, base_url: str = None):
+        self.index = index
+        # SDK retries are disabled; the pool decides where a retry goes
+        self.client = Groq(api_key=api_key, base_url=base_url, max_retries=0)
+        self.remaining_requests: Optional[int] = None
+        self.remaining_tokens: Optional[int] = None
+        self.requests_reset_at = 0.0
+        self.tokens_reset_at = 0.0
+        self.cooldown_until = 0.0
+        self.in_flight = 0
+        self.calls = 0
+        self.rate_limited = 0
+
+    def headroom(self, now: float, estimated_tokens: int) -> float:
+        """How many more calls of this size the key can take right now"""
+        if now < self.cooldown_until:
+            return -1.0
+
+        requests_left = float("inf")
+        if self.remaining_requests is not None and now < self.requests_reset_at:
+            requests_left = self.remaining_requests - self.in_flight
+
+        tokens_left = float("inf")
+        if self.remaining_tokens is not None and now < self.tokens_reset_at:
+            tokens_left = (self.remaining_tokens - self.in_flight * estimated_tokens) / max(estimated_tokens, 1)
+
+        # Unknown budgets rank equal; prefer the least busy key among them
+        return min(requests_left, tokens_left, 1e9 - self.in_flight)
+
+    def update(self, headers, now: float):
+        remaining_requests = _int_header(headers, "x-ratelimit-remaining-requests")
+        remaining_tokens = _int_header(headers, "x-ratelimit-remaining-tokens")
+        if remaining_requests is not None:
+            self.remaining_requests = remaining_requests
+            self.requests_reset_at = now + (parse_duration(headers.get("x-ratelimit-reset-requests")) or 60.0)
+        if remaining_tokens is not None:
+            self.remaining_tokens = remaining_tokens
+            self.tokens_reset_at = now + (parse_duration(headers.get("x-ratelimit-reset-tokens")) or 60.0)
+
+    def to_dict(self, now: float) -> Dict:
+        return {
+            "key": self.index,
+            "remainingRequests": self.remaining_requests if now < self.requests_reset_at else None,
+            "remainingTokens": self.remaining_tokens if now < self.tokens_reset_at else None,
+            "coolingDownFor": max(0.0, round(self.cooldown_until - now, 2)),
+            "inFlight": self.in_flight,
+            "calls": self.calls,
+            "rateLimited": self.rate_limited
+        }
+
+
+class GroqClientPool:
+    """Schedules each completion onto the key with the most headroom"""
+
+    def __init__(
+        self,
+        api_keys: List[str],
+        base_url: str = None,
+        max_attempts: int = 5,
+        base_backoff: float = 0.5,
+        max_backoff: float = 20.0,
+        max_wait: float = 30.0
+    ):
+        if not api_keys:
+            raise ValueError("GroqClientPool needs at least one API key")
+        self.keys = [GroqKeyState(index, key, base_url) for index, key in enumerate(api_keys)]
+        self.max_attempts = max_attempts
+        self.base_backoff = base_backoff
+        self.max_backoff = max_backoff
+        self.max_wait = max_wait
+        self._lock = threading.Lock()
+
+    def chat(self, estimated_tokens: int = 1000, **kwargs):
+        """
+        chat.completions.create on the best key, retrying rate limits and
+        transient failures on other keys with jittered exponential backoff.
+
+        Raises:
+            GroqRateLimitedError: every attempt was rate limited
+            GroqUnavailableError: attempts failed with 5xx / connection errors
+        """
+        last_error = None
+        # Any non-429 failure means Groq itself is unhealthy, not just busy
+        last_outage = None
+        for attempt in range(self.max_attempts):
+            key = self._acquire(estimated_tokens)
+            try:
+                raw = key.client.chat.completions.with_raw_response.create(**kwargs)
+                self._release(key, headers=raw.headers)
+                return raw.parse()
+
+            except RateLimitError as e:
+                retry_after = parse_duration(e.response.headers.get("retry-after")) or self._backoff(attempt)
+                self._release(key, headers=e.response.headers, cooldown=retry_after)
+                print(f"⚠️ Groq key #{key.index} rate limited, cooling down {retry_after:.1f}s")
+                last_error = e
+
+            except (APIConnectionError, APIStatusError) as e:
+                self._release(key)
+                status = getattr(e, "status_code", None)
+                if status is not None and status < 500:
+                    raise
+                print(f"⚠️ Groq key #{key.index} transient error: {e}")
+                last_error = last_outage = e
+                time.sleep(self._backoff(attempt))
+
+        if last_outage is not None:
+            raise GroqUnavailableError(f"Groq API unavailable after {self.max_attempts} attempts: {last_outage}")
+        retry_after = self._seconds_until_available()
+        raise GroqRateLimitedError(f"Groq API rate limited on all {self.max_attempts} attempts: {last_error}", retry_after)
+
+    def stats(self) -> Dict:
+        now = time.time()
+        with self._lock:
+            return {"keys": [key.to_dict(now) for key in self.keys]}
+
+    # --- SCHEDULING ---
+
+    def _acquire(self, estimated_tokens: int) -> GroqKeyState:
+        """Pick the key with the most headroom, waiting out cooldowns if all are throttled"""
+        deadline = time.time() + self.max_wait
+        while True:
+            now = time.time()
+            with self._lock:
+                best = max(self.keys, key=lambda k: k.headroom(now, estimated_tokens))
+                if best.headroom(now, estimated_tokens) > 0:
+                    best.in_flight += 1
+                    best.calls += 1
+                    return best
+                wait = self._seconds_until_available_locked(now)
+
+            if now + wait > deadline:
+                raise GroqRateLimitedError("All Groq API keys are rate limited", wait)
+            # Jitter so throttled workers don't wake up in lockstep
+            time.sleep(wait + random.uniform(0, self.base_backoff))
+
+    def _release(self, key: GroqKeyState, headers=None, cooldown: float = None):
+        now = time.time()
+        with self._lock:
+            key.in_flight -= 1
+            if headers is not None:
+                key.update(headers, now)
+            if cooldown is not None:
+                key.rate_limited += 1
+                key.cooldown_until = max(key.cooldown_until, now + cooldown)
+
+    def _backoff(self, attempt: int) -> float:
+        # Full jitter: uniform between 0 and the exponential cap
+        return random.uniform(0, min(self.max_backoff, self.base_backoff * (2 ** attempt)))
+
+    def _seconds_until_available(self) -> float:
+        with self._lock:
+            return self._seconds_until_available_locked(time.time())
+
+    def _seconds_until_available_locked(self, now: float) -> float:
+        waits = []
+        for key in self.keys:
+            if now < key.cooldown_until:
+                waits.append(key.cooldown_until - now)
+            elif key.remaining_requests is not None and key.remaining_requests <= key.in_flight and now < key.requests_reset_at:
+                waits.append(key.requests_reset_at - now)
+            elif key.remaining_tokens is not None and now < key.tokens_reset_at:
+                waits.append(key.tokens_reset_at - now)
+            else:
+                waits.append(0.0)
+        return max(0.0, min(waits))
@@ -4,71 +4,261 @@ Uses Llama 3.2 Vision for document extraction
 """
 
 import os
+import json
 import base64
-from groq import Groq
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List
 from dotenv import load_dotenv
+from groq_pool import GroqClientPool, GroqRateLimitedError, GroqUnavailableError
+from json_stream import IncrementalReportParser, extract_json_object
+from text_chunking import estimate_tokens, split_text, strip_boilerplate
+from metrics import histogram
 
 load_dotenv()
 
+SYSTEM_PROMPT = "You are a specialized document verification AI. Analyze the provided text and return ONLY valid JSON."
+
+# Typical report size, used when budgeting tokens per key
+COMPLETION_TOKEN_ESTIMATE = 1000
+
+NOT_FOUND_VALUES = ("", "not found", "n/a", "none", "null")
+
+ANALYZE_SECONDS = histogram("aria_groq_analyze_seconds", "GroqService.analyze_text latency", ["outcome"])
+
+
+def parse_report(response_text: str) -> Dict:
+    """Parse the model's JSON report, ignoring markdown fences and trailing text"""
+    return extract_json_object(response_text)
+
+
+def _unique(items: List) -> List:
+    seen = []
+    for item in items:
+        if item not in seen:
+            seen.append(item)
+    return seen
+
+
+def merge_chunk_reports(reports: List[Dict], weights: List[int], chunks_total: int = None) -> Dict:
+    """
+    Merge per-chunk reports into one report with the single-call schema.
+
+    Fields take the first value actually found in any chunk, list fields are
+    unioned, and scores are averaged weighted by chunk size. chunks_analyzed
+    and chunks_total record coverage; partial_analysis is set when chunks
+    were dropped or failed, so callers can tell the report doesn't cover
+    the whole document.
+    """
+    chunks_total = chunks_total or len(reports)
+    merged = {"document_type": reports[0].get("document_type"), "extracted_data": {}}
+
+    for report in reports:
+        for key, value in (report.get("extracted_data") or {}).items():
+            current = merged["extracted_data"].get(key)
+            if isinstance(value, list):
+                merged["extracted_data"][key] = _unique((current if isinstance(current, list) else []) + value)
+            elif current is None or str(current).strip().lower() in NOT_FOUND_VALUES:
+                merged["extracted_data"][key] = value
+
+    for field in ("authenticity_score", "confidence"):
+        scored = [(r[field], w) for r, w in zip(reports, weights) if isinstance(r.get(field), (int, float))]
+        if scored:
+            merged[field] = round(sum(v * w for v, w in scored) / sum(w for _, w in scored))
+
+    found = _unique([m for r in reports for m in (r.get("authenticity_details") or {}).get("official_markers_found", [])])
+    missing = _unique([m for r in reports for m in (r.get("authenticity_details") or {}).get("missing_markers", [])])
+    assessments = _unique([(r.get("authenticity_details") or {}).get("quality_assessment") for r in reports])
+    merged["authenticity_details"] = {
+        "official_markers_found": found,
+        # A marker only counts as missing if no chunk found it
+        "missing_markers": [m for m in missing if m not in found],
+        "quality_assessment": " ".join(a for a in assessments if a)
+    }
+
+    summaries = _unique([r.get("verification_summary") for r in reports])
+    merged["verification_summary"] = " ".join(s for s in summaries if s)
+    merged["suspicious_elements"] = _unique([e for r in reports for e in (r.get("suspicious_elements") or [])])
+
+    notes = _unique([r.get("extraction_notes") for r in reports])
+    if len(reports) < chunks_total:
+        coverage = f"Only {len(reports)} of {chunks_total} document chunks were analyzed; the rest of the document is not covered."
+    else:
+        coverage = f"Document analyzed in {len(reports)} chunks."
+    notes = [n for n in notes if n] + [coverage]
+    merged["extraction_notes"] = " ".join(notes)
+    merged["chunks_analyzed"] = len(reports)
+    merged["chunks_total"] = chunks_total
+    merged["partial_analysis"] = len(reports) < chunks_total
+    return merged
+
+
+def is_partial_report(report: Dict) -> bool:
+    """True for merged reports missing some of the document's chunks"""
+    return bool(report.get("partial_analysis"))
+
 class GroqService:
     """Service for document analysis using Groq's Llama 3.3 (Text Only)"""
     
     def __init__(self):
+        # GROQ_API_KEYS (comma separated) spreads load over several keys;
+        # GROQ_API_KEY alone still works
+        self.api_keys = [key.strip() for key in os.getenv("GROQ_API_KEYS", "").split(",") if key.strip()]
         self.api_key = os.getenv("GROQ_API_KEY")
-        if not self.api_key:
+        if self.api_key and self.api_key not in self.api_keys:
+            self.api_keys.insert(0, self.api_key)
+        if not self.api_keys:
             print("⚠️ GROQ_API_KEY not found in environment variables")
             self.client = None
+            self.pool = None
             return
         
-        self.client = Groq(api_key=self.api_key)
+        self.pool = GroqClientPool(self.api_keys, base_url=os.getenv("GROQ_BASE_URL"))
+        # Kept for callers that check the service is configured
+        self.client = self.pool.keys[0].client
+        print(f"✅ Groq client pool ready with {len(self.api_keys)} key(s)")
         self.model = "llama-3.3-70b-versatile"  # High-performance Text Model
+
+        # Documents longer than this are split and analyzed chunk by chunk
+        self.chunk_tokens = int(os.getenv("GROQ_CHUNK_TOKENS", "6000"))
+        self.max_chunks = int(os.getenv("GROQ_MAX_CHUNKS", "8"))
+        self.chunk_concurrency = int(os.getenv("GROQ_CHUNK_CONCURRENCY", "4"))
     
-    def analyze_text(self, text_content: str, prompt: str) -> str:
+    @ANALYZE_SECONDS.time()
+    def analyze_text(self, text_content: str, prompt: str, on_partial=None) -> str:
         """
         Analyze text content using Groq's Llama 3.3
         
+        Long documents are split to the chunk token budget, the chunks are
+        analyzed concurrently and their reports merged, so latency stays at
+        roughly one chunk's round-trip.
+
         Args:
             text_content: Extracted text from document
             prompt: Analysis prompt
+            on_partial: Optional callback; when given, single-chunk documents
+                are streamed and it receives each top-level report field
+                (dict) as soon as that field is complete
             
         Returns:
             AI response text
+
+        Raises:
+            GroqRateLimitedError: if any chunk was rate limited
+            GroqUnavailableError: if no chunk succeeded and Groq was down
         """
         if not self.client:
              raise ValueError("Groq client not initialized. Check GROQ_API_KEY.")
 
-        try:
-            # Call Groq API with Text
-            response = self.client.chat.completions.create(
-                model=self.model,
-                messages=[
-                    {
-                        "role": "system",
-                        "content": "You are a specialized document verification AI. Analyze the provided text and return ONLY valid JSON."
-                    },
-                    {
-                        "role": "user",
-                        "content": f"{prompt}\n\n--- DOCUMENT CONTENT ---\n{text_content}"
-                    }
-                ],
-                temperature=0.1,
-                max_tokens=4096,
-                top_p=1,
-                stream=False
+        text_content = strip_boilerplate(text_content)
+        budget = max(self.chunk_tokens - estimate_tokens(prompt), 500)
+        chunks = split_text(text_content, budget)
+        chunks_total = len(chunks)
+
+        if len(chunks) == 1:
+            if on_partial:
+                return self._complete_stream(prompt, text_content, on_partial)
+            return self._complete(prompt, text_content)
+
+        if len(chunks) > self.max_chunks:
+            print(f"⚠️ Document needs {len(chunks)} chunks, analyzing the first {self.max_chunks}")
+            chunks = chunks[:self.max_chunks]
+
+        def analyze_chunk(index: int) -> Dict:
+            chunk_prompt = (
+                f"{prompt}\n\nNOTE: This is part {index + 1} of {len(chunks)} of the document. "
+                f"Report only what appears in this part; use \"Not found\" for fields it does not contain."
             )
-            
+            return parse_report(self._complete(chunk_prompt, chunks[index]))
+
+        reports, weights, errors = [], [], []
+        with ThreadPoolExecutor(max_workers=self.chunk_concurrency) as pool:
+            futures = [pool.submit(analyze_chunk, index) for index in range(len(chunks))]
+            for chunk, future in zip(chunks, futures):
+                try:
+                    reports.append(future.result())
+                    weights.append(len(chunk))
+                except Exception as e:
+                    print(f"⚠️ Chunk analysis failed: {e}")
+                    errors.append(e)
+
+        # Surface pool errors so callers can map them (502 / 429 + Retry-After)
+        unavailable = [e for e in errors if isinstance(e, GroqUnavailableError)]
+        rate_limited = [e for e in errors if isinstance(e, GroqRateLimitedError)]
+        if not reports and unavailable:
+            raise unavailable[0]
+        if rate_limited:
+            # Chunks that would succeed on retry shouldn't be minted as a partial report
+            raise max(rate_limited, key=lambda e: e.retry_after)
+        if not reports:
+            raise ValueError("All document chunks failed analysis")
+
+        merged = merge_chunk_reports(reports, weights, chunks_total)
+        if merged["partial_analysis"]:
+            print(f"⚠️ Partial analysis: {len(reports)} of {chunks_total} chunks")
+        if on_partial:
+            on_partial(merged)
+        return json.dumps(merged)
+
+    def _complete(self, prompt: str, text_content: str) -> str:
+        """Single chat completion over one piece of document text"""
+        try:
+            response = self._create(prompt, text_content, stream=False)
             return response.choices[0].message.content
             
         except Exception as e:
             print(f"❌ Groq API Error: {e}")
             raise e
+
+    def _complete_stream(self, prompt: str, text_content: str, on_partial) -> str:
+        """Streamed completion that reports fields as they finish parsing"""
+        try:
+            parser = IncrementalReportParser()
+            for chunk in self._create(prompt, text_content, stream=True):
+                if not chunk.choices:
+                    continue
+                delta = chunk.choices[0].delta.content
+                if not delta:
+                    continue
+                completed = parser.feed(delta)
+                if completed:
+                    try:
+                        on_partial(completed)
+                    except Exception as e:
+                        print(f"⚠️ Partial report callback failed: {e}")
+            return parser.text
+
+        except Exception as e:
+            print(f"❌ Groq API Error: {e}")
+            raise e
+
+    def _create(self, prompt: str, text_content: str, stream: bool):
+        # Call Groq API with Text on whichever key has the most headroom
+        return self.pool.chat(
+            estimated_tokens=estimate_tokens(prompt) + estimate_tokens(text_content) + COMPLETION_TOKEN_ESTIMATE,
+            model=self.model,
+            messages=[
+                {
+                    "role": "system",
+                    "content": SYSTEM_PROMPT
+                },
+                {
+                    "role": "user",
+                    "content": f"{prompt}\n\n--- DOCUMENT CONTENT ---\n{text_content}"
+                }
+            ],
+            temperature=0.1,
+            max_tokens=4096,
+            top_p=1,
+            stream=stream
+        )
     
     def check_connection(self) -> bool:
         """Test Groq API connection"""
         if not self.client: return False
         try:
             # Simple test call
-            response = self.client.chat.completions.create(
+            response = self.pool.chat(
+                estimated_tokens=20,
                 model=self.model,
                 messages=[{"role": "user", "content": "Hi"}],
                 max_tokens=10
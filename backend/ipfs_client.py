@@ -0,0 +1,345 @@
+# backend/ipfs_client.py
+"""
+IPFS Client
+Pins NFT metadata through Pinata over a pooled session with timeouts and
+retries. The CID of each pin is computed locally, so callers can mint
+against it while the upload is still in flight.
+"""
+
+import hashlib
+import json
+import os
+import random
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Dict, Optional, Tuple
+
+import requests
+from requests.adapters import HTTPAdapter
+
+from metrics import counter, histogram
+from pin_index import PinIndex, canonical_json, content_hash
+
+# ipfs add splits files into 256 KiB chunks; anything that fits in one
+# chunk is a single dag-pb node whose hash we can reproduce here
+CHUNK_SIZE = 262144
+RETRY_STATUSES = {429, 500, 502, 503, 504}
+BASE58_ALPHABET = "123456789ABCDEFGHJKLMNPQRSTUVWXYZabcdefghijkmnopqrstuvwxyz"
+
+PIN_SECONDS = histogram("aria_ipfs_pin_seconds", "Pinata upload time including retries", ["outcome"])
+PINS_TOTAL = counter("aria_ipfs_pins_total", "Metadata pin requests by result", ["result"])
+
+
+class PinQueueFullError(Exception):
+    """Raised when max_queue pins are already waiting"""
+
+
+class PinningError(Exception):
+    """Raised when Pinata rejects a pin or keeps failing after retries"""
+
+
+# --- LOCAL CID COMPUTATION ---
+
+def _varint(value: int) -> bytes:
+    out = bytearray()
+    while True:
+        byte = value & 0x7F
+        value >>= 7
+        if value:
+            out.append(byte | 0x80)
+        else:
+            out.append(byte)
+            return bytes(out)
+
+
+def _field(number: int, payload: bytes) -> bytes:
+    """Length-delimited protobuf field"""
+    return _varint(number << 3 | 2) + _varint(len(payload)) + payload
+
+
+def _base58(data: bytes) -> str:
+    number = int.from_bytes(data, "big")
+    encoded = ""
+    while number:
+        number, remainder = divmod(number, 58)
+        encoded = BASE58_ALPHABET[remainder] + encoded
+    zeros = len(data) - len(data.lstrip(b"\0"))
+    return "1" * zeros + encoded
+
+
+def compute_cid(content: bytes) -> Optional[str]:
+    """
+    CIDv0 that `ipfs add` (and Pinata's pinFileToIPFS) assigns to content
+    with the default chunker, or None for content larger than one chunk.
+    """
+    if len(content) > CHUNK_SIZE:
+        return None
+    # UnixFS Data { Type: File, Data: content, filesize: len }
+    unixfs = _varint(1 << 3) + _varint(2)
+    if content:
+        unixfs += _field(2, content)
+    unixfs += _varint(3 << 3) + _varint(len(content))
+    # dag-pb PBNode { Data } with no links
+    node = _field(1, unixfs)
+    multihash = bytes([0x12, 0x20]) + hashlib.sha256(node).digest()
+    return _base58(multihash)
+
+
+# --- CLIENT ---
+
+class PinTicket:
+    """Handle for a queued pin"""
+
+    def __init__(self, content: bytes, name: str, key: Optional[str] = None):
+        self.content = content
+        self.name = name
+        # Content hash in the pin index
+        self.key = key
+        # Known before the upload finishes for single-chunk content
+        self.cid: Optional[str] = compute_cid(content)
+        self.submitted_at = time.time()
+        # True when an earlier pin of the same content was reused
+        self.deduplicated = False
+        # Resolves to the CID Pinata reports
+        self.pinned: Future = Future()
+
+    def result(self, timeout: Optional[float] = None) -> str:
+        return self.pinned.result(timeout=timeout)
+
+
+class PinataClient:
+    """
+    Pinata pinning over one pooled session.
+
+    Uploads run on up to max_concurrency workers with at most max_queue
+    pins waiting; submit() fails fast with PinQueueFullError beyond that
+    instead of letting requests pile up behind a slow Pinata. Connection
+    errors, timeouts, 429 and 5xx responses are retried with exponential
+    backoff and jitter (honouring Retry-After).
+
+    With an index, documents whose canonical JSON was pinned before (or
+    is being pinned right now) resolve to that CID without an upload.
+    """
+
+    def __init__(
+        self,
+        api_key: Optional[str],
+        secret_key: Optional[str],
+        api_url: str = "https://api.pinata.cloud",
+        gateway_url: str = "https://gateway.pinata.cloud/ipfs",
+        connect_timeout: float = 5.0,
+        read_timeout: float = 30.0,
+        retries: int = 3,
+        backoff: float = 0.5,
+        max_concurrency: int = 8,
+        max_queue: int = 64,
+        index: Optional[PinIndex] = None
+    ):
+        self.api_key = api_key
+        self.secret_key = secret_key
+        self.api_url = api_url.rstrip("/")
+        self.gateway_url = gateway_url.rstrip("/")
+        self.timeout = (connect_timeout, read_timeout)
+        self.retries = retries
+        self.backoff = backoff
+        self.max_concurrency = max_concurrency
+        self.max_queue = max_queue
+        self.index = index
+
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=max_concurrency)
+        self.session.mount("https://", adapter)
+        self.session.mount("http://", adapter)
+
+        self._executor = ThreadPoolExecutor(max_workers=max_concurrency, thread_name_prefix="ipfs-pin")
+        self._slots = threading.BoundedSemaphore(max_concurrency + max_queue)
+        self._lock = threading.Lock()
+        self._in_flight = 0
+        # content hash -> ticket still uploading
+        self._uploading: Dict[str, PinTicket] = {}
+        self._stats = {
+            "pinned": 0, "deduplicated": 0, "failed": 0, "retries": 0,
+            "rejected": 0, "cidMismatches": 0, "pinSeconds": 0.0
+        }
+
+    def gateway_link(self, cid: str) -> str:
+        return f"{self.gateway_url}/{cid}"
+
+    def submit(self, json_data: Dict, block: bool = False) -> PinTicket:
+        """
+        Queue json_data for pinning and return immediately; ticket.cid is
+        already set unless the document is larger than one chunk. With
+        block=True, wait for queue space instead of raising.
+
+        Raises:
+            PinQueueFullError: max_concurrency + max_queue pins are outstanding
+        """
+        self._check_keys()
+        key = content_hash(json_data) if self.index else None
+        if key:
+            existing = self._find_existing(key)
+            if existing:
+                return existing
+
+        ticket = PinTicket(canonical_json(json_data, keep_volatile=True), json_data.get("name", "rwa_metadata.json"), key)
+        if not self._slots.acquire(blocking=block):
+            with self._lock:
+                self._stats["rejected"] += 1
+            PINS_TOTAL.inc(result="rejected")
+            raise PinQueueFullError(f"IPFS pin queue is full ({self.max_queue} waiting)")
+        with self._lock:
+            if key:
+                # Lost a race with an identical submit; share its upload
+                uploading = self._uploading.get(key)
+                if uploading:
+                    self._stats["deduplicated"] += 1
+                    PINS_TOTAL.inc(result="deduplicated")
+                    self._slots.release()
+                    return uploading
+                self._uploading[key] = ticket
+            self._in_flight += 1
+        self._executor.submit(self._run, ticket)
+        return ticket
+
+    def _find_existing(self, key: str) -> Optional[PinTicket]:
+        """A ticket for content already pinned or uploading, or None"""
+        with self._lock:
+            uploading = self._uploading.get(key)
+            if uploading:
+                self._stats["deduplicated"] += 1
+                PINS_TOTAL.inc(result="deduplicated")
+                return uploading
+        cid = self.index.get(key)
+        if not cid:
+            return None
+        ticket = PinTicket(b"", "", key)
+        ticket.cid = cid
+        ticket.deduplicated = True
+        ticket.pinned.set_result(cid)
+        with self._lock:
+            self._stats["deduplicated"] += 1
+        PINS_TOTAL.inc(result="deduplicated")
+        return ticket
+
+    def pin_json(self, json_data: Dict, timeout: Optional[float] = None) -> Tuple[str, str]:
+        """Pin json_data and wait for it: returns (gateway_url, cid)"""
+        cid = self.submit(json_data).result(timeout=timeout)
+        return self.gateway_link(cid), cid
+
+    def _run(self, ticket: PinTicket):
+        started = time.time()
+        try:
+            cid = self._pin_file(ticket.content, ticket.name)
+            if ticket.cid and cid != ticket.cid:
+                # Shouldn't happen with default chunking; trust Pinata's answer
+                print(f"[IPFS] CID mismatch for {ticket.name}: computed {ticket.cid}, pinned {cid}")
+                with self._lock:
+                    self._stats["cidMismatches"] += 1
+            if ticket.key:
+                self.index.put(ticket.key, cid)
+            with self._lock:
+                self._stats["pinned"] += 1
+                self._stats["pinSeconds"] += time.time() - started
+            PIN_SECONDS.observe(time.time() - started, outcome="ok")
+            PINS_TOTAL.inc(result="pinned")
+            ticket.pinned.set_result(cid)
+        except Exception as e:
+            with self._lock:
+                self._stats["failed"] += 1
+            PIN_SECONDS.observe(time.time() - started, outcome="error")
+            PINS_TOTAL.inc(result="failed")
+            ticket.pinned.set_exception(e)
+        finally:
+            with self._lock:
+                self._in_flight -= 1
+                if ticket.key:
+                    self._uploading.pop(ticket.key, None)
+            self._slots.release()
+
+    def _pin_file(self, content: bytes, name: str) -> str:
+        """
+        Upload content as a file so Pinata stores exactly these bytes and
+        the resulting CID matches compute_cid.
+        """
+        headers = {
+            "pinata_api_key": self.api_key,
+            "pinata_secret_api_key": self.secret_key
+        }
+        data = {
+            "pinataMetadata": json.dumps({"name": name}),
+            "pinataOptions": json.dumps({"cidVersion": 0})
+        }
+        url = f"{self.api_url}/pinning/pinFileToIPFS"
+
+        for attempt in range(self.retries + 1):
+            retry_after = None
+            try:
+                response = self.session.post(
+                    url,
+                    files={"file": ("metadata.json", content, "application/json")},
+                    data=data,
+                    headers=headers,
+                    timeout=self.timeout
+                )
+                if response.status_code not in RETRY_STATUSES:
+                    if response.status_code >= 400:
+                        raise PinningError(f"Pinata returned {response.status_code}: {response.text[:200]}")
+                    cid = response.json().get("IpfsHash")
+                    if not cid:
+                        raise PinningError("Failed to get IPFS hash from Pinata response")
+                    return cid
+                error = PinningError(f"Pinata returned {response.status_code}")
+                retry_after = response.headers.get("Retry-After")
+            except (requests.ConnectionError, requests.Timeout) as e:
+                error = e
+
+            if attempt == self.retries:
+                raise PinningError(f"Pinning failed after {attempt + 1} attempts: {error}")
+            delay = self.backoff * (2 ** attempt) * (1 + random.random())
+            if retry_after:
+                try:
+                    delay = max(delay, float(retry_after))
+                except ValueError:
+                    pass
+            with self._lock:
+                self._stats["retries"] += 1
+            print(f"[IPFS] Pin attempt {attempt + 1} failed ({error}), retrying in {delay:.1f}s")
+            time.sleep(delay)
+
+    def _check_keys(self):
+        if not self.api_key or not self.secret_key:
+            raise Exception("Pinata API keys not set in .env")
+
+    def stats(self) -> Dict:
+        with self._lock:
+            stats = dict(self._stats)
+            stats["inFlight"] = self._in_flight
+        pinned = stats.pop("pinSeconds")
+        stats["avgPinSeconds"] = round(pinned / stats["pinned"], 3) if stats["pinned"] else None
+        stats["maxConcurrency"] = self.max_concurrency
+        stats["maxQueue"] = self.max_queue
+        stats["index"] = self.index.stats() if self.index else None
+        return stats
+
+
+def create_pinata_client() -> PinataClient:
+    """PinataClient configured from PINATA_* and PIN_INDEX_* env vars"""
+    index_path = os.getenv("PIN_INDEX_PATH", os.path.join(os.path.dirname(os.path.abspath(__file__)), "pin_index.db"))
+    index = PinIndex(
+        index_path,
+        max_entries=int(os.getenv("PIN_INDEX_MAX_ENTRIES", "20000")),
+        ttl=int(os.getenv("PIN_INDEX_TTL", str(30 * 24 * 3600)))
+    ) if index_path else None
+    return PinataClient(
+        os.getenv("PINATA_API_KEY"),
+        os.getenv("PINATA_SECRET_API_KEY"),
+        api_url=os.getenv("PINATA_API_URL", "https://api.pinata.cloud"),
+        gateway_url=os.getenv("PINATA_GATEWAY_URL", "https://gateway.pinata.cloud/ipfs"),
+        connect_timeout=float(os.getenv("PINATA_CONNECT_TIMEOUT", "5")),
+        read_timeout=float(os.getenv("PINATA_READ_TIMEOUT", "30")),
+        retries=int(os.getenv("PINATA_RETRIES", "3")),
+        max_concurrency=int(os.getenv("PINATA_CONCURRENCY", "8")),
+        max_queue=int(os.getenv("PINATA_QUEUE_SIZE", "64")),
+        index=index
+    )
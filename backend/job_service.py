@@ -0,0 +1,168 @@
+# backend/job_service.py
+"""
+Background Job Service
+Runs long pipelines (analyze + pin + mint) off the request thread and
+tracks their progress for polling / server-sent events
+"""
+
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, Iterator, Optional
+
+
+class Job:
+    """State of a single background job"""
+
+    def __init__(self, manager: "JobManager", kind: str):
+        self._manager = manager
+        self.id = uuid.uuid4().hex
+        self.kind = kind
+        self.status = "queued"
+        self.stage: Optional[str] = None
+        self.stages = []
+        # Fields of the result known before the job finishes (e.g. streamed AI report fields)
+        self.partial: Dict = {}
+        self.result = None
+        self.error = None
+        self.created_at = time.time()
+        self.updated_at = self.created_at
+        self.version = 0
+
+    def set_stage(self, stage: str):
+        """Mark the start of a pipeline stage"""
+        with self._manager._cond:
+            now = time.time()
+            if self.stages and self.stages[-1]["finishedAt"] is None:
+                self.stages[-1]["finishedAt"] = now
+            self.stage = stage
+            self.stages.append({"name": stage, "startedAt": now, "finishedAt": None})
+            self._touch()
+
+    def set_partial(self, fields: Dict):
+        """Merge early result fields into the job's partial view"""
+        with self._manager._cond:
+            self.partial.update(fields)
+            self._touch()
+
+    def fail(self, message: str, status_code: int = 500, details: str = None):
+        with self._manager._cond:
+            if self.finished:
+                return
+            self.error = {"message": message, "statusCode": status_code, "details": details}
+            self._finish("failed")
+
+    def succeed(self, result):
+        with self._manager._cond:
+            if self.finished:
+                return
+            self.result = result
+            self._finish("succeeded")
+
+    @property
+    def finished(self) -> bool:
+        return self.status in ("succeeded", "failed")
+
+    def to_dict(self) -> Dict:
+        return {
+            "jobId": self.id,
+            "kind": self.kind,
+            "status": self.status,
+            "stage": self.stage,
+            "stages": [dict(stage) for stage in self.stages],
+            "partial": dict(self.partial),
+            "result": self.result,
+            "error": self.error,
+            "createdAt": self.created_at,
+            "updatedAt": self.updated_at
+        }
+
+    # Caller must hold the manager lock
+    def _finish(self, status: str):
+        if self.finished:
+            return
+        now = time.time()
+        if self.stages and self.stages[-1]["finishedAt"] is None:
+            self.stages[-1]["finishedAt"] = now
+        self.status = status
+        self._touch()
+
+    def _touch(self):
+        self.updated_at = time.time()
+        self.version += 1
+        self._manager._cond.notify_all()
+
+
+class JobManager:
+    """Thread pool plus an in-memory job table with TTL expiry"""
+
+    def __init__(self, max_workers: int = 4, job_ttl: int = 3600):
+        self.max_workers = max_workers
+        self.job_ttl = job_ttl
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="job-worker")
+        self._cond = threading.Condition()
+        self._jobs: Dict[str, Job] = {}
+
+    def submit(self, fn, *args, kind: str = "job") -> Job:
+        """
+        Queue fn(job, *args) on the worker pool.
+
+        The return value becomes the job result; an exception fails the job
+        unless fn already failed it with a more specific error.
+        """
+        job = Job(self, kind)
+        with self._cond:
+            self._expire_old_jobs()
+            self._jobs[job.id] = job
+        self._executor.submit(self._run, job, fn, args)
+        return job
+
+    def get(self, job_id: str) -> Optional[Job]:
+        with self._cond:
+            return self._jobs.get(job_id)
+
+    def watch(self, job_id: str, heartbeat: float = 15.0) -> Iterator[Dict]:
+        """
+        Yield a snapshot of the job on every change until it finishes.
+
+        A snapshot is also yielded every `heartbeat` seconds so proxies
+        don't drop idle event streams.
+        """
+        last_version = -1
+        while True:
+            with self._cond:
+                job = self._jobs.get(job_id)
+                if not job:
+                    return
+                if job.version == last_version:
+                    self._cond.wait(timeout=heartbeat)
+                last_version = job.version
+                snapshot = job.to_dict()
+            yield snapshot
+            if snapshot["status"] in ("succeeded", "failed"):
+                return
+
+    def stats(self) -> Dict:
+        with self._cond:
+            counts = {"queued": 0, "running": 0, "succeeded": 0, "failed": 0}
+            for job in self._jobs.values():
+                counts[job.status] += 1
+        return {"workers": self.max_workers, **counts}
+
+    def _run(self, job: Job, fn, args):
+        with self._cond:
+            job.status = "running"
+            job._touch()
+        try:
+            job.succeed(fn(job, *args))
+        except Exception as e:
+            print(f"[Job Service] Job {job.id} failed: {e}")
+            job.fail(str(e))
+
+    def _expire_old_jobs(self):
+        """Drop finished jobs older than the TTL. Caller must hold the lock."""
+        cutoff = time.time() - self.job_ttl
+        expired = [job_id for job_id, job in self._jobs.items() if job.finished and job.updated_at < cutoff]
+        for job_id in expired:
+            del self._jobs[job_id]
@@ -0,0 +1,131 @@
+# backend/json_stream.py
+"""
+Incremental JSON Parsing
+Surfaces top-level fields of the AI report while the completion is still
+streaming, and parses the final report tolerantly
+"""
+
+import json
+from typing import Dict
+
+_decoder = json.JSONDecoder()
+
+
+def extract_json_object(text: str) -> Dict:
+    """
+    Parse the first JSON object in text, ignoring markdown fences or any
+    chatter the model adds before or after it.
+    """
+    text = text.replace("```json", "").replace("```", "")
+    start = text.find("{")
+    if start == -1:
+        raise json.JSONDecodeError("No JSON object found", text, 0)
+    report, _ = _decoder.raw_decode(text, start)
+    return report
+
+
+class IncrementalReportParser:
+    """
+    Streaming scanner over a JSON object.
+
+    feed() takes each text delta and returns the top-level fields whose
+    values completed in it, e.g. {"document_type": "invoice"} as soon as
+    that string closes, or the whole "extracted_data" object once its
+    closing brace arrives.
+    """
+
+    def __init__(self):
+        self.text = ""
+        self.fields: Dict = {}
+        self.complete = False
+        self._pos = 0
+        self._started = False
+        self._depth = 0
+        self._in_string = False
+        self._escape = False
+        self._string_start = None
+        # Top-level state: expecting a "key", a "colon", a "value" or a "comma"
+        self._expect = "key"
+        self._key = None
+        self._value_start = None
+
+    def feed(self, delta: str) -> Dict:
+        self.text += delta
+        completed = {}
+        text = self.text
+
+        while self._pos < len(text) and not self.complete:
+            i = self._pos
+            c = text[i]
+            self._pos += 1
+
+            if not self._started:
+                if c == "{":
+                    self._started = True
+                    self._depth = 1
+                continue
+
+            if self._in_string:
+                if self._escape:
+                    self._escape = False
+                elif c == "\\":
+                    self._escape = True
+                elif c == '"':
+                    self._in_string = False
+                    if self._depth == 1:
+                        if self._expect == "key":
+                            self._key = self._loads(text[self._string_start:i + 1])
+                            self._expect = "colon"
+                        elif self._expect == "value" and self._value_start == self._string_start:
+                            self._emit(text[self._value_start:i + 1], completed)
+                continue
+
+            if c == '"':
+                self._in_string = True
+                self._string_start = i
+                if self._depth == 1 and self._expect == "value" and self._value_start is None:
+                    self._value_start = i
+            elif c in "{[":
+                if self._depth == 1 and self._expect == "value" and self._value_start is None:
+                    self._value_start = i
+                self._depth += 1
+            elif c in "}]":
+                self._depth -= 1
+                if self._depth == 1 and self._expect == "value" and self._value_start is not None:
+                    self._emit(text[self._value_start:i + 1], completed)
+                elif self._depth == 0:
+                    if self._expect == "value" and self._value_start is not None:
+                        self._emit(text[self._value_start:i].strip(), completed)
+                    self.complete = True
+            elif self._depth == 1:
+                if c == ":" and self._expect == "colon":
+                    self._expect = "value"
+                    self._value_start = None
+                elif c == ",":
+                    if self._expect == "value" and self._value_start is not None:
+                        self._emit(text[self._value_start:i].strip(), completed)
+                    self._expect = "key"
+                elif not c.isspace() and self._expect == "value" and self._value_start is None:
+                    # Start of a number / true / false / null
+                    self._value_start = i
+
+        return completed
+
+    def result(self) -> Dict:
+        """The full report once streaming is done"""
+        return extract_json_object(self.text)
+
+    def _emit(self, value_text: str, completed: Dict):
+        value = self._loads(value_text)
+        if self._key is not None and (value is not None or value_text == "null"):
+            self.fields[self._key] = value
+            completed[self._key] = value
+        self._value_start = None
+        self._expect = "comma"
+
+    @staticmethod
+    def _loads(value_text: str):
+        try:
+            return json.loads(value_text)
+        except ValueError:
+            return None
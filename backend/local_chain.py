@@ -0,0 +1,170 @@
+# backend/local_chain.py
+"""
+Local Chain
+An in-memory EVM (eth-tester) served over JSON-RPC, with the ARIA
+contracts deployed from contracts/artifacts. For tests and benchmarks;
+needs `pip install "web3[tester]"`. A `npx hardhat node` works too: pass
+its URL to deploy_contracts instead.
+
+Run standalone:
+    python local_chain.py --port 8545 --listings 5
+"""
+
+import argparse
+import json
+import os
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict
+
+from web3 import Web3
+from web3.datastructures import NamedElementOnion
+
+ARTIFACTS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "contracts", "artifacts", "contracts")
+# eth-tester's first account, which deploys (and so owns) every contract
+DEPLOYER_PRIVATE_KEY = "0x" + "0" * 63 + "1"
+# Seeded into SimpleOracle with 8 decimals
+DEFAULT_PRICES = {"ARIA/USD": 0.5, "QIE/USD": 0.12, "ETH/USD": 2500.0, "BTC/USD": 60000.0, "INR/USD": 0.012}
+
+
+class LocalChain:
+    """eth-tester behind a threaded HTTP JSON-RPC endpoint (port 0 picks a free port)"""
+
+    def __init__(self, host: str = "127.0.0.1", port: int = 0):
+        try:
+            from web3 import EthereumTesterProvider
+            provider = EthereumTesterProvider()
+        except Exception as e:
+            raise RuntimeError(f'Local chain needs eth-tester: pip install "web3[tester]" ({e})')
+
+        self.w3 = Web3(provider)
+        # Straight to the provider's formatted responses, skipping client middleware
+        self._request = provider.request_func(self.w3, NamedElementOnion([]))
+        self._lock = threading.Lock()
+
+        chain = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def log_message(self, *args):
+                pass
+
+            def do_POST(self):
+                body = json.loads(self.rfile.read(int(self.headers["Content-Length"])))
+                response = [chain.handle(item) for item in body] if isinstance(body, list) else chain.handle(body)
+                data = json.dumps(response).encode()
+                self.send_response(200)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(data)))
+                self.end_headers()
+                self.wfile.write(data)
+
+        self.server = ThreadingHTTPServer((host, port), Handler)
+        self.url = f"http://{host}:{self.server.server_port}"
+        self._thread = threading.Thread(target=self.server.serve_forever, name="local-chain", daemon=True)
+
+    def handle(self, request: Dict) -> Dict:
+        """Answer one JSON-RPC request"""
+        response = {"jsonrpc": "2.0", "id": request.get("id")}
+        try:
+            # eth-tester isn't thread safe
+            with self._lock:
+                result = self._request(request["method"], request.get("params", []))
+        except Exception as e:
+            response["error"] = {"code": -32000, "message": str(e)}
+            return response
+        if "error" in result:
+            response["error"] = result["error"]
+        else:
+            response["result"] = json.loads(Web3.to_json(result["result"]))
+        return response
+
+    def start(self) -> "LocalChain":
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self.server.shutdown()
+
+
+def _artifact(path: str):
+    with open(os.path.join(ARTIFACTS_DIR, path)) as f:
+        artifact = json.load(f)
+    return artifact["abi"], artifact["bytecode"]
+
+
+def deploy_contracts(rpc_url: str, listings: int = 5, prices: Dict[str, float] = None) -> Dict:
+    """
+    Deploy AriaNFT, AriaToken, SimpleOracle, AriaMarketplace and
+    FractionalNFT from the node's first unlocked account, seed oracle
+    prices (DEFAULT_PRICES unless given) and list `listings` NFTs
+    (alternating ARIA- and USD-priced) from the second.
+
+    Returns:
+        Contract addresses keyed by the env var contract_info reads,
+        plus listedTokenIds
+    """
+    w3 = Web3(Web3.HTTPProvider(rpc_url))
+    owner, seller = w3.eth.accounts[:2]
+
+    def send(fn, sender=owner):
+        tx_hash = fn.transact({"from": sender, "gas": 3000000})
+        return w3.eth.wait_for_transaction_receipt(tx_hash)
+
+    def deploy(path: str, *args):
+        abi, bytecode = _artifact(path)
+        tx_hash = w3.eth.contract(abi=abi, bytecode=bytecode).constructor(*args).transact({"from": owner, "gas": 8000000})
+        address = w3.eth.wait_for_transaction_receipt(tx_hash).contractAddress
+        return w3.eth.contract(address=address, abi=abi)
+
+    nft = deploy("AriaNFT.sol/AriaNFT.json")
+    token = deploy("AriaToken.sol/AriaToken.json")
+    oracle = deploy("SimpleOracle.sol/SimpleOracle.json")
+    market = deploy("AriaMarketplace.sol/AriaMarketplace.json", nft.address, token.address, 18)
+    fractional = deploy("FractionalNFT.sol/FractionalNFT.json")
+
+    for pair, price in (prices or DEFAULT_PRICES).items():
+        send(oracle.functions.updatePrice(pair, int(price * 10 ** 8)))
+    send(market.functions.setOracle(oracle.address))
+
+    # AriaNFT's counter is incremented before use, so ids start at 1
+    first_token = 1
+    for i in range(listings):
+        send(nft.functions.safeMint(seller, f"ipfs://local-{i}"))
+    if listings:
+        send(nft.functions.setApprovalForAll(market.address, True), seller)
+    for i in range(listings):
+        token_id = first_token + i
+        if i % 2 == 0:
+            send(market.functions.listAssetAria(token_id, (i + 1) * 10 ** 18, f"Asset {token_id}"), seller)
+        else:
+            send(market.functions.listAssetUsd(token_id, (i + 1) * 10 ** 8, f"Asset {token_id}"), seller)
+
+    return {
+        "ARIANFT_ADDRESS": nft.address,
+        "ARIATOKEN_ADDRESS": token.address,
+        "ARIAMARKETPLACE_ADDRESS": market.address,
+        "FRACTIONALNFT_ADDRESS": fractional.address,
+        "ORACLE_ADDRESS": oracle.address,
+        "QIE_ORACLE_ADDRESS": oracle.address,
+        "listedTokenIds": list(range(first_token, first_token + listings)),
+    }
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Local EVM with the ARIA contracts deployed")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8545)
+    parser.add_argument("--listings", type=int, default=5, help="Marketplace listings to create")
+    args = parser.parse_args()
+
+    chain = LocalChain(args.host, args.port).start()
+    addresses = deploy_contracts(chain.url, args.listings)
+    print(f"⛓️ Local chain on {chain.url} (server wallet key {DEPLOYER_PRIVATE_KEY})")
+    for name, value in addresses.items():
+        print(f"{name}={value}")
+    try:
+        chain._thread.join()
+    except KeyboardInterrupt:
+        chain.stop()
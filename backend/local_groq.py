@@ -0,0 +1,173 @@
+# backend/local_groq.py
+"""
+Local Groq
+A stand-in for Groq's OpenAI-compatible chat completions endpoint, for
+tests and benchmarks. Every completion is a well-formed ARIA report
+derived from the document text, returned after a configurable latency;
+streamed requests get the same report as server-sent event chunks.
+
+Run standalone:
+    python local_groq.py --port 5056 --latency 1.5
+then point the backend at it:
+    GROQ_API_KEY=local GROQ_BASE_URL=http://127.0.0.1:5056
+"""
+
+import argparse
+import hashlib
+import json
+import random
+import threading
+import time
+import uuid
+
+from flask import Flask, Response, jsonify, request
+from werkzeug.serving import WSGIRequestHandler, make_server
+
+DOCUMENT_MARKER = "--- DOCUMENT CONTENT ---"
+# Characters per streamed chunk, roughly a few tokens like the real API
+STREAM_CHUNK_CHARS = 16
+
+
+def build_report(messages) -> dict:
+    """Deterministic report for the document in the last user message"""
+    content = messages[-1].get("content", "") if messages else ""
+    document = content.split(DOCUMENT_MARKER, 1)[-1].strip()
+    digest = hashlib.sha256(document.encode("utf-8")).digest()
+    return {
+        "document_type": "invoice",
+        "extracted_data": {
+            "excerpt": document[:80],
+            "characters": len(document)
+        },
+        "authenticity_score": 60 + digest[0] % 40,
+        "authenticity_details": {
+            "official_markers_found": ["Header", "Totals"],
+            "missing_markers": [],
+            "quality_assessment": "Generated by the local Groq stand-in"
+        },
+        "verification_summary": "Local benchmark report; no model was consulted.",
+        "suspicious_elements": [],
+        "confidence": 70 + digest[1] % 30,
+        "extraction_notes": ""
+    }
+
+
+def create_app(latency: float = 0.0, jitter: float = 0.0, fail_rate: float = 0.0) -> Flask:
+    """Flask app implementing /openai/v1/chat/completions"""
+    app = Flask("local_groq")
+    counters = {"requests": 0, "streamed": 0, "failures": 0}
+    lock = threading.Lock()
+
+    def rate_limit_headers():
+        # Plenty of headroom so GroqClientPool never holds requests back
+        return {
+            "x-ratelimit-limit-requests": "1000000",
+            "x-ratelimit-remaining-requests": "1000000",
+            "x-ratelimit-reset-requests": "1s",
+            "x-ratelimit-limit-tokens": "100000000",
+            "x-ratelimit-remaining-tokens": "100000000",
+            "x-ratelimit-reset-tokens": "1s"
+        }
+
+    @app.route("/openai/v1/chat/completions", methods=["POST"])
+    def chat_completions():
+        body = request.get_json(force=True)
+        stream = bool(body.get("stream"))
+        with lock:
+            counters["requests"] += 1
+            counters["streamed"] += stream
+
+        delay = max(latency + random.uniform(-jitter, jitter), 0)
+        if random.random() < fail_rate:
+            time.sleep(delay)
+            with lock:
+                counters["failures"] += 1
+            return jsonify({"error": {"message": "Simulated failure", "type": "server_error"}}), 503
+
+        completion_id = f"chatcmpl-{uuid.uuid4().hex}"
+        created = int(time.time())
+        model = body.get("model", "local")
+        text = json.dumps(build_report(body.get("messages", [])), indent=2)
+
+        if not stream:
+            time.sleep(delay)
+            return jsonify({
+                "id": completion_id,
+                "object": "chat.completion",
+                "created": created,
+                "model": model,
+                "choices": [{
+                    "index": 0,
+                    "message": {"role": "assistant", "content": text},
+                    "finish_reason": "stop"
+                }],
+                "usage": {"prompt_tokens": 0, "completion_tokens": len(text) // 4, "total_tokens": len(text) // 4}
+            }), 200, rate_limit_headers()
+
+        pieces = [text[i:i + STREAM_CHUNK_CHARS] for i in range(0, len(text), STREAM_CHUNK_CHARS)]
+
+        def events():
+            # Latency is spread over the stream, as generation time would be
+            for piece in [None] + pieces:
+                time.sleep(delay / (len(pieces) + 1))
+                delta = {"role": "assistant", "content": ""} if piece is None else {"content": piece}
+                chunk = {
+                    "id": completion_id,
+                    "object": "chat.completion.chunk",
+                    "created": created,
+                    "model": model,
+                    "choices": [{"index": 0, "delta": delta, "finish_reason": None}]
+                }
+                yield f"data: {json.dumps(chunk)}\n\n"
+            done = {
+                "id": completion_id,
+                "object": "chat.completion.chunk",
+                "created": created,
+                "model": model,
+                "choices": [{"index": 0, "delta": {}, "finish_reason": "stop"}]
+            }
+            yield f"data: {json.dumps(done)}\n\n"
+            yield "data: [DONE]\n\n"
+
+        return Response(events(), mimetype="text/event-stream", headers=rate_limit_headers())
+
+    @app.route("/stats", methods=["GET"])
+    def stats():
+        with lock:
+            return jsonify(dict(counters)), 200
+
+    return app
+
+
+class _QuietHandler(WSGIRequestHandler):
+    def log_request(self, *args, **kwargs):
+        pass
+
+
+class LocalGroqServer:
+    """Runs the local Groq app on a background thread (port 0 picks a free port)"""
+
+    def __init__(self, host: str = "127.0.0.1", port: int = 0, **options):
+        self.server = make_server(host, port, create_app(**options), threaded=True, request_handler=_QuietHandler)
+        self.url = f"http://{host}:{self.server.server_port}"
+        self._thread = threading.Thread(target=self.server.serve_forever, name="local-groq", daemon=True)
+
+    def start(self) -> "LocalGroqServer":
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self.server.shutdown()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Local stand-in for the Groq chat completions API")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=5056)
+    parser.add_argument("--latency", type=float, default=1.0, help="Seconds per completion")
+    parser.add_argument("--jitter", type=float, default=0.0, help="Random +/- seconds on top of latency")
+    parser.add_argument("--fail-rate", type=float, default=0.0, help="Fraction of requests answered with 503")
+    args = parser.parse_args()
+
+    print(f"🤖 Local Groq on http://{args.host}:{args.port} (latency {args.latency}s, fail rate {args.fail_rate})")
+    create_app(args.latency, args.jitter, args.fail_rate).run(host=args.host, port=args.port, threaded=True)
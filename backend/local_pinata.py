@@ -0,0 +1,131 @@
+# backend/local_pinata.py
+"""
+Local Pinata
+A stand-in for the Pinata pinning API and gateway, for tests and
+benchmarks. Pins are kept in memory and addressed by the same CIDv0 that
+ipfs add would assign, with configurable latency and failure rate.
+
+Run standalone:
+    python local_pinata.py --port 5055 --latency 0.2 --fail-rate 0.05
+then point the backend at it:
+    PINATA_API_URL=http://127.0.0.1:5055 PINATA_GATEWAY_URL=http://127.0.0.1:5055/ipfs
+"""
+
+import argparse
+import json
+import random
+import threading
+import time
+from typing import Dict
+
+from flask import Flask, Response, jsonify, request
+from werkzeug.serving import WSGIRequestHandler, make_server
+
+from ipfs_client import compute_cid
+
+
+def create_app(latency: float = 0.0, jitter: float = 0.0, fail_rate: float = 0.0) -> Flask:
+    """Flask app implementing the Pinata endpoints the backend uses"""
+    app = Flask("local_pinata")
+    pins: Dict[str, bytes] = {}
+    counters = {"requests": 0, "pins": 0, "failures": 0}
+    lock = threading.Lock()
+
+    def simulate():
+        with lock:
+            counters["requests"] += 1
+        time.sleep(max(latency + random.uniform(-jitter, jitter), 0))
+        if random.random() < fail_rate:
+            with lock:
+                counters["failures"] += 1
+            return jsonify({"error": "Simulated failure"}), 503
+        # API keys aren't checked: the dev server drops headers with
+        # underscores (pinata_api_key) before they reach the app
+        return None
+
+    def store(content: bytes):
+        cid = compute_cid(content)
+        if cid is None:
+            return jsonify({"error": "Local Pinata only accepts single-chunk files"}), 413
+        with lock:
+            is_duplicate = cid in pins
+            pins[cid] = content
+            counters["pins"] += 1
+        return jsonify({
+            "IpfsHash": cid,
+            "PinSize": len(content),
+            "Timestamp": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime()),
+            "isDuplicate": is_duplicate
+        }), 200
+
+    @app.route("/data/testAuthentication", methods=["GET"])
+    def test_authentication():
+        return simulate() or (jsonify({"message": "Congratulations! You are communicating with the Pinata API!"}), 200)
+
+    @app.route("/pinning/pinFileToIPFS", methods=["POST"])
+    def pin_file():
+        error = simulate()
+        if error:
+            return error
+        upload = request.files.get("file")
+        if upload is None:
+            return jsonify({"error": "No file"}), 400
+        return store(upload.read())
+
+    @app.route("/pinning/pinJSONToIPFS", methods=["POST"])
+    def pin_json():
+        error = simulate()
+        if error:
+            return error
+        body = request.get_json(force=True)
+        content = json.dumps(body.get("pinataContent"), ensure_ascii=False, separators=(",", ":"))
+        return store(content.encode("utf-8"))
+
+    @app.route("/ipfs/<cid>", methods=["GET"])
+    def gateway(cid):
+        with lock:
+            content = pins.get(cid)
+        if content is None:
+            return jsonify({"error": "Not found"}), 404
+        return Response(content, mimetype="application/json")
+
+    @app.route("/stats", methods=["GET"])
+    def stats():
+        with lock:
+            return jsonify({**counters, "stored": len(pins)}), 200
+
+    return app
+
+
+class _QuietHandler(WSGIRequestHandler):
+    def log_request(self, *args, **kwargs):
+        pass
+
+
+class LocalPinataServer:
+    """Runs the local Pinata app on a background thread (port 0 picks a free port)"""
+
+    def __init__(self, host: str = "127.0.0.1", port: int = 0, **options):
+        self.server = make_server(host, port, create_app(**options), threaded=True, request_handler=_QuietHandler)
+        self.url = f"http://{host}:{self.server.server_port}"
+        self._thread = threading.Thread(target=self.server.serve_forever, name="local-pinata", daemon=True)
+
+    def start(self) -> "LocalPinataServer":
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self.server.shutdown()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Local stand-in for the Pinata API")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=5055)
+    parser.add_argument("--latency", type=float, default=0.0, help="Seconds added to every request")
+    parser.add_argument("--jitter", type=float, default=0.0, help="Random +/- seconds on top of latency")
+    parser.add_argument("--fail-rate", type=float, default=0.0, help="Fraction of requests answered with 503")
+    args = parser.parse_args()
+
+    print(f"📌 Local Pinata on http://{args.host}:{args.port} (latency {args.latency}s, fail rate {args.fail_rate})")
+    create_app(args.latency, args.jitter, args.fail_rate).run(host=args.host, port=args.port, threaded=True)
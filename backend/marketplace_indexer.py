@@ -0,0 +1,508 @@
+# backend/marketplace_indexer.py
+"""
+Marketplace Indexer
+Follows AriaMarketplace events into a local SQLite store so listings can be
+browsed and filtered without probing listings(tokenId) one id at a time.
+The event log is the source of truth; the listings table is a projection
+rebuilt from it when a chain reorganization is detected.
+"""
+
+import json
+import sqlite3
+import threading
+import time
+from typing import Dict, List, Optional, Tuple
+
+from eth_utils import event_abi_to_log_topic
+from web3 import Web3
+from web3.exceptions import BlockNotFound
+
+# Events that change a listing, plus the contract-wide price pair
+LISTING_EVENTS = ("AssetListed", "AssetUnlisted", "AssetPurchased", "AssetDisputed")
+PAIR_EVENT = "PricePairUpdated"
+DEFAULT_PAIR = "ARIA/USD"
+PRICING_MODES = {0: "aria", 1: "usd"}
+
+# Tip hashes kept for finding the fork point after a reorg
+CHECKPOINTS_KEPT = 256
+
+SORT_COLUMNS = {
+    "newest": "listed_block DESC, listed_log_index DESC",
+    "oldest": "listed_block ASC, listed_log_index ASC",
+    "ariaPrice": "aria_price {order}, token_id ASC",
+    "usdPrice": "usd_price_e8 {order}, token_id ASC",
+    "tokenId": "token_id {order}",
+}
+
+
+class MarketplaceIndexer:
+    """Event-sourced SQLite index of AriaMarketplace listings"""
+
+    def __init__(
+        self,
+        db_path: str,
+        contract,
+        start_block: Optional[int] = None,
+        confirmations: int = 2,
+        block_range: int = 2000,
+        poll_interval: float = 5.0
+    ):
+        self.db_path = db_path
+        self.contract = contract
+        self.w3 = contract.w3
+        self.start_block = start_block
+        self.confirmations = confirmations
+        self.block_range = block_range
+        self.poll_interval = poll_interval
+        self.reorgs = 0
+        # Bumped whenever the listings projection changes
+        self.version = 0
+        self.last_error: Optional[str] = None
+        self.last_synced_at: Optional[float] = None
+        self._lock = threading.Lock()
+        self._sync_lock = threading.Lock()
+        self._thread = None
+        self._stop = threading.Event()
+
+        self._events = {}
+        for name in LISTING_EVENTS + (PAIR_EVENT,):
+            event = getattr(self.contract.events, name)()
+            self._events[Web3.to_hex(event_abi_to_log_topic(event.abi))] = event
+
+        self._conn = sqlite3.connect(db_path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.executescript("""
+            CREATE TABLE IF NOT EXISTS marketplace_events (
+                block_number INTEGER NOT NULL,
+                log_index INTEGER NOT NULL,
+                block_hash TEXT NOT NULL,
+                tx_hash TEXT NOT NULL,
+                event TEXT NOT NULL,
+                token_id INTEGER,
+                args TEXT NOT NULL,
+                PRIMARY KEY (block_number, log_index)
+            );
+            CREATE INDEX IF NOT EXISTS idx_marketplace_events_token
+                ON marketplace_events (token_id, block_number, log_index);
+
+            CREATE TABLE IF NOT EXISTS marketplace_listings (
+                token_id INTEGER PRIMARY KEY,
+                seller TEXT,
+                status TEXT NOT NULL,
+                mode TEXT,
+                aria_price_wei TEXT,
+                aria_price REAL,
+                usd_price_e8 INTEGER,
+                price_pair TEXT,
+                name TEXT,
+                disputed INTEGER NOT NULL DEFAULT 0,
+                disputed_by TEXT,
+                buyer TEXT,
+                paid_aria_wei TEXT,
+                listed_block INTEGER,
+                listed_log_index INTEGER,
+                listed_tx TEXT,
+                updated_block INTEGER
+            );
+            CREATE INDEX IF NOT EXISTS idx_marketplace_listings_seller
+                ON marketplace_listings (seller, status);
+            CREATE INDEX IF NOT EXISTS idx_marketplace_listings_aria_price
+                ON marketplace_listings (status, aria_price);
+            CREATE INDEX IF NOT EXISTS idx_marketplace_listings_usd_price
+                ON marketplace_listings (status, usd_price_e8);
+            CREATE INDEX IF NOT EXISTS idx_marketplace_listings_pair
+                ON marketplace_listings (price_pair, status);
+            CREATE INDEX IF NOT EXISTS idx_marketplace_listings_disputed
+                ON marketplace_listings (disputed, status);
+
+            CREATE TABLE IF NOT EXISTS marketplace_checkpoints (
+                block_number INTEGER PRIMARY KEY,
+                block_hash TEXT NOT NULL
+            );
+        """)
+        self._conn.commit()
+
+    # --- BACKGROUND SYNC ---
+
+    def start(self):
+        """Follow the chain on a daemon thread"""
+        if self._thread and self._thread.is_alive():
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name="marketplace-indexer", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+
+    def _run(self):
+        delay = self.poll_interval
+        while not self._stop.is_set():
+            try:
+                self.sync_once()
+                if self.last_error:
+                    print("✅ Marketplace indexer recovered")
+                self.last_error = None
+                delay = self.poll_interval
+            except Exception as e:
+                if self.last_error is None:
+                    print(f"⚠️ Marketplace indexer sync failed: {e}")
+                self.last_error = str(e)
+                # Back off while the RPC is unreachable
+                delay = min(delay * 2, 60.0)
+            self._stop.wait(delay)
+
+    def sync_once(self) -> int:
+        """
+        Index confirmed blocks since the last run.
+
+        Returns:
+            Number of new events stored
+        """
+        with self._sync_lock:
+            if self.start_block is None:
+                self.start_block = self._find_deployment_block()
+            self._check_reorg()
+            head = self.w3.eth.block_number - self.confirmations
+            from_block = self._indexed_block() + 1
+            stored = 0
+
+            while from_block <= head:
+                to_block = min(from_block + self.block_range - 1, head)
+                # Hash first: if a reorg lands while logs are fetched, the
+                # stale checkpoint is caught on the next run
+                to_hash = Web3.to_hex(self.w3.eth.get_block(to_block)["hash"])
+                logs = self.w3.eth.get_logs({
+                    "address": self.contract.address,
+                    "fromBlock": from_block,
+                    "toBlock": to_block,
+                    "topics": [list(self._events)]
+                })
+                stored += self._store(logs, to_block, to_hash)
+                from_block = to_block + 1
+
+            self.last_synced_at = time.time()
+            if stored:
+                self.version += 1
+                print(f"📇 Marketplace indexer stored {stored} event(s) up to block {head}")
+            return stored
+
+    def _find_deployment_block(self) -> int:
+        """
+        Binary search for the first block with the contract's code, so a
+        fresh index doesn't scan logs from genesis. Needs a node that serves
+        historical state; otherwise set MARKETPLACE_INDEX_START_BLOCK.
+        """
+        with self._lock:
+            row = self._conn.execute("SELECT MIN(block_number) FROM marketplace_events").fetchone()
+        head = self.w3.eth.block_number
+        try:
+            if not self.w3.eth.get_code(self.contract.address, head):
+                raise ValueError(f"No contract code at {self.contract.address}")
+            low, high = 0, head if row[0] is None else row[0]
+            while low < high:
+                middle = (low + high) // 2
+                if self.w3.eth.get_code(self.contract.address, middle):
+                    high = middle
+                else:
+                    low = middle + 1
+        except Exception as e:
+            raise RuntimeError(
+                f"Could not find the marketplace deployment block ({e}); set MARKETPLACE_INDEX_START_BLOCK"
+            )
+        print(f"📇 Marketplace indexer starting from deployment block {low}")
+        return low
+
+    # --- REORGS ---
+
+    def _check_reorg(self):
+        """Roll back to the newest checkpoint that is still on the canonical chain"""
+        with self._lock:
+            checkpoints = self._conn.execute(
+                "SELECT block_number, block_hash FROM marketplace_checkpoints ORDER BY block_number DESC"
+            ).fetchall()
+        if not checkpoints:
+            return
+
+        number, block_hash = checkpoints[0]
+        if self._canonical_hash(number) == block_hash:
+            return
+
+        fork_point = self.start_block - 1
+        for number, block_hash in checkpoints[1:]:
+            if self._canonical_hash(number) == block_hash:
+                fork_point = number
+                break
+
+        print(f"⚠️ Marketplace indexer detected a reorg, rolling back to block {fork_point}")
+        self.reorgs += 1
+        self._rollback(fork_point)
+
+    def _canonical_hash(self, number: int) -> Optional[str]:
+        # RPC errors propagate: sync_once backs off instead of rolling back
+        try:
+            return Web3.to_hex(self.w3.eth.get_block(number)["hash"])
+        except BlockNotFound:
+            # Block no longer exists on a shorter canonical chain
+            return None
+
+    def _rollback(self, block_number: int):
+        with self._lock:
+            affected = [row[0] for row in self._conn.execute(
+                "SELECT DISTINCT token_id FROM marketplace_events "
+                "WHERE block_number > ? AND token_id IS NOT NULL",
+                (block_number,)
+            )]
+            self._conn.execute("DELETE FROM marketplace_events WHERE block_number > ?", (block_number,))
+            self._conn.execute("DELETE FROM marketplace_checkpoints WHERE block_number > ?", (block_number,))
+            self._rebuild(affected)
+            # The pair is contract-wide: every listing follows the newest
+            # surviving PricePairUpdated, whether or not its own events moved
+            self._conn.execute("UPDATE marketplace_listings SET price_pair = ?", (self._current_pair(),))
+            self._conn.commit()
+        self.version += 1
+
+    # --- PROJECTION ---
+
+    def _store(self, logs: List, to_block: int, to_hash: str) -> int:
+        decoded = []
+        for log in logs:
+            event = self._events.get(Web3.to_hex(log["topics"][0]))
+            if event is None:
+                continue
+            decoded.append(event.process_log(log))
+        decoded.sort(key=lambda parsed: (parsed["blockNumber"], parsed["logIndex"]))
+
+        with self._lock:
+            for parsed in decoded:
+                args = dict(parsed["args"])
+                token_id = args.get("tokenId")
+                cursor = self._conn.execute(
+                    "INSERT OR IGNORE INTO marketplace_events "
+                    "(block_number, log_index, block_hash, tx_hash, event, token_id, args) "
+                    "VALUES (?, ?, ?, ?, ?, ?, ?)",
+                    (
+                        parsed["blockNumber"],
+                        parsed["logIndex"],
+                        Web3.to_hex(parsed["blockHash"]),
+                        Web3.to_hex(parsed["transactionHash"]),
+                        parsed["event"],
+                        token_id,
+                        json.dumps(args)
+                    )
+                )
+                if not cursor.rowcount:
+                    continue
+                if parsed["event"] == PAIR_EVENT:
+                    # setPricePair re-prices every listing, not just new ones
+                    self._conn.execute("UPDATE marketplace_listings SET price_pair = ?", (args["pair"],))
+                elif token_id is not None:
+                    self._apply(parsed["event"], token_id, args, parsed["blockNumber"],
+                                parsed["logIndex"], Web3.to_hex(parsed["transactionHash"]))
+
+            self._conn.execute(
+                "INSERT OR REPLACE INTO marketplace_checkpoints (block_number, block_hash) VALUES (?, ?)",
+                (to_block, to_hash)
+            )
+            self._conn.execute(
+                "DELETE FROM marketplace_checkpoints WHERE block_number NOT IN ("
+                "  SELECT block_number FROM marketplace_checkpoints ORDER BY block_number DESC LIMIT ?"
+                ")",
+                (CHECKPOINTS_KEPT,)
+            )
+            self._conn.commit()
+        return len(decoded)
+
+    def _apply(self, event: str, token_id: int, args: Dict, block_number: int, log_index: int, tx_hash: str):
+        """Fold one event into the listings table (caller holds the lock)"""
+        if event == "AssetListed":
+            # isDisputed is not reset by the contract on relisting, so keep it
+            self._conn.execute(
+                "INSERT INTO marketplace_listings (token_id, status, disputed) VALUES (?, 'listed', 0) "
+                "ON CONFLICT(token_id) DO NOTHING",
+                (token_id,)
+            )
+            self._conn.execute(
+                "UPDATE marketplace_listings SET seller = ?, status = 'listed', mode = ?, "
+                "aria_price_wei = ?, aria_price = ?, usd_price_e8 = ?, price_pair = ?, name = ?, "
+                "buyer = NULL, paid_aria_wei = NULL, listed_block = ?, listed_log_index = ?, "
+                "listed_tx = ?, updated_block = ? WHERE token_id = ?",
+                (
+                    args["seller"],
+                    PRICING_MODES.get(args["mode"], str(args["mode"])),
+                    str(args["ariaPrice"]),
+                    args["ariaPrice"] / 1e18,
+                    args["usdPriceE8"],
+                    self._pair_at(block_number, log_index),
+                    args["name"],
+                    block_number,
+                    log_index,
+                    tx_hash,
+                    block_number,
+                    token_id
+                )
+            )
+        elif event == "AssetUnlisted":
+            self._conn.execute(
+                "UPDATE marketplace_listings SET status = 'unlisted', updated_block = ? WHERE token_id = ?",
+                (block_number, token_id)
+            )
+        elif event == "AssetPurchased":
+            self._conn.execute(
+                "UPDATE marketplace_listings SET status = 'sold', buyer = ?, paid_aria_wei = ?, "
+                "disputed = 0, disputed_by = NULL, updated_block = ? WHERE token_id = ?",
+                (args["buyer"], str(args["paidAria"]), block_number, token_id)
+            )
+        elif event == "AssetDisputed":
+            self._conn.execute(
+                "UPDATE marketplace_listings SET disputed = 1, disputed_by = ?, updated_block = ? "
+                "WHERE token_id = ?",
+                (args["by"], block_number, token_id)
+            )
+
+    def _rebuild(self, token_ids: List[int]):
+        """Replay the stored events of these tokens from scratch (caller holds the lock)"""
+        for token_id in token_ids:
+            self._conn.execute("DELETE FROM marketplace_listings WHERE token_id = ?", (token_id,))
+            rows = self._conn.execute(
+                "SELECT event, args, block_number, log_index, tx_hash FROM marketplace_events "
+                "WHERE token_id = ? ORDER BY block_number, log_index",
+                (token_id,)
+            ).fetchall()
+            for event, args, block_number, log_index, tx_hash in rows:
+                self._apply(event, token_id, json.loads(args), block_number, log_index, tx_hash)
+
+    def _pair_at(self, block_number: int, log_index: int) -> str:
+        row = self._conn.execute(
+            "SELECT args FROM marketplace_events WHERE event = ? AND "
+            "(block_number < ? OR (block_number = ? AND log_index < ?)) "
+            "ORDER BY block_number DESC, log_index DESC LIMIT 1",
+            (PAIR_EVENT, block_number, block_number, log_index)
+        ).fetchone()
+        return json.loads(row[0])["pair"] if row else DEFAULT_PAIR
+
+    def _current_pair(self) -> str:
+        row = self._conn.execute(
+            "SELECT args FROM marketplace_events WHERE event = ? "
+            "ORDER BY block_number DESC, log_index DESC LIMIT 1",
+            (PAIR_EVENT,)
+        ).fetchone()
+        return json.loads(row[0])["pair"] if row else DEFAULT_PAIR
+
+    def _indexed_block(self) -> Optional[int]:
+        with self._lock:
+            row = self._conn.execute("SELECT MAX(block_number) FROM marketplace_checkpoints").fetchone()
+        if row[0] is not None:
+            return row[0]
+        return None if self.start_block is None else self.start_block - 1
+
+    # --- QUERIES ---
+
+    def query_listings(
+        self,
+        status: str = "listed",
+        seller: str = None,
+        mode: str = None,
+        pair: str = None,
+        disputed: bool = None,
+        min_aria_price: float = None,
+        max_aria_price: float = None,
+        min_usd_price: float = None,
+        max_usd_price: float = None,
+        sort: str = "newest",
+        order: str = "desc",
+        page: int = 1,
+        page_size: int = 20
+    ) -> Tuple[List[Dict], int]:
+        """
+        Filtered, paginated listings.
+
+        Args:
+            status: listed, unlisted, sold or all
+            min_usd_price / max_usd_price: In USD (compared against usdPriceE8)
+
+        Returns:
+            (rows for the page, total matching rows)
+        """
+        clauses, params = [], []
+        if status != "all":
+            clauses.append("status = ?")
+            params.append(status)
+        if seller:
+            clauses.append("seller = ?")
+            params.append(Web3.to_checksum_address(seller))
+        if mode:
+            clauses.append("mode = ?")
+            params.append(mode)
+        if pair:
+            clauses.append("price_pair = ?")
+            params.append(pair)
+        if disputed is not None:
+            clauses.append("disputed = ?")
+            params.append(1 if disputed else 0)
+        for column, bound, op in (
+            ("aria_price", min_aria_price, ">="),
+            ("aria_price", max_aria_price, "<="),
+            ("usd_price_e8", None if min_usd_price is None else int(min_usd_price * 1e8), ">="),
+            ("usd_price_e8", None if max_usd_price is None else int(max_usd_price * 1e8), "<="),
+        ):
+            if bound is not None:
+                clauses.append(f"{column} {op} ?")
+                params.append(bound)
+
+        where = f"WHERE {' AND '.join(clauses)}" if clauses else ""
+        if sort not in SORT_COLUMNS:
+            raise ValueError(f"sort must be one of {', '.join(SORT_COLUMNS)}")
+        if order.lower() not in ("asc", "desc"):
+            raise ValueError("order must be asc or desc")
+        order_by = SORT_COLUMNS[sort].format(order=order.upper())
+
+        with self._lock:
+            total = self._conn.execute(f"SELECT COUNT(*) FROM marketplace_listings {where}", params).fetchone()[0]
+            cursor = self._conn.execute(
+                f"SELECT * FROM marketplace_listings {where} ORDER BY {order_by} LIMIT ? OFFSET ?",
+                params + [page_size, (page - 1) * page_size]
+            )
+            columns = [column[0] for column in cursor.description]
+            rows = [dict(zip(columns, row)) for row in cursor.fetchall()]
+        return [self._to_listing(row) for row in rows], total
+
+    @staticmethod
+    def _to_listing(row: Dict) -> Dict:
+        return {
+            "tokenId": row["token_id"],
+            "seller": row["seller"],
+            "status": row["status"],
+            "mode": row["mode"],
+            "ariaPriceWei": row["aria_price_wei"],
+            "ariaPrice": row["aria_price"],
+            "usdPrice": row["usd_price_e8"] / 1e8 if row["usd_price_e8"] else None,
+            "pricePair": row["price_pair"],
+            "name": row["name"],
+            "disputed": bool(row["disputed"]),
+            "disputedBy": row["disputed_by"],
+            "buyer": row["buyer"],
+            "paidAriaWei": row["paid_aria_wei"],
+            "listedBlock": row["listed_block"],
+            "listedTx": row["listed_tx"],
+            "updatedBlock": row["updated_block"]
+        }
+
+    def stats(self) -> Dict:
+        with self._lock:
+            events = self._conn.execute("SELECT COUNT(*) FROM marketplace_events").fetchone()[0]
+            listed = self._conn.execute(
+                "SELECT COUNT(*) FROM marketplace_listings WHERE status = 'listed'"
+            ).fetchone()[0]
+        return {
+            "running": bool(self._thread and self._thread.is_alive()),
+            "indexedBlock": self._indexed_block(),
+            "events": events,
+            "activeListings": listed,
+            "reorgs": self.reorgs,
+            "version": self.version,
+            "confirmations": self.confirmations,
+            "lastSyncedAt": self.last_synced_at,
+            "lastError": self.last_error,
+            "path": self.db_path
+        }
@@ -0,0 +1,148 @@
+# backend/marketplace_reads.py
+"""
+Marketplace Read Layer
+Live NFT prices for many listings at once, with the contract reads
+coalesced into JSON-RPC batches instead of one round trip per call
+"""
+
+import os
+from typing import Dict, List
+
+from contract_info import ARIAMARKETPLACE_ADDRESS, ARIAMARKETPLACE_ABI
+from oracle_service import OracleService
+from web3_provider import Web3Registry, batch_call
+
+
+def _error_message(error: Exception) -> str:
+    # ContractLogicError keeps the revert reason in .message; str() is an args tuple
+    return getattr(error, "message", None) or str(error)
+
+
+class MarketplaceReader:
+    """Batched reads against AriaMarketplace"""
+
+    PROVIDER_URL = os.getenv("QIE_RPC_URL", "http://127.0.0.1:8545/")
+    MAX_TOKENS = int(os.getenv("BULK_PRICE_MAX_TOKENS", "500"))
+
+    @classmethod
+    def get_marketplace(cls):
+        return Web3Registry.get_contract(
+            ARIAMARKETPLACE_ADDRESS, ARIAMARKETPLACE_ABI, default_url=cls.PROVIDER_URL
+        )
+
+    @classmethod
+    def get_live_prices(cls, token_ids: List[int]) -> List[Dict]:
+        """
+        Live price for each token id, in order.
+
+        One batch carries getListingDetails for every token plus useOracle;
+        a second batch reads the raw listings mapping only for tokens whose
+        getListingDetails reverted (older contract or not listed). Oracle
+        rates come from one OracleService rate snapshot.
+
+        Returns:
+            A live price dict per token, or {"tokenId", "error"} if it
+            could not be read
+        """
+        marketplace = cls.get_marketplace()
+        w3 = marketplace.w3
+        block = w3.eth.block_number
+
+        calls = [marketplace.functions.getListingDetails(token_id) for token_id in token_ids]
+        calls.append(marketplace.functions.useOracle())
+        *details, oracle_enabled = batch_call(w3, calls, block)
+        if isinstance(oracle_enabled, Exception):
+            raise oracle_enabled
+
+        fallback_ids = [
+            token_id for token_id, result in zip(token_ids, details)
+            if isinstance(result, Exception)
+        ]
+        fallback = dict(zip(
+            fallback_ids,
+            batch_call(w3, [marketplace.functions.listings(token_id) for token_id in fallback_ids], block)
+        ))
+
+        results = []
+        for token_id, result in zip(token_ids, details):
+            if isinstance(result, Exception):
+                print(f"[Fallback listing] {token_id}: {_error_message(result)}")
+                result = fallback[token_id]
+                if isinstance(result, Exception):
+                    results.append({"tokenId": token_id, "error": _error_message(result)})
+                    continue
+                results.append(cls._from_listing(token_id, result, oracle_enabled))
+            else:
+                results.append(cls._from_details(token_id, result, oracle_enabled))
+
+        # Convert ARIA current → USD/INR/etc for every listing against one rate snapshot
+        priced = [result for result in results if "error" not in result]
+        all_prices = OracleService.get_nft_prices_in_currencies([result["currentPrice"] for result in priced])
+        for result, prices in zip(priced, all_prices):
+            result["prices"] = prices
+            # If price_in_usd was missing, fallback to computed USD
+            if result["priceInUSD"] is None:
+                result["priceInUSD"] = prices.get("USD", 0)
+        return results
+
+    @classmethod
+    def _from_details(cls, token_id: int, listing_details, oracle_enabled: bool) -> Dict:
+        (
+            seller,
+            static_price_wei,
+            current_price_wei,
+            name,
+            use_dynamic,
+            price_pair,
+            price_in_usd_e8,
+            disputed
+        ) = listing_details
+
+        static_price_tokens = static_price_wei / 1e18
+        current_price_tokens = current_price_wei / 1e18
+
+        # If USD-pegged, USD value is authoritative from contract
+        if use_dynamic and price_in_usd_e8 > 0:
+            price_in_usd = price_in_usd_e8 / 1e8
+        else:
+            price_in_usd = None  # fallback later
+
+        return cls._build(
+            token_id, seller, name, static_price_tokens, current_price_tokens,
+            use_dynamic, price_in_usd, oracle_enabled
+        )
+
+    @classmethod
+    def _from_listing(cls, token_id: int, listing, oracle_enabled: bool) -> Dict:
+        seller = listing[0]
+        static_price_tokens = listing[1] / 1e18
+        # No oracle baseline for the raw mapping
+        return cls._build(
+            token_id, seller, None, static_price_tokens, static_price_tokens,
+            False, None, oracle_enabled
+        )
+
+    @classmethod
+    def _build(
+        cls,
+        token_id: int,
+        seller: str,
+        name,
+        static_price_tokens: float,
+        current_price_tokens: float,
+        use_dynamic: bool,
+        price_in_usd,
+        oracle_enabled: bool
+    ) -> Dict:
+        # prices (and a missing priceInUSD) are filled in by get_live_prices
+        return {
+            "tokenId": token_id,
+            "staticPrice": static_price_tokens,
+            "currentPrice": current_price_tokens,
+            "prices": None,
+            "oracleEnabled": oracle_enabled,
+            "useDynamicPricing": use_dynamic,
+            "priceInUSD": price_in_usd,
+            "name": name,
+            "seller": seller
+        }
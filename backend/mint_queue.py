@@ -0,0 +1,399 @@
+# backend/mint_queue.py
+"""
+Mint Queue
+Owns the server wallet nonce locally and pipelines safeMint transactions
+"""
+
+import queue
+import threading
+import time
+from concurrent.futures import Future
+from typing import Dict, List, Optional
+
+from web3 import Web3
+
+from gas_oracle import GasOracle
+from metrics import histogram
+from receipt_tracker import ReceiptTracker, TrackedTransaction, normalize_hash
+
+MINT_CONFIRM_SECONDS = histogram(
+    "aria_mint_confirm_seconds", "Mint broadcast to receipt latency", ["outcome"],
+    buckets=(1, 2, 5, 10, 20, 30, 60, 120, 300, 600)
+)
+
+
+class MintCancelledError(Exception):
+    """A stuck mint whose nonce was taken by a cancellation transfer"""
+
+
+class MintTicket:
+    """Handle for a single queued mint"""
+
+    def __init__(self, recipient_address: str, ipfs_hash: str):
+        self.recipient_address = recipient_address
+        self.ipfs_hash = ipfs_hash
+        self.nonce: Optional[int] = None
+        # Earlier mints that gave up this nonce before it was handed over
+        self.nonce_reuse = 0
+        # Fee fields of the latest broadcast, bumped for replacements
+        self.fees: Optional[Dict] = None
+        self.sent_at: Optional[float] = None
+        self.first_sent_at: Optional[float] = None
+        # Every hash broadcast for this nonce (original + replacements)
+        self.hashes: List[str] = []
+        # Zero-value self-transfer sent once replacements run out
+        self.cancel_hash: Optional[str] = None
+        # Resolves to the first broadcast hash
+        self.tx_hash: Future = Future()
+        # Resolves to the receipt of whichever hash got mined
+        self.receipt: Future = Future()
+        self.tracked: Optional[TrackedTransaction] = None
+
+    @property
+    def status(self) -> str:
+        if self.receipt.done():
+            if self.receipt.exception() or self.receipt.result().status != 1:
+                return "failed"
+            return "confirmed"
+        if self.tx_hash.done() and self.tx_hash.exception():
+            return "failed"
+        if self.hashes:
+            return "pending"
+        return "queued"
+
+
+class MintQueue:
+    """
+    Serializes mints from every Flask thread onto one sender thread.
+
+    The sender drains whatever is queued, assigns consecutive nonces from a
+    locally tracked counter and broadcasts the batch back-to-back without
+    waiting on receipts. Receipts are confirmed by the shared
+    ReceiptTracker; a watchdog thread re-broadcasts stuck transactions
+    with bumped fees. Fees and the gas limit come from the shared
+    GasOracle, so a batch costs no extra RPC round trips to price.
+
+    A mint still stuck after max_replacements is cancelled with a
+    zero-value self-transfer at its nonce; if even that can't be sent the
+    ticket is failed and its nonce handed to the next mint, so later mints
+    never queue behind a gap.
+    """
+
+    def __init__(
+        self,
+        w3: Web3,
+        contract,
+        account,
+        private_key: str,
+        tracker: ReceiptTracker,
+        gas: GasOracle,
+        gas_limit: int = 2000000,
+        max_batch: int = 25,
+        poll_interval: float = 2.0,
+        stuck_after: float = 120.0,
+        gas_bump: float = 1.125,
+        max_replacements: int = 5
+    ):
+        self.w3 = w3
+        self.contract = contract
+        self.account = account
+        self.private_key = private_key
+        self.tracker = tracker
+        self.gas = gas
+        # Fallback when safeMint can't be estimated
+        self.gas_limit = gas_limit
+        self.max_batch = max_batch
+        self.poll_interval = poll_interval
+        self.stuck_after = stuck_after
+        self.gas_bump = gas_bump
+        self.max_replacements = max_replacements
+
+        self._queue: "queue.Queue[MintTicket]" = queue.Queue()
+        self._lock = threading.Lock()
+        self._next_nonce: Optional[int] = None
+        # Nonces given up below _next_nonce -> times handed out already;
+        # allocated before any new nonce
+        self._free_nonces: Dict[int, int] = {}
+        # nonce -> ticket awaiting a receipt
+        self._pending: Dict[int, MintTicket] = {}
+        # any broadcast hash -> ticket
+        self._by_hash: Dict[str, MintTicket] = {}
+        self._started = False
+        self._stats = {"submitted": 0, "sent": 0, "confirmed": 0, "failed": 0, "replaced": 0, "batches": 0}
+
+    # --- PUBLIC API ---
+
+    def submit(self, recipient_address: str, ipfs_hash: str) -> MintTicket:
+        """Queue a mint and return its ticket immediately"""
+        self._ensure_started()
+        ticket = MintTicket(recipient_address, ipfs_hash)
+        with self._lock:
+            self._stats["submitted"] += 1
+        self._queue.put(ticket)
+        return ticket
+
+    def warm(self, recipient_address: str):
+        """
+        Prefetch what the next mint needs (sender threads, nonce, fee data,
+        safeMint gas estimate) so it can be broadcast without extra RPCs
+        """
+        self._ensure_started()
+        with self._lock:
+            if self._next_nonce is None:
+                self._resync_nonce()
+        self.gas.fees()
+        # Any CIDv0-length string estimates the same as the real one
+        mint = self.contract.functions.safeMint(recipient_address, "Qm" + "1" * 44)
+        self.gas.gas_limit(mint, self.account.address, self.gas_limit)
+
+    def get_ticket(self, tx_hash: str) -> Optional[MintTicket]:
+        """Look up a ticket by any hash it was broadcast under"""
+        with self._lock:
+            return self._by_hash.get(self._normalize(tx_hash))
+
+    def stats(self) -> Dict:
+        with self._lock:
+            return {
+                **self._stats,
+                "queued": self._queue.qsize(),
+                "pending": len(self._pending),
+                "nextNonce": self._next_nonce,
+                "freeNonces": sorted(self._free_nonces),
+            }
+
+    # --- THREADS ---
+
+    def _ensure_started(self):
+        if self._started:
+            return
+        with self._lock:
+            if self._started:
+                return
+            threading.Thread(target=self._sender_loop, name="mint-sender", daemon=True).start()
+            threading.Thread(target=self._watchdog_loop, name="mint-watchdog", daemon=True).start()
+            self._started = True
+
+    def _sender_loop(self):
+        while True:
+            batch = [self._queue.get()]
+            while len(batch) < self.max_batch:
+                try:
+                    batch.append(self._queue.get_nowait())
+                except queue.Empty:
+                    break
+            try:
+                self._send_batch(batch)
+            except Exception as e:
+                print(f"[Mint Queue] Batch failed: {e}")
+                # Tickets already broadcast are tracked and resolve by receipt
+                for ticket in batch:
+                    if not ticket.tx_hash.done():
+                        self._fail(ticket, e)
+
+    def _watchdog_loop(self):
+        while True:
+            time.sleep(self.poll_interval)
+            try:
+                self._replace_stuck()
+            except Exception as e:
+                print(f"[Mint Queue] Stuck transaction check failed: {e}")
+
+    # --- SENDING ---
+
+    def _send_batch(self, batch: List[MintTicket]):
+        fees = self.gas.fees()
+        with self._lock:
+            if self._next_nonce is None:
+                self._resync_nonce()
+            self._stats["batches"] += 1
+
+        for ticket in batch:
+            try:
+                self._broadcast_new(ticket, fees)
+            except Exception as e:
+                if not self._is_nonce_error(e):
+                    self._fail(ticket, e)
+                    continue
+                # Someone else used our nonce (e.g. a manual tx) - resync and retry once
+                print(f"[Mint Queue] Nonce conflict, resyncing: {e}")
+                with self._lock:
+                    self._resync_nonce()
+                try:
+                    self._broadcast_new(ticket, fees)
+                except Exception as retry_error:
+                    self._fail(ticket, retry_error)
+
+        print(f"[Mint Queue] Broadcast batch of {len(batch)} mint(s)")
+
+    def _broadcast_new(self, ticket: MintTicket, fees: Dict):
+        # The watchdog frees nonces too, so allocation happens under the lock
+        with self._lock:
+            nonce, reuse = self._allocate_nonce()
+        try:
+            tx_hash = self._sign_and_send(ticket, nonce, fees)
+        except Exception as e:
+            if not self._is_nonce_error(e):
+                # Never reached the node; the next mint can have it
+                with self._lock:
+                    self._free_nonces[nonce] = reuse
+            raise
+        with self._lock:
+            ticket.nonce = nonce
+            ticket.nonce_reuse = reuse
+            self._pending[nonce] = ticket
+            self._stats["sent"] += 1
+        key = f"mint:{self.account.address}:{nonce}"
+        ticket.tracked = self.tracker.track(
+            # A reused nonce gets its own entry; the given-up one may still be tracked
+            tx_hash, label=f"mint nonce {nonce}", key=f"{key}:{reuse}" if reuse else key
+        )
+        ticket.tracked.receipt.add_done_callback(lambda future: self._on_receipt(ticket, future))
+        ticket.tx_hash.set_result(tx_hash)
+
+    def _sign_and_send(self, ticket: MintTicket, nonce: int, fees: Dict) -> str:
+        mint = self.contract.functions.safeMint(ticket.recipient_address, ticket.ipfs_hash)
+        tx_data = mint.build_transaction(
+            self.gas.tx_params(mint, self.account.address, self.gas_limit, fees=fees, nonce=nonce)
+        )
+        signed_tx = self.w3.eth.account.sign_transaction(tx_data, private_key=self.private_key)
+        tx_hash = self._normalize(self.w3.eth.send_raw_transaction(signed_tx.raw_transaction))
+
+        with self._lock:
+            ticket.fees = fees
+            ticket.sent_at = time.time()
+            ticket.first_sent_at = ticket.first_sent_at or ticket.sent_at
+            ticket.hashes.append(tx_hash)
+            self._by_hash[tx_hash] = ticket
+        if ticket.tracked:
+            self.tracker.add_hash(ticket.tracked.key, tx_hash)
+        return tx_hash
+
+    def _allocate_nonce(self):
+        """Lowest free nonce, else the next new one, with its reuse count. Caller must hold the lock."""
+        if self._free_nonces:
+            nonce = min(self._free_nonces)
+            return nonce, self._free_nonces.pop(nonce)
+        nonce = self._next_nonce
+        self._next_nonce += 1
+        return nonce, 0
+
+    def _resync_nonce(self):
+        """Reload the nonce from the node. Caller must hold the lock."""
+        chain_nonce = self.w3.eth.get_transaction_count(self.account.address, 'pending')
+        local_nonce = max(self._pending) + 1 if self._pending else 0
+        self._next_nonce = max(chain_nonce, local_nonce)
+        if self._free_nonces:
+            # Free nonces that got mined anyway, or that resync now hands out, are gone
+            mined_nonce = self.w3.eth.get_transaction_count(self.account.address, 'latest')
+            self._free_nonces = {
+                nonce: reuse for nonce, reuse in self._free_nonces.items()
+                if mined_nonce <= nonce < self._next_nonce
+            }
+
+    # --- RECEIPT TRACKING ---
+
+    def _on_receipt(self, ticket: MintTicket, future):
+        with self._lock:
+            if self._pending.get(ticket.nonce) is ticket:
+                del self._pending[ticket.nonce]
+            if ticket.receipt.done():
+                # Already failed (e.g. given up on by the watchdog)
+                return
+            error = future.exception()
+            if error is None and ticket.cancel_hash and self._normalize(future.result().transactionHash) == ticket.cancel_hash:
+                error = MintCancelledError(f"Mint at nonce {ticket.nonce} was cancelled after {len(ticket.hashes)} broadcasts")
+            confirmed = error is None and future.result().status == 1
+            self._stats["confirmed" if confirmed else "failed"] += 1
+        MINT_CONFIRM_SECONDS.observe(time.time() - ticket.first_sent_at, outcome="ok" if confirmed else "error")
+        if error is not None:
+            ticket.receipt.set_exception(error)
+        else:
+            ticket.receipt.set_result(future.result())
+
+    def _replace_stuck(self):
+        with self._lock:
+            pending = sorted(self._pending.items())
+
+        for nonce, ticket in pending:
+            # Mined but still gaining confirmations is not stuck
+            if ticket.tracked and ticket.tracked.mined_block is not None:
+                continue
+            if time.time() - ticket.sent_at > self.stuck_after:
+                if ticket.cancel_hash:
+                    self._give_up(ticket, TimeoutError(f"Cancellation of nonce {nonce} is stuck too"))
+                elif len(ticket.hashes) > self.max_replacements:
+                    self._cancel(ticket)
+                else:
+                    self._replace(ticket)
+
+    def _replace(self, ticket: MintTicket):
+        """Re-broadcast a stuck mint under the same nonce with higher fees"""
+        fees = self.gas.bump(ticket.fees, self.gas_bump)
+        try:
+            tx_hash = self._sign_and_send(ticket, ticket.nonce, fees)
+            with self._lock:
+                self._stats["replaced"] += 1
+            print(f"[Mint Queue] Replaced stuck nonce {ticket.nonce} with {tx_hash} at {fees}")
+        except Exception as e:
+            # "nonce too low" means one of the earlier hashes was mined; the
+            # tracker will pick up its receipt
+            if not self._is_nonce_error(e):
+                print(f"[Mint Queue] Replacement for nonce {ticket.nonce} failed: {e}")
+
+    def _cancel(self, ticket: MintTicket):
+        """Free a nonce that replacements couldn't unstick with a 0-value self-transfer"""
+        fees = self.gas.bump(ticket.fees, self.gas_bump)
+        tx_data = {
+            "from": self.account.address,
+            "to": self.account.address,
+            "value": 0,
+            "gas": 21000,
+            "nonce": ticket.nonce,
+            "chainId": self.w3.eth.chain_id,
+            **fees
+        }
+        try:
+            signed_tx = self.w3.eth.account.sign_transaction(tx_data, private_key=self.private_key)
+            tx_hash = self._normalize(self.w3.eth.send_raw_transaction(signed_tx.raw_transaction))
+        except Exception as e:
+            if self._is_nonce_error(e):
+                # An earlier hash was mined after all
+                return
+            self._give_up(ticket, e)
+            return
+
+        with self._lock:
+            ticket.cancel_hash = tx_hash
+            ticket.sent_at = time.time()
+        if ticket.tracked:
+            self.tracker.add_hash(ticket.tracked.key, tx_hash)
+        print(f"[Mint Queue] Cancelled stuck nonce {ticket.nonce} with {tx_hash} at {fees}")
+
+    def _give_up(self, ticket: MintTicket, error: Exception):
+        """Fail a ticket the watchdog can't resolve and hand its nonce to the next mint"""
+        print(f"[Mint Queue] Giving up on nonce {ticket.nonce}: {error}")
+        with self._lock:
+            if self._pending.get(ticket.nonce) is ticket:
+                del self._pending[ticket.nonce]
+                # Later nonces can't be mined until this one is filled
+                self._free_nonces[ticket.nonce] = ticket.nonce_reuse + 1
+        self._fail(ticket, error)
+
+    # --- HELPERS ---
+
+    def _fail(self, ticket: MintTicket, error: Exception):
+        with self._lock:
+            self._stats["failed"] += 1
+        if not ticket.tx_hash.done():
+            ticket.tx_hash.set_exception(error)
+        if not ticket.receipt.done():
+            ticket.receipt.set_exception(error)
+
+    @staticmethod
+    def _is_nonce_error(error: Exception) -> bool:
+        message = str(error).lower()
+        return "nonce too low" in message or "already known" in message or "replacement transaction underpriced" in message
+
+    @staticmethod
+    def _normalize(tx_hash) -> str:
+        return normalize_hash(tx_hash)
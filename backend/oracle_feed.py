@@ -0,0 +1,159 @@
+# backend/oracle_feed.py
+"""
+Oracle Price Feed
+Polls every configured pair on a background thread and publishes the
+results as an immutable snapshot, so request handlers read prices from
+memory instead of the RPC
+"""
+
+import threading
+import time
+from types import MappingProxyType
+from typing import Callable, Dict, List, Mapping, Optional
+
+
+class PriceSnapshot:
+    """One poll's worth of prices; never mutated after it is published"""
+
+    def __init__(self, prices: Dict[str, Dict], version: int, taken_at: float, poll_seconds: float):
+        self.prices: Mapping[str, Dict] = MappingProxyType(prices)
+        self.version = version
+        self.taken_at = taken_at
+        self.poll_seconds = poll_seconds
+
+    def age(self, now: float = None) -> float:
+        return (now or time.time()) - self.taken_at
+
+
+class OracleFeed:
+    """
+    Keeps a snapshot of all configured pairs current.
+
+    fetch(pair) returns the latest price dict or raises. A pair whose
+    fetch fails keeps its previous value, marked stale; with no previous
+    value (or when fetch returns None) fallback(pair) is used instead.
+    Listeners (on_snapshot and any added with add_listener) are called with
+    each snapshot after it is published.
+    """
+
+    def __init__(
+        self,
+        pairs: List[str],
+        fetch: Callable[[str], Optional[Dict]],
+        fallback: Callable[[str], Optional[Dict]] = None,
+        poll_interval: float = 10.0,
+        max_age: float = 60.0,
+        on_snapshot: Callable[[PriceSnapshot], None] = None
+    ):
+        self.pairs = list(dict.fromkeys(pairs))
+        self.fetch = fetch
+        self.fallback = fallback
+        self.poll_interval = poll_interval
+        self.max_age = max_age
+        self.listeners: List[Callable[[PriceSnapshot], None]] = [on_snapshot] if on_snapshot else []
+        self.polls = 0
+        self.errors = 0
+        self.last_error: Optional[str] = None
+        self._snapshot: Optional[PriceSnapshot] = None
+        # Forced polls (OracleService.clear_cache) run alongside the loop
+        self._poll_lock = threading.Lock()
+        self._thread = None
+        self._stop = threading.Event()
+
+    @property
+    def snapshot(self) -> Optional[PriceSnapshot]:
+        # Reading one attribute is atomic; the poller only ever swaps it
+        return self._snapshot
+
+    def get(self, pair: str) -> Optional[Dict]:
+        """Price from the current snapshot, or None if missing or too old"""
+        snapshot = self._snapshot
+        if snapshot is None or snapshot.age() > self.max_age:
+            return None
+        return snapshot.prices.get(pair)
+
+    def add_listener(self, listener: Callable[[PriceSnapshot], None]):
+        self.listeners.append(listener)
+
+    def start(self):
+        if self._thread and self._thread.is_alive():
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name="oracle-feed", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+
+    def _run(self):
+        while not self._stop.is_set():
+            started = time.time()
+            try:
+                self.poll_once()
+            except Exception as e:
+                # poll_once handles per-pair failures; this is a bug guard
+                print(f"⚠️ Oracle feed poll failed: {e}")
+            self._stop.wait(max(0.0, self.poll_interval - (time.time() - started)))
+
+    def poll_once(self) -> PriceSnapshot:
+        """Fetch every pair and publish a new snapshot"""
+        with self._poll_lock:
+            return self._poll()
+
+    def _poll(self) -> PriceSnapshot:
+        started = time.time()
+        previous = self._snapshot.prices if self._snapshot else {}
+        prices = {}
+
+        for pair in self.pairs:
+            try:
+                data = self.fetch(pair)
+            except Exception as e:
+                self.errors += 1
+                self.last_error = f"{pair}: {e}"
+                data = None
+                if pair in previous:
+                    # Keep serving the last good value rather than a mock
+                    data = dict(previous[pair], stale=True)
+            if data is None and self.fallback:
+                data = self.fallback(pair)
+            if data is not None:
+                prices[pair] = data
+
+        now = time.time()
+        version = self._snapshot.version + 1 if self._snapshot else 1
+        snapshot = self._snapshot = PriceSnapshot(prices, version, now, now - started)
+        self.polls += 1
+
+        for listener in self.listeners:
+            try:
+                listener(snapshot)
+            except Exception as e:
+                print(f"⚠️ Oracle feed listener failed: {e}")
+        return snapshot
+
+    def stats(self) -> Dict:
+        now = time.time()
+        snapshot = self._snapshot
+        pairs = {}
+        if snapshot:
+            for pair, data in snapshot.prices.items():
+                pairs[pair] = {
+                    "price": data.get("price"),
+                    "source": data.get("source"),
+                    "stale": bool(data.get("stale")),
+                    "oracleTimestamp": data.get("timestamp"),
+                    "fetchedAgo": round(now - data.get("fetched_at", now), 2)
+                }
+        return {
+            "running": bool(self._thread and self._thread.is_alive()),
+            "pollInterval": self.poll_interval,
+            "maxAge": self.max_age,
+            "version": snapshot.version if snapshot else 0,
+            "snapshotAge": round(snapshot.age(now), 2) if snapshot else None,
+            "lastPollSeconds": round(snapshot.poll_seconds, 4) if snapshot else None,
+            "polls": self.polls,
+            "errors": self.errors,
+            "lastError": self.last_error,
+            "pairs": pairs
+        }
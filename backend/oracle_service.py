@@ -5,9 +5,22 @@ Handles oracle price feeds and updates for dynamic NFT pricing
 """
 
 import time
-from typing import Dict, Optional, Tuple
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FutureTimeoutError
+from typing import Dict, List, Optional, Tuple
 import os
 from web3 import Web3
+from web3_provider import RPCUnavailableError, Web3Registry, batch_call
+from price_cache import PriceCache, parse_ttls
+from oracle_feed import OracleFeed
+from currency_rates import QUOTE_CURRENCY, RateSnapshot
+from price_history import PriceHistory
+from metrics import REGISTRY, histogram
+import numpy as np
+
+# On-chain oracle reads; method is single (getLatestPrice), batch or events
+ORACLE_FETCH_SECONDS = histogram(
+    "aria_oracle_fetch_seconds", "QIE Oracle RPC read latency", ["method", "outcome"]
+)
 
 class OracleService:
     """Service for QIE Oracle (AggregatorV3 compatible)"""
@@ -16,12 +29,52 @@ class OracleService:
     ORACLE_ADDRESS = os.getenv("QIE_ORACLE_ADDRESS", "")
     PROVIDER_URL = os.getenv("QIE_RPC_URL", "https://rpc-main1.qiblockchain.online/")
     
-    # Price cache
-    price_cache: Dict[str, Dict] = {}
-    CACHE_TTL = 30
+    # Price cache (per-pair overrides: ORACLE_PAIR_TTLS="ARIA/USD=15,INR/USD=3600")
+    CACHE_TTL = int(os.getenv("ORACLE_CACHE_TTL", "30"))
+    price_cache = PriceCache(
+        default_ttl=CACHE_TTL,
+        stale_ttl=float(os.getenv("ORACLE_STALE_TTL", "300")),
+        max_entries=int(os.getenv("ORACLE_CACHE_MAX_ENTRIES", "256")),
+        ttls=parse_ttls(os.getenv("ORACLE_PAIR_TTLS", ""))
+    )
+    # Hit/miss/load counters are read from the cache at /metrics scrape time
+    REGISTRY.register_collector(price_cache.metric_families)
+    
+    # Background feed: keeps a snapshot of these pairs so reads skip the RPC
+    FEED_PAIRS = [
+        pair.strip() for pair in
+        os.getenv("ORACLE_FEED_PAIRS", "ARIA/USD,QIE/USD,ETH/USD,BTC/USD,INR/USD,RE_INDEX").split(",")
+        if pair.strip()
+    ]
+    FEED_POLL_INTERVAL = float(os.getenv("ORACLE_POLL_INTERVAL", "10"))
+    feed: Optional[OracleFeed] = None
+
+    # Pairs published by our SimpleOracle deployment; the rest are mocked
+    ORACLE_PAIRS = ("ARIA/USD",)
+
+    # Currencies priced against USD for conversions
+    SUPPORTED_CURRENCIES = ["USD", "ARIA", "QIE", "ETH", "BTC", "INR"]
+    # Currencies listed next to every NFT price
+    NFT_PRICE_CURRENCIES = ["USD", "INR", "ETH"]
+
+    # Price history, fed by feed polls and PriceUpdated events
+    history = PriceHistory(
+        os.getenv("PRICE_HISTORY_DIR", os.path.join(os.path.dirname(os.path.abspath(__file__)), "price_history")),
+        max_raw=int(os.getenv("PRICE_HISTORY_MAX_RAW", "100000"))
+    )
+    HISTORY_START_BLOCK = os.getenv("PRICE_HISTORY_START_BLOCK")
+    # Without a start block, backfill this many blocks of events on boot
+    HISTORY_BACKFILL_BLOCKS = int(os.getenv("PRICE_HISTORY_BACKFILL_BLOCKS", "20000"))
+    HISTORY_BLOCK_RANGE = int(os.getenv("PRICE_HISTORY_BLOCK_RANGE", "2000"))
+    _history_block: Optional[int] = None
+
+    # Batch reads give up waiting after this and return what they have
+    BATCH_DEADLINE = float(os.getenv("ORACLE_BATCH_DEADLINE", "2.0"))
+    _batch_executor = ThreadPoolExecutor(max_workers=4, thread_name_prefix="oracle-batch")
     
-    # Initialize Web3
-    w3 = Web3(Web3.HTTPProvider(PROVIDER_URL))
+    # Initialize Web3 (shared pooled provider)
+    w3 = Web3Registry.get_web3(PROVIDER_URL)
+    _oracle_contract = None
     
     # ✅ SimpleOracle ABI (Custom Interface)
     ORACLE_ABI = [
@@ -34,82 +87,192 @@ class OracleService:
             ],
             "stateMutability": "view",
             "type": "function"
+        },
+        {
+            "anonymous": False,
+            "inputs": [
+                {"indexed": False, "name": "pair", "type": "string"},
+                {"indexed": False, "name": "price", "type": "int256"},
+                {"indexed": False, "name": "timestamp", "type": "uint256"}
+            ],
+            "name": "PriceUpdated",
+            "type": "event"
         }
     ]
     
     @classmethod
-    def get_oracle_contract(cls):
-        """Get oracle contract instance"""
+    def get_oracle_address(cls) -> str:
         # Use address from contract_info if env var not set, or fallback
         if not cls.ORACLE_ADDRESS:
             from contract_info import ORACLE_ADDRESS
             cls.ORACLE_ADDRESS = ORACLE_ADDRESS
+        return cls.ORACLE_ADDRESS
 
-        if not cls.ORACLE_ADDRESS:
+    @classmethod
+    def get_oracle_contract(cls):
+        """
+        Get oracle contract instance (built once; RPC liveness is tracked by
+        the provider's circuit breakers, not probed here)
+        """
+        if cls._oracle_contract is not None:
+            return cls._oracle_contract
+        if not cls.get_oracle_address():
             print("⚠️ Oracle address not set")
             return None
         
         try:
-            if not cls.w3.is_connected():
-                print("❌ Failed to connect to QIE RPC")
-                return None
-            
-            return cls.w3.eth.contract(
-                address=Web3.to_checksum_address(cls.ORACLE_ADDRESS),
-                abi=cls.ORACLE_ABI
-            )
+            cls._oracle_contract = Web3Registry.get_contract(cls.ORACLE_ADDRESS, cls.ORACLE_ABI, cls.w3)
+            return cls._oracle_contract
         except Exception as e:
-            print(f"❌ Failed to connect to oracle: {e}")
+            print(f"❌ Failed to load oracle contract: {e}")
             return None
     
+    @classmethod
+    def start_feed(cls) -> OracleFeed:
+        """Start polling FEED_PAIRS in the background"""
+        if cls.feed is None:
+            cls.feed = OracleFeed(
+                cls.FEED_PAIRS,
+                fetch=cls._poll_price,
+                fallback=cls.get_mock_price,
+                poll_interval=cls.FEED_POLL_INTERVAL,
+                max_age=float(os.getenv("ORACLE_FEED_MAX_AGE", str(cls.FEED_POLL_INTERVAL * 6))),
+                on_snapshot=cls._record_history
+            )
+            cls.feed.start()
+            print(f"🔮 Oracle feed polling {len(cls.FEED_PAIRS)} pair(s) every {cls.FEED_POLL_INTERVAL}s")
+        return cls.feed
+
+    @classmethod
+    def _record_history(cls, snapshot):
+        """Feed hook: store fresh on-chain prices, then pick up any PriceUpdated events"""
+        for pair, data in snapshot.prices.items():
+            # Mocks and carried-over values are not price updates
+            if pair in cls.ORACLE_PAIRS and not data.get("stale") and data.get("source", "").startswith("QIE Oracle"):
+                cls.history.record(pair, data["timestamp"], data["price"])
+        try:
+            cls.sync_price_events()
+        except Exception as e:
+            print(f"⚠️ Price history event sync failed: {e}")
+
+    @classmethod
+    @ORACLE_FETCH_SECONDS.time(method="events")
+    def sync_price_events(cls) -> int:
+        """
+        Record PriceUpdated events emitted since the last sync.
+
+        Returns:
+            Number of new points recorded
+        """
+        oracle = cls.get_oracle_contract()
+        if not oracle:
+            return 0
+
+        head = cls.w3.eth.block_number
+        if cls._history_block is None:
+            if cls.HISTORY_START_BLOCK:
+                cls._history_block = int(cls.HISTORY_START_BLOCK) - 1
+            else:
+                cls._history_block = max(-1, head - cls.HISTORY_BACKFILL_BLOCKS)
+
+        recorded = 0
+        from_block = cls._history_block + 1
+        while from_block <= head:
+            to_block = min(from_block + cls.HISTORY_BLOCK_RANGE - 1, head)
+            for log in oracle.events.PriceUpdated.get_logs(from_block=from_block, to_block=to_block):
+                args = log["args"]
+                if cls.history.record(args["pair"], args["timestamp"], args["price"] / 10 ** 8):
+                    recorded += 1
+            cls._history_block = to_block
+            from_block = to_block + 1
+        return recorded
+
+    @classmethod
+    def get_price_history(
+        cls,
+        pair: str,
+        start: float = None,
+        end: float = None,
+        resolution: str = "auto",
+        max_points: int = 500
+    ) -> Optional[Dict]:
+        """Downsampled series for pair, defaulting to the last 24 hours"""
+        end = time.time() if end is None else end
+        start = end - 86400 if start is None else start
+        return cls.history.query(pair, start, end, resolution, max_points)
+
     @classmethod
     def get_price_from_oracle(cls, pair: str = "ARIA/USD") -> Optional[Dict]:
         """
         Fetch price from QIE Oracle (SimpleOracle)
         Falls back to mock if unavailable
         """
-        # Check cache
-        if pair in cls.price_cache:
-            cached = cls.price_cache[pair]
-            if time.time() - cached['fetched_at'] < cls.CACHE_TTL:
-                # print(f"📦 Cache hit for {pair}")
-                return cached
+        # Fed pairs are served straight from the feed's snapshot
+        if cls.feed:
+            price_data = cls.feed.get(pair)
+            if price_data:
+                return price_data
+
+        # Concurrent misses share one fetch; expired prices are served
+        # while a background refresh runs
+        return cls.price_cache.get(pair, lambda: cls._fetch_price(pair))
+
+    @classmethod
+    @ORACLE_FETCH_SECONDS.time(method="single")
+    def _read_oracle(cls, pair: str) -> Dict:
+        """Read a pair from the SimpleOracle contract; raises if unavailable"""
+        oracle = cls.get_oracle_contract()
+        if not oracle:
+            raise ConnectionError("QIE Oracle unavailable")
+
+        # Call getLatestPrice(pair) - SimpleOracle function
+        (answer, updatedAt) = oracle.functions.getLatestPrice(pair).call()
+        return cls._oracle_price_data(pair, answer, updatedAt)
+
+    @staticmethod
+    def _oracle_price_data(pair: str, answer: int, updatedAt: int) -> Dict:
+        # SimpleOracle uses 8 decimals by default (from our deployment script)
+        decimals = 8
         
+        return {
+            "pair": pair,
+            "price": answer / (10 ** decimals),
+            "decimals": decimals,
+            "timestamp": updatedAt,
+            "roundId": 0, # Not used in SimpleOracle
+            "fetched_at": time.time(),
+            "source": "QIE Oracle (Simple)"
+        }
+
+    @classmethod
+    def _fetch_price(cls, pair: str) -> Optional[Dict]:
+        """Read a pair from the oracle contract, or the mock table"""
         # Try real oracle (Only for ARIA/USD since we only deployed one)
-        if pair == "ARIA/USD":
-            oracle = cls.get_oracle_contract()
-            if oracle:
-                try:
-                    print(f"🔮 Fetching {pair} from QIE Oracle...")
-                    
-                    # Call getLatestPrice(pair) - SimpleOracle function
-                    (answer, updatedAt) = oracle.functions.getLatestPrice(pair).call()
-                    
-                    # SimpleOracle uses 8 decimals by default (from our deployment script)
-                    decimals = 8
-                    
-                    # Convert to float
-                    price_float = answer / (10 ** decimals)
-                    
-                    price_data = {
-                        "pair": pair,
-                        "price": price_float,
-                        "decimals": decimals,
-                        "timestamp": updatedAt,
-                        "roundId": 0, # Not used in SimpleOracle
-                        "fetched_at": time.time(),
-                        "source": "QIE Oracle (Simple)"
-                    }
-                    
-                    cls.price_cache[pair] = price_data
-                    print(f"✅ Got {pair}: ${price_float}")
-                    return price_data
-                    
-                except Exception as e:
-                    print(f"⚠️ Oracle fetch failed: {e}")
-                    print("   Falling back to mock prices...")
+        if pair in cls.ORACLE_PAIRS:
+            try:
+                print(f"🔮 Fetching {pair} from QIE Oracle...")
+                price_data = cls._read_oracle(pair)
+                print(f"✅ Got {pair}: ${price_data['price']}")
+                return price_data
+            except RPCUnavailableError:
+                # Circuit open: no network call was made, answer right away
+                pass
+            except Exception as e:
+                print(f"⚠️ Oracle fetch failed: {e}")
+
+            last_known = cls.price_cache.peek(pair)
+            if last_known:
+                return dict(last_known, stale=True)
+            print("   Falling back to mock prices...")
         
         return cls.get_mock_price(pair)
+
+    @classmethod
+    def _poll_price(cls, pair: str) -> Optional[Dict]:
+        """Feed fetcher: on-chain pairs raise on failure so the feed keeps the last good price"""
+        if pair in cls.ORACLE_PAIRS:
+            return cls._read_oracle(pair)
+        return cls.get_mock_price(pair)
     
     @classmethod
     def get_mock_price(cls, pair: str) -> Optional[Dict]:
@@ -135,7 +298,6 @@ class OracleService:
             "source": "Mock Fallback"
         }
         
-        cls.price_cache[pair] = price_data
         return price_data
     
     @classmethod
@@ -210,35 +372,71 @@ class OracleService:
         """
         Get NFT price in multiple currencies
         """
+        return cls.get_nft_prices_in_currencies([aria_price])[0]
+
+    @classmethod
+    def get_nft_prices_in_currencies(cls, aria_prices: List[float]) -> List[Dict[str, float]]:
+        """
+        Price many NFTs in ARIA, USD, INR and ETH against one rate snapshot
+        """
         try:
-            # Get ARIA/USD rate
-            aria_usd_data = cls.get_price_from_oracle("ARIA/USD")
-            if not aria_usd_data:
-                return {"ARIA": aria_price}
-            
-            usd_price = aria_price * aria_usd_data['price']
-            
-            # Convert to other currencies
-            prices = {
-                "ARIA": aria_price,
-                "USD": usd_price,
-            }
-            
-            # Add INR if available
-            inr_usd_data = cls.get_price_from_oracle("INR/USD")
-            if inr_usd_data:
-                prices["INR"] = usd_price / inr_usd_data['price']
-            
-            # Add ETH if available
-            eth_usd_data = cls.get_price_from_oracle("ETH/USD")
-            if eth_usd_data:
-                prices["ETH"] = usd_price / eth_usd_data['price']
-            
-            return prices
+            snapshot = cls.get_rate_snapshot(["ARIA"] + cls.NFT_PRICE_CURRENCIES)
+            if "ARIA" not in snapshot:
+                return [{"ARIA": aria_price} for aria_price in aria_prices]
+
+            targets = [currency for currency in cls.NFT_PRICE_CURRENCIES if currency in snapshot]
+            # Rows are NFTs, columns are target currencies
+            rates = snapshot.cross_matrix()[snapshot.index["ARIA"], [snapshot.index[t] for t in targets]]
+            converted = np.outer(np.asarray(aria_prices, dtype=np.float64), rates)
+
+            return [
+                {"ARIA": aria_price, **dict(zip(targets, row))}
+                for aria_price, row in zip(aria_prices, converted.tolist())
+            ]
             
         except Exception as e:
             print(f"❌ Multi-currency price error: {e}")
-            return {"ARIA": aria_price}
+            return [{"ARIA": aria_price} for aria_price in aria_prices]
+
+    @classmethod
+    def get_rate_snapshot(cls, currencies: List[str] = None) -> RateSnapshot:
+        """
+        USD rates for currencies (default SUPPORTED_CURRENCIES) resolved in
+        one batch, so every conversion made from it is consistent.
+        Currencies without a usable price are left out.
+        """
+        currencies = list(dict.fromkeys([QUOTE_CURRENCY] + list(currencies or cls.SUPPORTED_CURRENCIES)))
+        pairs = [f"{currency}/{QUOTE_CURRENCY}" for currency in currencies if currency != QUOTE_CURRENCY]
+        prices, _ = cls.get_prices_batch(pairs)
+
+        usd_rates = {QUOTE_CURRENCY: 1.0}
+        sources = {QUOTE_CURRENCY: "fixed"}
+        for currency in currencies:
+            price_data = prices.get(f"{currency}/{QUOTE_CURRENCY}")
+            if price_data and price_data["price"] > 0:
+                usd_rates[currency] = price_data["price"]
+                sources[currency] = price_data.get("source")
+        return RateSnapshot(usd_rates, sources)
+
+    @classmethod
+    def convert_bulk(cls, amounts: List[float], from_currencies, to_currencies) -> Tuple[np.ndarray, RateSnapshot]:
+        """
+        Vectorized convert_currency.
+
+        Args:
+            amounts: Amounts to convert
+            from_currencies / to_currencies: One currency for all amounts,
+                or a list the same length as amounts
+
+        Returns:
+            (converted amounts with NaN where a currency is unknown,
+             the rate snapshot used)
+        """
+        needed = []
+        for currencies in (from_currencies, to_currencies):
+            needed.extend([currencies] if isinstance(currencies, str) else currencies)
+        snapshot = cls.get_rate_snapshot(needed)
+        return snapshot.convert(amounts, from_currencies, to_currencies), snapshot
     
     @classmethod
     def apply_real_estate_multiplier(cls, original_value: float) -> float:
@@ -264,19 +462,109 @@ class OracleService:
         """
         Fetch multiple prices in batch
         """
+        results, _ = cls.get_prices_batch(pairs)
+        return results
+
+    @classmethod
+    def get_prices_batch(cls, pairs: List[str], deadline: float = None) -> Tuple[Dict[str, Dict], List[str]]:
+        """
+        Fetch many pairs with at most one RPC round trip.
+
+        Duplicates are dropped and fed or cached pairs are answered from
+        memory. Uncached on-chain pairs are read in a single JSON-RPC batch;
+        if it outlives the deadline, stale prices (or nothing) are returned
+        for them and the batch still refills the cache when it lands.
+
+        Args:
+            pairs: Trading pairs, e.g. ["ARIA/USD", "ETH/USD"]
+            deadline: Seconds to wait for the RPC (default BATCH_DEADLINE)
+
+        Returns:
+            (prices by pair, pairs that could not be priced in time)
+        """
+        deadline = cls.BATCH_DEADLINE if deadline is None else deadline
         results = {}
-        for pair in pairs:
-            data = cls.get_price_from_oracle(pair)
-            if data:
-                results[pair] = data
-        
+        stale = {}
+        to_fetch = []
+
+        for pair in dict.fromkeys(pairs):
+            price_data = cls.feed.get(pair) if cls.feed else None
+            if price_data:
+                results[pair] = price_data
+                continue
+            price_data, fresh = cls.price_cache.lookup(pair)
+            if fresh:
+                results[pair] = price_data
+                continue
+            if price_data:
+                stale[pair] = price_data
+            if pair in cls.ORACLE_PAIRS:
+                to_fetch.append(pair)
+            else:
+                price_data = cls.get_mock_price(pair)
+                if price_data:
+                    cls.price_cache.put(pair, price_data)
+                    results[pair] = price_data
+
+        missing = []
+        if to_fetch:
+            future = cls._batch_executor.submit(cls._read_oracle_batch, to_fetch)
+            try:
+                results.update(future.result(timeout=deadline))
+            except FutureTimeoutError:
+                print(f"⚠️ Oracle batch missed its {deadline}s deadline for {len(to_fetch)} pair(s)")
+                for pair in to_fetch:
+                    if pair in stale:
+                        results[pair] = stale[pair]
+                    else:
+                        missing.append(pair)
+
+        return results, missing
+
+    @classmethod
+    def _read_oracle_batch(cls, pairs: List[str]) -> Dict[str, Dict]:
+        """getLatestPrice for every pair in one JSON-RPC batch, caching the results"""
+        results = {}
+        try:
+            oracle = cls.get_oracle_contract()
+            if not oracle:
+                raise ConnectionError("QIE Oracle unavailable")
+            with ORACLE_FETCH_SECONDS.time(method="batch"):
+                answers = batch_call(cls.w3, [oracle.functions.getLatestPrice(pair) for pair in pairs])
+        except Exception as e:
+            if not isinstance(e, RPCUnavailableError):
+                print(f"⚠️ Oracle batch fetch failed: {e}")
+            answers = [e] * len(pairs)
+
+        for pair, answer in zip(pairs, answers):
+            if isinstance(answer, Exception):
+                if not isinstance(answer, RPCUnavailableError):
+                    print(f"⚠️ Oracle fetch failed for {pair}: {answer}")
+                last_known = cls.price_cache.peek(pair)
+                price_data = dict(last_known, stale=True) if last_known else cls.get_mock_price(pair)
+            else:
+                price_data = cls._oracle_price_data(pair, *answer)
+            if price_data:
+                cls.price_cache.put(pair, price_data)
+                results[pair] = price_data
         return results
     
     @classmethod
-    def clear_cache(cls):
-        """Clear the price cache"""
-        cls.price_cache = {}
+    def clear_cache(cls) -> bool:
+        """
+        Clear the price cache and re-poll the feed, whose snapshot is read
+        before the cache for FEED_PAIRS.
+
+        Returns:
+            True if the feed snapshot was refreshed
+        """
+        cls.price_cache.clear()
         print("✅ Oracle price cache cleared")
+        if cls.feed is None:
+            return False
+        cls.feed.poll_once()
+        print("✅ Oracle feed snapshot refreshed")
+        return True
 
 
 # Test if running directly
@@ -297,4 +585,5 @@ if __name__ == "__main__":
     prices = OracleService.get_nft_price_in_currencies(1000)
     print(f"\n1000 ARIA in multiple currencies:")
     for curr, amount in prices.items():
-        print(f"  {amount:.2f} {curr}")
\ No newline at end of file
+        print(f"  {amount:.2f} {curr}")
+
@@ -0,0 +1,237 @@
+# backend/pdf_extraction.py
+"""
+Document Text Extraction
+Spools uploads to temp files and extracts PDF text page-parallel across
+processes, stopping once there is enough text for the model's context
+"""
+
+import hashlib
+import io
+import os
+import shutil
+import tempfile
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from typing import List, Optional, Union
+
+from pypdf import PdfReader
+
+from metrics import histogram
+
+# --- LIMITS ---
+# Uploads above this size are rejected outright
+MAX_UPLOAD_BYTES = int(os.getenv("PDF_MAX_UPLOAD_BYTES", str(50 * 1024 * 1024)))
+# Pages after this are never parsed
+MAX_PAGES = int(os.getenv("PDF_MAX_PAGES", "500"))
+# Stop extracting once this many characters are collected (~4 chars per token)
+TEXT_CHAR_BUDGET = int(os.getenv("PDF_TEXT_CHAR_BUDGET", "200000"))
+# Uploads stay in memory below this size, then roll over to disk
+SPOOL_MEMORY_BYTES = int(os.getenv("PDF_SPOOL_MEMORY_BYTES", str(1024 * 1024)))
+# Documents with fewer pages than this are extracted in-process
+PARALLEL_PAGE_THRESHOLD = int(os.getenv("PDF_PARALLEL_PAGE_THRESHOLD", "16"))
+PAGES_PER_TASK = int(os.getenv("PDF_PAGES_PER_TASK", "8"))
+EXTRACTION_PROCESSES = int(os.getenv("PDF_EXTRACTION_PROCESSES", str(os.cpu_count() or 2)))
+
+COPY_CHUNK_BYTES = 64 * 1024
+
+# Batch extraction runs in pool processes whose metrics are not scraped;
+# /metrics covers it through the pipeline stage timings instead
+EXTRACTION_SECONDS = histogram("aria_pdf_extraction_seconds", "In-process document text extraction time")
+
+_process_pool = None
+
+
+class DocumentTooLargeError(ValueError):
+    """Raised when an upload exceeds MAX_UPLOAD_BYTES"""
+
+
+class SpooledDocument:
+    """
+    An upload copied into a temp file (kept in memory while small) and
+    hashed on the way in, so the pipeline never needs the whole document
+    as one bytes object.
+    """
+
+    def __init__(self, spool, size: int, sha256: str):
+        self._spool = spool
+        self._path: Optional[str] = None
+        self.size = size
+        self.sha256 = sha256
+
+    @classmethod
+    def from_stream(cls, stream, max_bytes: int = None) -> "SpooledDocument":
+        max_bytes = MAX_UPLOAD_BYTES if max_bytes is None else max_bytes
+        spool = tempfile.SpooledTemporaryFile(max_size=SPOOL_MEMORY_BYTES)
+        digest = hashlib.sha256()
+        size = 0
+        while True:
+            chunk = stream.read(COPY_CHUNK_BYTES)
+            if not chunk:
+                break
+            size += len(chunk)
+            if size > max_bytes:
+                spool.close()
+                raise DocumentTooLargeError(f"Document exceeds {max_bytes} bytes")
+            digest.update(chunk)
+            spool.write(chunk)
+        spool.seek(0)
+        return cls(spool, size, digest.hexdigest())
+
+    @classmethod
+    def from_bytes(cls, data: bytes) -> "SpooledDocument":
+        spool = tempfile.SpooledTemporaryFile(max_size=SPOOL_MEMORY_BYTES)
+        spool.write(data)
+        spool.seek(0)
+        return cls(spool, len(data), hashlib.sha256(data).hexdigest())
+
+    def read(self) -> bytes:
+        self._spool.seek(0)
+        return self._spool.read()
+
+    def path(self) -> str:
+        """Materialize the document as a named file that worker processes can open"""
+        if self._path is None:
+            fd, path = tempfile.mkstemp(suffix=".pdf", prefix="aria-upload-")
+            with os.fdopen(fd, "wb") as out:
+                self._spool.seek(0)
+                shutil.copyfileobj(self._spool, out, COPY_CHUNK_BYTES)
+            self._path = path
+        return self._path
+
+    def close(self):
+        self._spool.close()
+        if self._path:
+            try:
+                os.remove(self._path)
+            except OSError:
+                pass
+            self._path = None
+
+
+def get_process_pool() -> ProcessPoolExecutor:
+    """Process pool shared by page-parallel and batch extraction"""
+    global _process_pool
+    if _process_pool is None:
+        _process_pool = ProcessPoolExecutor(max_workers=EXTRACTION_PROCESSES)
+    return _process_pool
+
+
+def is_pdf(filename: str, content_type: str) -> bool:
+    return "pdf" in (content_type or "").lower() or filename.lower().endswith('.pdf')
+
+
+def _extract_page_range(path: str, start: int, stop: int) -> List[str]:
+    """Worker: extract text from pages [start, stop) of the PDF at path"""
+    reader = PdfReader(path)
+    texts = []
+    for index in range(start, stop):
+        text_content = reader.pages[index].extract_text()
+        if text_content:
+            texts.append(text_content)
+    return texts
+
+
+def _extract_serial(reader: PdfReader, page_count: int, char_budget: int) -> List[str]:
+    texts = []
+    collected = 0
+    for index in range(page_count):
+        text_content = reader.pages[index].extract_text()
+        if text_content:
+            texts.append(text_content)
+            collected += len(text_content)
+            if collected >= char_budget:
+                break
+    return texts
+
+
+def _extract_parallel(path: str, page_count: int, char_budget: int) -> List[str]:
+    """
+    Fan page ranges out to the process pool, consuming results in page
+    order. At most two ranges per worker are in flight so that reaching the
+    character budget cancels the remaining work early.
+    """
+    pool = get_process_pool()
+    ranges = deque(
+        (start, min(start + PAGES_PER_TASK, page_count))
+        for start in range(0, page_count, PAGES_PER_TASK)
+    )
+    in_flight = deque()
+    texts = []
+    collected = 0
+
+    try:
+        while ranges or in_flight:
+            while ranges and len(in_flight) < EXTRACTION_PROCESSES * 2:
+                start, stop = ranges.popleft()
+                in_flight.append(pool.submit(_extract_page_range, path, start, stop))
+
+            for text_content in in_flight.popleft().result():
+                texts.append(text_content)
+                collected += len(text_content)
+            if collected >= char_budget:
+                break
+    finally:
+        for future in in_flight:
+            future.cancel()
+    return texts
+
+
+@EXTRACTION_SECONDS.time()
+def extract_document_text(
+    source: Union[bytes, str, SpooledDocument],
+    filename: str,
+    content_type: str,
+    parallel: bool = True,
+    max_pages: int = None,
+    char_budget: int = None
+) -> str:
+    """
+    Extract machine-readable text from an uploaded document.
+
+    Args:
+        source: Raw bytes, a file path or a SpooledDocument
+        parallel: Allow fanning large PDFs out across processes. Callers
+            already running inside the process pool must pass False.
+        max_pages: Pages beyond this are ignored (default MAX_PAGES)
+        char_budget: Stop once this many characters are collected
+    """
+    max_pages = MAX_PAGES if max_pages is None else max_pages
+    char_budget = TEXT_CHAR_BUDGET if char_budget is None else char_budget
+
+    extracted_text = ""
+    try:
+        # Check content type or filename
+        if is_pdf(filename, content_type):
+            if isinstance(source, SpooledDocument):
+                path = source.path()
+            elif isinstance(source, bytes):
+                path = None
+            else:
+                path = source
+
+            if path is None:
+                reader = PdfReader(io.BytesIO(source))
+            else:
+                reader = PdfReader(path)
+            page_count = min(len(reader.pages), max_pages)
+
+            if parallel and path and page_count >= PARALLEL_PAGE_THRESHOLD:
+                texts = _extract_parallel(path, page_count, char_budget)
+            else:
+                texts = _extract_serial(reader, page_count, char_budget)
+            extracted_text = "\n".join(texts)[:char_budget]
+        else:
+            # Fallback implementation or warning for non-PDFs
+            # For images, we can't extract text without OCR libraries like Tesseract
+            # But for the demo, we assume PDFs.
+            extracted_text = "Non-PDF document provided. Analysis limited."
+
+        if len(extracted_text) < 5:
+            # If extraction fails or is empty
+            extracted_text = "No machine-readable text found in document."
+
+    except Exception as e:
+        print(f"Text extraction failed for {filename}: {e}")
+        extracted_text = "Error extracting text from document."
+
+    return extracted_text
@@ -0,0 +1,69 @@
+# backend/pin_index.py
+"""
+Pin Index
+Remembers which CID each metadata document was pinned under, keyed by a
+hash of its canonical JSON, so retries and re-mints of the same report
+reuse the existing pin instead of uploading it again
+"""
+
+import hashlib
+import json
+from typing import Dict, Optional
+
+from sqlite_cache import SQLiteCache
+
+# Fields stamped at pin time that don't change what the document says
+VOLATILE_KEYS = {"verified_at"}
+VOLATILE_TRAITS = {"Verified Date"}
+
+
+def _strip_volatile(value):
+    if isinstance(value, dict):
+        return {
+            key: _strip_volatile(item) for key, item in value.items()
+            if key not in VOLATILE_KEYS
+        }
+    if isinstance(value, list):
+        return [
+            _strip_volatile(item) for item in value
+            if not (isinstance(item, dict) and item.get("trait_type") in VOLATILE_TRAITS)
+        ]
+    return value
+
+
+def canonical_json(json_data: Dict, keep_volatile: bool = False) -> bytes:
+    """
+    Sorted-key, compact serialization, so equal dicts get equal bytes.
+    Volatile fields are dropped for hashing; pass keep_volatile for the
+    exact bytes that get pinned.
+    """
+    return json.dumps(
+        json_data if keep_volatile else _strip_volatile(json_data),
+        sort_keys=True, ensure_ascii=False, separators=(",", ":")
+    ).encode("utf-8")
+
+
+def content_hash(json_data: Dict) -> str:
+    return hashlib.sha256(canonical_json(json_data)).hexdigest()
+
+
+class PinIndex(SQLiteCache):
+    """Content hash -> CID of the pinned document"""
+
+    def __init__(self, db_path: str, max_entries: int = 20000, ttl: int = 30 * 24 * 3600):
+        super().__init__(
+            db_path,
+            table="pinned_cids",
+            key_columns=("content_hash",),
+            value_column="cid",
+            max_entries=max_entries,
+            ttl=ttl,
+            name="Pin index"
+        )
+
+    def get(self, key: str) -> Optional[str]:
+        """Return the CID pinned for a content hash, or None on a miss / expired entry"""
+        return self._get((key,))
+
+    def put(self, key: str, cid: str):
+        self._put((key,), cid)
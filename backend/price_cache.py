@@ -0,0 +1,212 @@
+# backend/price_cache.py
+"""
+Price Cache
+Thread-safe TTL cache for oracle prices. Concurrent misses for the same
+pair share one fetch, and recently expired prices are served while a
+background refresh runs.
+"""
+
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+
+def parse_ttls(value: str) -> Dict[str, float]:
+    """Parse per-pair TTLs like 'ARIA/USD=15,INR/USD=3600'"""
+    ttls = {}
+    for item in (value or "").split(","):
+        if "=" not in item:
+            continue
+        pair, seconds = item.rsplit("=", 1)
+        try:
+            ttls[pair.strip()] = float(seconds)
+        except ValueError:
+            print(f"⚠️ Ignoring invalid price TTL '{item}'")
+    return ttls
+
+
+class PriceCache:
+    """
+    Bounded LRU cache with per-key TTLs, single-flight loads and
+    stale-while-revalidate.
+
+    An entry is fresh for its TTL. For stale_ttl seconds after that it is
+    still returned, but the first reader kicks off a background refresh.
+    Older entries (or misses) are loaded in the caller's thread, with
+    concurrent callers for the same key waiting on that one load.
+    """
+
+    def __init__(
+        self,
+        default_ttl: float = 30.0,
+        stale_ttl: float = 300.0,
+        max_entries: int = 256,
+        ttls: Dict[str, float] = None,
+        refresh_workers: int = 4
+    ):
+        self.default_ttl = default_ttl
+        self.stale_ttl = stale_ttl
+        self.max_entries = max_entries
+        self.ttls = dict(ttls or {})
+        self.hits = 0
+        self.stale_hits = 0
+        self.misses = 0
+        self.coalesced = 0
+        self.loads = 0
+        self.load_errors = 0
+        self._entries: "OrderedDict[str, tuple]" = OrderedDict()
+        self._in_flight: Dict[str, Future] = {}
+        self._lock = threading.Lock()
+        self._refresher = ThreadPoolExecutor(max_workers=refresh_workers, thread_name_prefix="price-refresh")
+
+    def ttl_for(self, key: str) -> float:
+        return self.ttls.get(key, self.default_ttl)
+
+    def get(self, key: str, loader: Callable[[], Any]) -> Any:
+        """
+        Cached value for key, calling loader() to fill it.
+
+        Args:
+            loader: Fetches the value; a None result is returned but not cached
+
+        Returns:
+            The cached or freshly loaded value
+        """
+        now = time.time()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                value, stored_at = entry
+                age = now - stored_at
+                ttl = self.ttl_for(key)
+                if age < ttl:
+                    self._entries.move_to_end(key)
+                    self.hits += 1
+                    return value
+                if age < ttl + self.stale_ttl:
+                    self._entries.move_to_end(key)
+                    self.stale_hits += 1
+                    if key not in self._in_flight:
+                        future = self._in_flight[key] = Future()
+                        self._refresher.submit(self._load, key, loader, future)
+                    return value
+
+            future = self._in_flight.get(key)
+            owner = future is None
+            if owner:
+                self.misses += 1
+                future = self._in_flight[key] = Future()
+            else:
+                # Someone is already loading this key; wait for their result
+                self.coalesced += 1
+
+        if owner:
+            self._load(key, loader, future)
+        return future.result()
+
+    def lookup(self, key: str) -> Tuple[Optional[Any], bool]:
+        """
+        Cached value without loading.
+
+        Returns:
+            (value, fresh) - value is None on a miss or once past the stale
+            window; fresh is False for values the caller should refresh
+        """
+        now = time.time()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None, False
+            value, stored_at = entry
+            age = now - stored_at
+            ttl = self.ttl_for(key)
+            if age < ttl:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return value, True
+            if age < ttl + self.stale_ttl:
+                return value, False
+            return None, False
+
+    def peek(self, key: str) -> Optional[Any]:
+        """Cached value regardless of age, without loading"""
+        with self._lock:
+            entry = self._entries.get(key)
+            return entry[0] if entry else None
+
+    def put(self, key: str, value: Any, stored_at: float = None):
+        with self._lock:
+            self._store(key, value, time.time() if stored_at is None else stored_at)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def __len__(self) -> int:
+        with self._lock:
+            return len(self._entries)
+
+    def __contains__(self, key: str) -> bool:
+        with self._lock:
+            return key in self._entries
+
+    def stats(self) -> Dict:
+        with self._lock:
+            lookups = self.hits + self.stale_hits + self.misses + self.coalesced
+            return {
+                "size": len(self._entries),
+                "maxEntries": self.max_entries,
+                "defaultTTL": self.default_ttl,
+                "staleTTL": self.stale_ttl,
+                "pairTTLs": dict(self.ttls),
+                "hits": self.hits,
+                "staleHits": self.stale_hits,
+                "misses": self.misses,
+                "coalesced": self.coalesced,
+                "hitRate": (self.hits + self.stale_hits + self.coalesced) / lookups if lookups else 0.0,
+                "loads": self.loads,
+                "loadErrors": self.load_errors,
+                "inFlight": len(self._in_flight)
+            }
+
+    def metric_families(self) -> List:
+        """stats() as metrics Registry collector families"""
+        stats = self.stats()
+        return [
+            ("aria_price_cache_lookups_total", "counter", "Price cache lookups by result", [
+                ({"result": "hit"}, stats["hits"]),
+                ({"result": "stale"}, stats["staleHits"]),
+                ({"result": "miss"}, stats["misses"]),
+                ({"result": "coalesced"}, stats["coalesced"]),
+            ]),
+            ("aria_price_cache_loads_total", "counter", "Price cache loader calls by outcome", [
+                ({"outcome": "ok"}, stats["loads"]),
+                ({"outcome": "error"}, stats["loadErrors"]),
+            ]),
+            ("aria_price_cache_entries", "gauge", "Entries in the price cache", [({}, stats["size"])]),
+        ]
+
+    def _load(self, key: str, loader: Callable[[], Any], future: Future):
+        try:
+            value = loader()
+        except Exception as e:
+            with self._lock:
+                self.load_errors += 1
+                self._in_flight.pop(key, None)
+            future.set_exception(e)
+            return
+
+        with self._lock:
+            self.loads += 1
+            if value is not None:
+                self._store(key, value, time.time())
+            self._in_flight.pop(key, None)
+        future.set_result(value)
+
+    def _store(self, key: str, value: Any, stored_at: float):
+        self._entries[key] = (value, stored_at)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
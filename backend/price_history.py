@@ -0,0 +1,272 @@
+# backend/price_history.py
+"""
+Price History
+Append-only time series of oracle prices per pair, kept in array-backed
+columns with minute/hour/day OHLC rollups maintained as points arrive, so
+range queries read precomputed buckets instead of scanning raw points
+"""
+
+import os
+import re
+import threading
+from array import array
+from bisect import bisect_left, bisect_right
+from typing import Dict, List, Optional
+
+import numpy as np
+
+RESOLUTIONS = {"minute": 60, "hour": 3600, "day": 86400}
+# Binary log record: timestamp, price (little-endian doubles)
+RECORD_DTYPE = np.dtype([("t", "<f8"), ("price", "<f8")])
+
+
+class Rollup:
+    """OHLC buckets of one width, one array per column"""
+
+    def __init__(self, width: int):
+        self.width = width
+        self.start = array("d")
+        self.open = array("d")
+        self.high = array("d")
+        self.low = array("d")
+        self.close = array("d")
+        self.count = array("q")
+
+    def add(self, t: float, price: float):
+        """Fold a point that is not older than the newest bucket"""
+        bucket = t - t % self.width
+        if self.start and self.start[-1] == bucket:
+            self.high[-1] = max(self.high[-1], price)
+            self.low[-1] = min(self.low[-1], price)
+            self.close[-1] = price
+            self.count[-1] += 1
+        else:
+            for column, value in ((self.start, bucket), (self.open, price), (self.high, price),
+                                  (self.low, price), (self.close, price)):
+                column.append(value)
+            self.count.append(1)
+
+    def rebuild_from(self, since: float, times: np.ndarray, prices: np.ndarray):
+        """Recompute buckets from since's bucket onward out of sorted raw points"""
+        bucket_start = since - since % self.width
+        keep = bisect_left(self.start, bucket_start)
+        for column in (self.start, self.open, self.high, self.low, self.close, self.count):
+            del column[keep:]
+
+        first = np.searchsorted(times, bucket_start)
+        times, prices = times[first:], prices[first:]
+        if times.size == 0:
+            return
+        buckets = times - times % self.width
+        starts, index = np.unique(buckets, return_index=True)
+        ends = np.append(index[1:], times.size) - 1
+        self.start.extend(starts)
+        self.open.extend(prices[index])
+        self.high.extend(np.maximum.reduceat(prices, index))
+        self.low.extend(np.minimum.reduceat(prices, index))
+        self.close.extend(prices[ends])
+        self.count.extend(np.diff(np.append(index, times.size)).astype(np.int64))
+
+    def query(self, start: float, end: float) -> List[Dict]:
+        lo = bisect_left(self.start, start - start % self.width)
+        hi = bisect_right(self.start, end)
+        return [
+            {
+                "t": self.start[i],
+                "open": self.open[i],
+                "high": self.high[i],
+                "low": self.low[i],
+                "close": self.close[i],
+                "count": self.count[i]
+            }
+            for i in range(lo, hi)
+        ]
+
+    def buckets_between(self, start: float, end: float) -> int:
+        return bisect_right(self.start, end) - bisect_left(self.start, start - start % self.width)
+
+
+class PriceSeries:
+    """Raw points of one pair plus its rollups"""
+
+    def __init__(self, max_raw: int):
+        self.max_raw = max_raw
+        self.times = array("d")
+        self.prices = array("d")
+        self.trimmed = False
+        self.rollups = {name: Rollup(width) for name, width in RESOLUTIONS.items()}
+
+    def append(self, t: float, price: float) -> bool:
+        """Add a point; returns False for duplicates and points too old to place"""
+        if not self.times or t > self.times[-1]:
+            self.times.append(t)
+            self.prices.append(price)
+            for rollup in self.rollups.values():
+                rollup.add(t, price)
+            self._trim()
+            return True
+
+        position = bisect_left(self.times, t)
+        if position < len(self.times) and self.times[position] == t and self.prices[position] == price:
+            return False
+        widest = max(RESOLUTIONS.values())
+        if self.trimmed and t - t % widest < self.times[0]:
+            # Its buckets reach back past the raw points we still hold
+            return False
+
+        # Out of order (e.g. an event backfilled after polls): insert and
+        # recompute the affected buckets
+        self.times.insert(position, t)
+        self.prices.insert(position, price)
+        times = np.frombuffer(self.times, dtype=np.float64)
+        prices = np.frombuffer(self.prices, dtype=np.float64)
+        for rollup in self.rollups.values():
+            rollup.rebuild_from(t, times, prices)
+        del times, prices
+        self._trim()
+        return True
+
+    def _trim(self):
+        # Rollups keep the long history; raw points are bounded
+        if len(self.times) > self.max_raw * 2:
+            del self.times[:-self.max_raw]
+            del self.prices[:-self.max_raw]
+            self.trimmed = True
+
+
+class PriceHistory:
+    """
+    Per-pair price series, optionally persisted as append-only binary
+    logs (one file of (timestamp, price) doubles per pair) in data_dir.
+    """
+
+    def __init__(self, data_dir: str = None, max_raw: int = 100000):
+        self.data_dir = data_dir
+        self.max_raw = max_raw
+        self._series: Dict[str, PriceSeries] = {}
+        self._lock = threading.Lock()
+        if data_dir:
+            os.makedirs(data_dir, exist_ok=True)
+            self._load()
+
+    def record(self, pair: str, t: float, price: float) -> bool:
+        """Add one price point; returns False if it was already recorded"""
+        with self._lock:
+            series = self._series.get(pair)
+            if series is None:
+                series = self._series[pair] = PriceSeries(self.max_raw)
+            added = series.append(float(t), float(price))
+            if added and self.data_dir:
+                path = self._path(pair)
+                if not os.path.exists(path):
+                    # File names are sanitized; keep the real pair alongside
+                    with open(path[:-4] + ".pair", "w") as sidecar:
+                        sidecar.write(pair)
+                with open(path, "ab") as log:
+                    log.write(np.array([(t, price)], dtype=RECORD_DTYPE).tobytes())
+        return added
+
+    def pairs(self) -> List[str]:
+        with self._lock:
+            return list(self._series)
+
+    def last(self, pair: str, count: int) -> List[Dict]:
+        """The last count raw updates, oldest first (for sparklines)"""
+        with self._lock:
+            series = self._series.get(pair)
+            if series is None:
+                return []
+            return [
+                {"t": t, "price": price}
+                for t, price in zip(series.times[-count:], series.prices[-count:])
+            ]
+
+    def query(
+        self,
+        pair: str,
+        start: float,
+        end: float,
+        resolution: str = "auto",
+        max_points: int = 500
+    ) -> Optional[Dict]:
+        """
+        Series for [start, end].
+
+        Args:
+            resolution: raw, minute, hour, day, or auto for the finest
+                rollup that fits in max_points buckets
+
+        Returns:
+            {"resolution", "points"} or None for an unknown pair
+        """
+        if resolution != "auto" and resolution != "raw" and resolution not in RESOLUTIONS:
+            raise ValueError(f"resolution must be auto, raw or one of {', '.join(RESOLUTIONS)}")
+
+        with self._lock:
+            series = self._series.get(pair)
+            if series is None:
+                return None
+
+            if resolution == "auto":
+                resolution = "day"
+                for name in RESOLUTIONS:
+                    if series.rollups[name].buckets_between(start, end) <= max_points:
+                        resolution = name
+                        break
+
+            if resolution == "raw":
+                lo = bisect_left(series.times, start)
+                hi = bisect_right(series.times, end)
+                points = [
+                    {"t": series.times[i], "price": series.prices[i]}
+                    for i in range(lo, hi)
+                ]
+            else:
+                points = series.rollups[resolution].query(start, end)
+
+        return {"resolution": resolution, "points": points}
+
+    def stats(self) -> Dict:
+        with self._lock:
+            return {
+                pair: {
+                    "rawPoints": len(series.times),
+                    "first": series.times[0] if series.times else None,
+                    "last": series.times[-1] if series.times else None,
+                    **{f"{name}Buckets": len(rollup.start) for name, rollup in series.rollups.items()}
+                }
+                for pair, series in self._series.items()
+            }
+
+    def _path(self, pair: str) -> str:
+        return os.path.join(self.data_dir, re.sub(r"[^A-Za-z0-9_-]", "_", pair) + ".bin")
+
+    def _load(self):
+        """Replay the binary logs written by earlier runs"""
+        for filename in sorted(os.listdir(self.data_dir)):
+            if not filename.endswith(".bin"):
+                continue
+            path = os.path.join(self.data_dir, filename)
+            records = np.fromfile(path, dtype=RECORD_DTYPE)
+            if records.size == 0:
+                continue
+            pair = self._pair_for(path) or filename[:-4]
+            records = np.sort(records, order="t")
+            times = np.ascontiguousarray(records["t"])
+            prices = np.ascontiguousarray(records["price"])
+
+            # Rollups are rebuilt from the whole log; raw points stay bounded
+            series = self._series[pair] = PriceSeries(self.max_raw)
+            for rollup in series.rollups.values():
+                rollup.rebuild_from(times[0], times, prices)
+            series.times.extend(times[-self.max_raw:])
+            series.prices.extend(prices[-self.max_raw:])
+            series.trimmed = times.size > self.max_raw
+
+    @staticmethod
+    def _pair_for(path: str) -> Optional[str]:
+        try:
+            with open(path[:-4] + ".pair") as sidecar:
+                return sidecar.read().strip() or None
+        except OSError:
+            return None
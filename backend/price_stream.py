@@ -0,0 +1,249 @@
+# backend/price_stream.py
+"""
+Price Stream
+Fans oracle feed snapshots out to server-sent-event subscribers. Prices
+are computed once per change on the server and each client only receives
+the pairs and listings it subscribed to, with updates coalesced while it
+is busy.
+"""
+
+import itertools
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Dict, Iterator, List, Optional
+
+
+class StreamFullError(Exception):
+    """Raised when the stream already has max_clients subscribers"""
+
+
+class Subscription:
+    """
+    One client's topics plus its pending updates. Updates for a topic
+    overwrite each other until the client reads them, so a slow client
+    gets the latest values instead of a growing backlog.
+    """
+
+    def __init__(self, stream: "PriceStream", pairs: List[str], tokens: List[int]):
+        self.id = next(stream._ids)
+        self.pairs = set(pairs)
+        self.tokens = set(tokens)
+        self.created_at = time.time()
+        self.sent = 0
+        self.coalesced = 0
+        self._stream = stream
+        self._pending: Dict[str, Dict] = {}
+        self._ready = threading.Event()
+        self._closed = False
+
+    def push(self, topic: str, value: Dict):
+        """Queue a value for topic, replacing one the client hasn't read yet"""
+        if topic in self._pending:
+            self.coalesced += 1
+        self._pending[topic] = value
+        self._ready.set()
+
+    def events(self, heartbeat: float = 15.0) -> Iterator[Optional[Dict]]:
+        """
+        Yield batches of changed prices as they arrive:
+        {"pairs": {pair: price}, "tokens": {tokenId: livePrice}}.
+        None is yielded every heartbeat seconds without changes.
+        """
+        while not self._closed:
+            if not self._ready.wait(timeout=heartbeat):
+                yield None
+                continue
+            with self._stream._lock:
+                pending, self._pending = self._pending, {}
+                self._ready.clear()
+            if not pending:
+                continue
+
+            batch = {"pairs": {}, "tokens": {}}
+            for topic, value in pending.items():
+                kind, key = topic.split(":", 1)
+                batch[kind][key] = value
+            self.sent += 1
+            yield batch
+
+    def close(self):
+        self._closed = True
+        self._ready.set()
+        self._stream.unsubscribe(self)
+
+
+class PriceStream:
+    """
+    Publishes oracle snapshots to subscribers.
+
+    Register on_snapshot as an OracleFeed listener. Listing prices are
+    refreshed only when the oracle rates or the listings themselves
+    changed: listing_prices(token_ids) returns live prices for the
+    subscribed tokens and listing_version() (optional) changes whenever
+    listings do.
+
+    Listing prices are fetched listing_chunk tokens at a time. A new
+    subscription loads its first chunk of unpriced tokens inline and the
+    rest on the publisher thread, so a page watching many listings costs
+    a bounded amount of work per request instead of being rejected.
+    """
+
+    def __init__(
+        self,
+        listing_prices: Callable[[List[int]], List[Dict]] = None,
+        listing_version: Callable[[], int] = None,
+        max_clients: int = 500,
+        max_tokens_per_client: int = 5000,
+        listing_chunk: int = 100
+    ):
+        self.listing_prices = listing_prices
+        self.listing_version = listing_version
+        self.max_clients = max_clients
+        self.max_tokens_per_client = max_tokens_per_client
+        self.listing_chunk = max(listing_chunk, 1)
+        self.snapshots = 0
+        self.published = 0
+        self.listing_refreshes = 0
+        self.last_error: Optional[str] = None
+        self._ids = itertools.count(1)
+        self._subscriptions: Dict[int, Subscription] = {}
+        self._last: Dict[str, Dict] = {}
+        self._last_rates = None
+        self._last_listing_version = None
+        self._lock = threading.Lock()
+        self._latest_snapshot = None
+        self._publishing = False
+        # Publishing can hit the RPC for listing prices; keep it off the feed thread
+        self._publisher = ThreadPoolExecutor(max_workers=1, thread_name_prefix="price-stream")
+
+    def subscribe(self, pairs: List[str], tokens: List[int] = None) -> Subscription:
+        """
+        Register a client and queue the current value of each of its topics.
+
+        Raises:
+            StreamFullError: max_clients subscribers are already connected
+            ValueError: too many tokens requested
+        """
+        tokens = list(dict.fromkeys(tokens or []))
+        if len(tokens) > self.max_tokens_per_client:
+            raise ValueError(f"At most {self.max_tokens_per_client} tokens per subscription")
+
+        subscription = Subscription(self, pairs, tokens)
+        with self._lock:
+            if len(self._subscriptions) >= self.max_clients:
+                raise StreamFullError(f"Price stream is full ({self.max_clients} clients)")
+            # Listing prices are only kept current for watched tokens
+            watched = set().union(*(other.tokens for other in self._subscriptions.values()))
+            unknown = [token for token in tokens if token not in watched or f"tokens:{token}" not in self._last]
+            for token in unknown:
+                self._last.pop(f"tokens:{token}", None)
+
+            self._subscriptions[subscription.id] = subscription
+            for topic in self._topics(subscription):
+                if topic in self._last:
+                    subscription.push(topic, self._last[topic])
+
+        # Tokens nobody was watching have no current price: fetch the first
+        # chunk now and leave the rest to the publisher thread
+        if unknown and self.listing_prices:
+            chunks = self._chunks(unknown)
+            self._load_listings(chunks[0])
+            for chunk in chunks[1:]:
+                self._publisher.submit(self._load_listings, chunk)
+        return subscription
+
+    def unsubscribe(self, subscription: Subscription):
+        with self._lock:
+            self._subscriptions.pop(subscription.id, None)
+
+    def on_snapshot(self, snapshot):
+        """OracleFeed listener: publish on the worker, keeping only the newest pending snapshot"""
+        with self._lock:
+            self._latest_snapshot = snapshot
+            if self._publishing:
+                return
+            self._publishing = True
+        self._publisher.submit(self._drain)
+
+    def _drain(self):
+        while True:
+            with self._lock:
+                snapshot, self._latest_snapshot = self._latest_snapshot, None
+                if snapshot is None:
+                    self._publishing = False
+                    return
+            try:
+                self.publish(snapshot)
+            except Exception as e:
+                self.last_error = str(e)
+                print(f"⚠️ Price stream publish failed: {e}")
+
+    def publish(self, snapshot):
+        """Push changed pair prices, then refresh listing prices if anything they depend on moved"""
+        self.snapshots += 1
+        with self._lock:
+            for pair, data in snapshot.prices.items():
+                self._set(f"pairs:{pair}", data, ("price", "source", "stale"))
+            tokens = set().union(*(subscription.tokens for subscription in self._subscriptions.values()))
+
+        rates = tuple(sorted((pair, data.get("price")) for pair, data in snapshot.prices.items()))
+        version = self.listing_version() if self.listing_version else None
+        rates_changed = rates != self._last_rates
+        listings_changed = self.listing_version is None or version != self._last_listing_version
+        self._last_rates = rates
+        self._last_listing_version = version
+
+        if tokens and self.listing_prices and (rates_changed or listings_changed):
+            self._publish_listings(sorted(tokens))
+
+    def _load_listings(self, token_ids: List[int]):
+        try:
+            self._publish_listings(token_ids)
+        except Exception as e:
+            self.last_error = str(e)
+            print(f"⚠️ Price stream could not load listings {token_ids}: {e}")
+
+    def _publish_listings(self, token_ids: List[int]):
+        for chunk in self._chunks(token_ids):
+            self.listing_refreshes += 1
+            results = self.listing_prices(chunk)
+            with self._lock:
+                for result in results:
+                    self._set(f"tokens:{result['tokenId']}", result, ("currentPrice", "prices", "priceInUSD", "error"))
+
+    def _chunks(self, token_ids: List[int]) -> List[List[int]]:
+        return [token_ids[i:i + self.listing_chunk] for i in range(0, len(token_ids), self.listing_chunk)]
+
+    def _set(self, topic: str, value: Dict, compare: tuple):
+        """Store value for topic and push it to subscribers if it changed. Caller holds the lock."""
+        previous = self._last.get(topic)
+        if previous is not None and all(previous.get(key) == value.get(key) for key in compare):
+            return
+        self._last[topic] = value
+        self.published += 1
+        kind, key = topic.split(":", 1)
+        for subscription in self._subscriptions.values():
+            if kind == "pairs" and key in subscription.pairs:
+                subscription.push(topic, value)
+            elif kind == "tokens" and int(key) in subscription.tokens:
+                subscription.push(topic, value)
+
+    @staticmethod
+    def _topics(subscription: Subscription) -> List[str]:
+        return [f"pairs:{pair}" for pair in subscription.pairs] + \
+            [f"tokens:{token}" for token in subscription.tokens]
+
+    def stats(self) -> Dict:
+        with self._lock:
+            subscriptions = list(self._subscriptions.values())
+        return {
+            "clients": len(subscriptions),
+            "maxClients": self.max_clients,
+            "snapshots": self.snapshots,
+            "published": self.published,
+            "listingRefreshes": self.listing_refreshes,
+            "sent": sum(subscription.sent for subscription in subscriptions),
+            "coalesced": sum(subscription.coalesced for subscription in subscriptions),
+            "lastError": self.last_error
+        }
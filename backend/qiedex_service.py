@@ -9,6 +9,9 @@ import os
 from dotenv import load_dotenv
 from web3 import Web3
 from contract_info import FRACTIONALNFT_ADDRESS, FRACTIONALNFT_ABI
+from web3_provider import Web3Registry
+from receipt_tracker import get_receipt_tracker
+from gas_oracle import get_gas_oracle
 
 load_dotenv()
 
@@ -23,7 +26,10 @@ class QIEDEXService:
     
     # Blockchain connection
     PROVIDER_URL = os.getenv("QIE_RPC_URL", "http://127.0.0.1:8545/")
-    w3 = Web3(Web3.HTTPProvider(PROVIDER_URL))
+    w3 = Web3Registry.get_web3(PROVIDER_URL)
+    receipt_tracker = get_receipt_tracker(w3)
+    gas_oracle = get_gas_oracle(w3)
+    RECEIPT_TIMEOUT = float(os.getenv("FRACTIONALIZE_RECEIPT_TIMEOUT", "300"))
     
     @classmethod
     def create_fraction_token_onchain(
@@ -54,31 +60,34 @@ class QIEDEXService:
             account = cls.w3.eth.account.from_key(private_key)
             
             # Create contract instance
-            fractional_contract = cls.w3.eth.contract(
-                address=FRACTIONALNFT_ADDRESS,
-                abi=FRACTIONALNFT_ABI
-            )
+            fractional_contract = Web3Registry.get_contract(FRACTIONALNFT_ADDRESS, FRACTIONALNFT_ABI, cls.w3)
             
-            # Build transaction
-            tx = fractional_contract.functions.fractionalizeNFT(
+            # Build transaction (fees from the shared cache; gas is estimated per call
+            # since deploying the fraction token costs more for longer names)
+            fractionalize = fractional_contract.functions.fractionalizeNFT(
                 nft_contract,
                 nft_token_id,
                 token_supply,
                 token_name,
                 token_symbol
-            ).build_transaction({
-                'from': account.address,
-                'nonce': cls.w3.eth.get_transaction_count(account.address),
-                'gas': 3000000,
-                'gasPrice': cls.w3.eth.gas_price
-            })
+            )
+            tx = fractionalize.build_transaction(cls.gas_oracle.tx_params(
+                fractionalize,
+                account.address,
+                default_gas=3000000,
+                memoize=False,
+                nonce=cls.w3.eth.get_transaction_count(account.address)
+            ))
             
             # Sign and send transaction
             signed_tx = cls.w3.eth.account.sign_transaction(tx, private_key)
             tx_hash = cls.w3.eth.send_raw_transaction(signed_tx.raw_transaction)
             
-            # Wait for transaction receipt
-            tx_receipt = cls.w3.eth.wait_for_transaction_receipt(tx_hash)
+            # Wait for the shared tracker to confirm it (one batched poll per block
+            # for every pending transaction, rather than a polling loop per request)
+            tx_receipt = cls.receipt_tracker.wait(
+                tx_hash, timeout=cls.RECEIPT_TIMEOUT, label=f"fractionalize {token_symbol}"
+            )
             
             # Parse logs to get fractionalId and tokenAddress
             fractional_id = None
@@ -233,10 +242,7 @@ class QIEDEXService:
             dict with asset info
         """
         try:
-            fractional_contract = cls.w3.eth.contract(
-                address=FRACTIONALNFT_ADDRESS,
-                abi=FRACTIONALNFT_ABI
-            )
+            fractional_contract = Web3Registry.get_contract(FRACTIONALNFT_ADDRESS, FRACTIONALNFT_ABI, cls.w3)
             
             asset = fractional_contract.functions.getFractionalAsset(fractional_id).call()
             
@@ -0,0 +1,362 @@
+# backend/receipt_tracker.py
+"""
+Receipt Tracker
+One background loop that confirms every pending transaction the backend
+has sent: once per new block it fetches all outstanding receipts in a
+single JSON-RPC batch, and resolves each transaction's future when it
+reaches the configured confirmation depth. Pending transactions are kept
+in SQLite so they are picked up again after a restart.
+"""
+
+import json
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import Future
+from typing import Dict, List, Optional
+
+from web3 import Web3
+from web3._utils.method_formatters import receipt_formatter
+from web3.datastructures import AttributeDict
+
+from web3_provider import BATCH_SIZE
+
+DEFAULT_DB_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "receipts.db")
+
+
+def normalize_hash(tx_hash) -> str:
+    if not isinstance(tx_hash, str):
+        return Web3.to_hex(tx_hash)
+    tx_hash = tx_hash.lower()
+    return tx_hash if tx_hash.startswith("0x") else "0x" + tx_hash
+
+
+class TrackedTransaction:
+    """
+    A transaction awaiting confirmation. Replacements (same nonce, higher
+    gas) are added as extra hashes; whichever one is mined resolves it.
+    """
+
+    def __init__(self, key: str, hashes: List[str], label: str, confirmations: int, submitted_at: float):
+        self.key = key
+        self.hashes = list(hashes)
+        self.label = label
+        self.confirmations = confirmations
+        self.submitted_at = submitted_at
+        self.mined_hash: Optional[str] = None
+        self.mined_block: Optional[int] = None
+        self.resolved_at: Optional[float] = None
+        # Resolves to the receipt once it is confirmations blocks deep
+        self.receipt: Future = Future()
+
+    @property
+    def status(self) -> str:
+        if self.receipt.done():
+            if self.receipt.exception():
+                return "dropped"
+            return "confirmed" if self.receipt.result().status == 1 else "reverted"
+        return "mined" if self.mined_block is not None else "pending"
+
+    def to_dict(self) -> Dict:
+        return {
+            "key": self.key,
+            "label": self.label,
+            "status": self.status,
+            "txHashes": list(self.hashes),
+            "minedTxHash": self.mined_hash,
+            "blockNumber": self.mined_block,
+            "confirmations": self.confirmations,
+            "submittedAt": self.submitted_at,
+            "resolvedAt": self.resolved_at
+        }
+
+
+class ReceiptTracker:
+    """
+    Batched receipt polling for many pending transactions.
+
+    The loop checks eth_blockNumber every poll_interval and, when a new
+    block arrives (or new hashes were added), requests every pending
+    receipt in one batch. Receipts are re-read each block until they are
+    deep enough, so a transaction reorged out simply goes back to pending.
+    """
+
+    def __init__(
+        self,
+        w3: Web3,
+        db_path: str = None,
+        confirmations: int = 1,
+        poll_interval: float = 2.0,
+        timeout: float = 3600.0,
+        keep_resolved: int = 1000
+    ):
+        self.w3 = w3
+        self.db_path = db_path
+        self.confirmations = confirmations
+        self.poll_interval = poll_interval
+        self.timeout = timeout
+        self.keep_resolved = keep_resolved
+        self.polls = 0
+        self.receipt_requests = 0
+        self.last_block: Optional[int] = None
+        self.last_error: Optional[str] = None
+        self._stats = {"tracked": 0, "confirmed": 0, "reverted": 0, "dropped": 0}
+        self._pending: Dict[str, TrackedTransaction] = {}
+        self._resolved: "OrderedDict[str, TrackedTransaction]" = OrderedDict()
+        self._by_hash: Dict[str, TrackedTransaction] = {}
+        self._dirty = False
+        self._lock = threading.Lock()
+        self._wake = threading.Event()
+        self._stop = threading.Event()
+        self._thread = None
+
+        self._conn = None
+        if db_path:
+            self._conn = sqlite3.connect(db_path, check_same_thread=False)
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute("""
+                CREATE TABLE IF NOT EXISTS pending_transactions (
+                    key TEXT PRIMARY KEY,
+                    hashes TEXT NOT NULL,
+                    label TEXT NOT NULL,
+                    confirmations INTEGER NOT NULL,
+                    submitted_at REAL NOT NULL
+                )
+            """)
+            self._conn.commit()
+            self._load_pending()
+
+    # --- PUBLIC API ---
+
+    def track(self, tx_hash, label: str = "", confirmations: int = None, key: str = None) -> TrackedTransaction:
+        """
+        Start tracking a broadcast transaction.
+
+        Args:
+            key: Groups replacement hashes (e.g. "mint:<nonce>"); defaults to the hash
+            confirmations: Blocks deep before the receipt resolves (default: tracker's)
+
+        Returns:
+            The TrackedTransaction; wait on .receipt or add a done callback
+        """
+        tx_hash = normalize_hash(tx_hash)
+        key = key or tx_hash
+        with self._lock:
+            tracked = self._pending.get(key)
+            if tracked is None:
+                tracked = TrackedTransaction(
+                    key, [tx_hash], label, confirmations or self.confirmations, time.time()
+                )
+                self._pending[key] = tracked
+                self._stats["tracked"] += 1
+            elif tx_hash not in tracked.hashes:
+                tracked.hashes.append(tx_hash)
+            self._by_hash[tx_hash] = tracked
+            self._save(tracked)
+            self._dirty = True
+        self._ensure_started()
+        self._wake.set()
+        return tracked
+
+    def add_hash(self, key: str, tx_hash) -> Optional[TrackedTransaction]:
+        """Attach a replacement hash to a pending transaction"""
+        with self._lock:
+            if key not in self._pending:
+                return None
+        return self.track(tx_hash, key=key)
+
+    def get(self, tx_hash_or_key: str) -> Optional[TrackedTransaction]:
+        """Look up a transaction by any of its hashes or its key"""
+        with self._lock:
+            tracked = self._pending.get(tx_hash_or_key) or self._resolved.get(tx_hash_or_key)
+            if tracked is None:
+                try:
+                    tracked = self._by_hash.get(normalize_hash(tx_hash_or_key))
+                except Exception:
+                    tracked = None
+            return tracked
+
+    def wait(self, tx_hash, timeout: float = None, label: str = "", confirmations: int = None):
+        """Track tx_hash (if it isn't already) and block until its receipt resolves"""
+        tracked = self.get(normalize_hash(tx_hash)) or self.track(tx_hash, label, confirmations)
+        return tracked.receipt.result(timeout=timeout)
+
+    def start(self):
+        with self._lock:
+            if self._thread and self._thread.is_alive():
+                return
+            self._stop.clear()
+            self._thread = threading.Thread(target=self._run, name="receipt-tracker", daemon=True)
+            self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        self._wake.set()
+
+    def stats(self) -> Dict:
+        with self._lock:
+            return {
+                **self._stats,
+                "pending": len(self._pending),
+                "mined": sum(1 for tracked in self._pending.values() if tracked.mined_block is not None),
+                "confirmationsRequired": self.confirmations,
+                "lastBlock": self.last_block,
+                "polls": self.polls,
+                "receiptRequests": self.receipt_requests,
+                "running": bool(self._thread and self._thread.is_alive()),
+                "lastError": self.last_error
+            }
+
+    # --- POLLING ---
+
+    def _ensure_started(self):
+        if not (self._thread and self._thread.is_alive()):
+            self.start()
+
+    def _run(self):
+        while not self._stop.is_set():
+            try:
+                self.poll_once()
+                self.last_error = None
+            except Exception as e:
+                if self.last_error is None:
+                    print(f"[Receipt Tracker] Polling error: {e}")
+                self.last_error = str(e)
+            self._wake.wait(self.poll_interval)
+            self._wake.clear()
+
+    def poll_once(self) -> int:
+        """
+        Check pending receipts if there is a new block or new work.
+
+        Returns:
+            Number of transactions resolved
+        """
+        with self._lock:
+            if not self._pending:
+                return 0
+        head = self.w3.eth.block_number
+        now = time.time()
+        with self._lock:
+            expiring = any(now - tracked.submitted_at > self.timeout for tracked in self._pending.values())
+            if head == self.last_block and not self._dirty and not expiring:
+                return 0
+            self.last_block = head
+            self._dirty = False
+            pending = list(self._pending.values())
+        self.polls += 1
+
+        hashes = [tx_hash for tracked in pending for tx_hash in tracked.hashes]
+        receipts = self._fetch_receipts(hashes)
+        resolved = 0
+
+        for tracked in pending:
+            receipt = next((receipts[h] for h in reversed(tracked.hashes) if receipts.get(h)), None)
+            if receipt is None:
+                # Not mined, or reorged out since the last block
+                tracked.mined_hash = tracked.mined_block = None
+                if now - tracked.submitted_at > self.timeout:
+                    self._resolve(tracked, error=TimeoutError(
+                        f"Transaction {tracked.hashes[-1]} not mined after {self.timeout:.0f}s"
+                    ))
+                    resolved += 1
+                continue
+
+            tracked.mined_hash = normalize_hash(receipt.transactionHash)
+            tracked.mined_block = receipt.blockNumber
+            if head - receipt.blockNumber + 1 >= tracked.confirmations:
+                self._resolve(tracked, receipt=receipt)
+                resolved += 1
+        return resolved
+
+    def _fetch_receipts(self, hashes: List[str]) -> Dict[str, Optional[AttributeDict]]:
+        """eth_getTransactionReceipt for every hash, BATCH_SIZE per HTTP request"""
+        receipts = {}
+        for start in range(0, len(hashes), BATCH_SIZE):
+            chunk = hashes[start:start + BATCH_SIZE]
+            requests = [("eth_getTransactionReceipt", [tx_hash]) for tx_hash in chunk]
+            responses = self.w3.provider.make_batch_request(requests)
+            if not isinstance(responses, list):
+                # Node refused the batch as a whole; fall back to one call each
+                responses = [self.w3.provider.make_request(method, params) for method, params in requests]
+            self.receipt_requests += 1
+
+            for tx_hash, response in zip(chunk, responses):
+                result = response.get("result") if isinstance(response, dict) else None
+                receipts[tx_hash] = AttributeDict.recursive(receipt_formatter(result)) if result else None
+        return receipts
+
+    def _resolve(self, tracked: TrackedTransaction, receipt=None, error: Exception = None):
+        with self._lock:
+            self._pending.pop(tracked.key, None)
+            tracked.resolved_at = time.time()
+            self._resolved[tracked.key] = tracked
+            while len(self._resolved) > self.keep_resolved:
+                _, old = self._resolved.popitem(last=False)
+                for tx_hash in old.hashes:
+                    if self._by_hash.get(tx_hash) is old:
+                        del self._by_hash[tx_hash]
+            if error is not None:
+                self._stats["dropped"] += 1
+            else:
+                self._stats["confirmed" if receipt.status == 1 else "reverted"] += 1
+            if self._conn:
+                self._conn.execute("DELETE FROM pending_transactions WHERE key = ?", (tracked.key,))
+                self._conn.commit()
+
+        if error is not None:
+            print(f"[Receipt Tracker] {tracked.label or tracked.key} dropped: {error}")
+            tracked.receipt.set_exception(error)
+        else:
+            tracked.receipt.set_result(receipt)
+
+    # --- PERSISTENCE ---
+
+    def _save(self, tracked: TrackedTransaction):
+        """Caller must hold the lock"""
+        if not self._conn:
+            return
+        self._conn.execute(
+            "INSERT OR REPLACE INTO pending_transactions (key, hashes, label, confirmations, submitted_at) "
+            "VALUES (?, ?, ?, ?, ?)",
+            (tracked.key, json.dumps(tracked.hashes), tracked.label, tracked.confirmations, tracked.submitted_at)
+        )
+        self._conn.commit()
+
+    def _load_pending(self):
+        rows = self._conn.execute(
+            "SELECT key, hashes, label, confirmations, submitted_at FROM pending_transactions"
+        ).fetchall()
+        for key, hashes, label, confirmations, submitted_at in rows:
+            tracked = TrackedTransaction(key, json.loads(hashes), label, confirmations, submitted_at)
+            self._pending[key] = tracked
+            for tx_hash in tracked.hashes:
+                self._by_hash[tx_hash] = tracked
+        if rows:
+            print(f"[Receipt Tracker] Resuming {len(rows)} pending transaction(s)")
+            self._dirty = True
+            self.start()
+
+
+_trackers: Dict[int, ReceiptTracker] = {}
+_trackers_lock = threading.Lock()
+
+
+def get_receipt_tracker(w3: Web3) -> ReceiptTracker:
+    """
+    The shared tracker for a Web3 instance (configured from RECEIPT_* env
+    vars), so every service's transactions are polled by one loop.
+    """
+    with _trackers_lock:
+        tracker = _trackers.get(id(w3))
+        if tracker is None:
+            tracker = _trackers[id(w3)] = ReceiptTracker(
+                w3,
+                db_path=os.getenv("RECEIPT_TRACKER_PATH", DEFAULT_DB_PATH) or None,
+                confirmations=int(os.getenv("RECEIPT_CONFIRMATIONS", "1")),
+                poll_interval=float(os.getenv("RECEIPT_POLL_INTERVAL", "2")),
+                timeout=float(os.getenv("RECEIPT_TIMEOUT", "3600"))
+            )
+        return tracker
@@ -1,13 +1,15 @@
 
 import os
 import time
-from web3 import Web3
 from dotenv import load_dotenv
+from web3_provider import Web3Registry, configured_rpc_urls
+from receipt_tracker import ReceiptTracker
+from gas_oracle import get_gas_oracle
 
 load_dotenv()
 
 # Config
-RPC_URL = os.getenv("QIE_RPC_URL", "https://rpc1testnet.qie.digital") # Testnet RPC
+RPC_URL = "https://rpc1testnet.qie.digital" # Testnet RPC (QIE_RPC_URLS / QIE_RPC_URL override)
 PRIVATE_KEY = os.getenv("SERVER_WALLET_PRIVATE_KEY")
 ORACLE_ADDRESS = "0xf37F527E7b50A07Fa7fd49D595132a1f2fDC5f98" # SimpleOracle Address
 
@@ -30,8 +32,8 @@ def seed_oracle():
         print("❌ Error: SERVER_WALLET_PRIVATE_KEY not found in .env")
         return
 
-    print(f"🔌 Connecting to RPC: {RPC_URL}")
-    w3 = Web3(Web3.HTTPProvider(RPC_URL))
+    print(f"🔌 Connecting to RPC: {', '.join(configured_rpc_urls(RPC_URL))}")
+    w3 = Web3Registry.get_web3(RPC_URL)
     
     if not w3.is_connected():
         print("❌ Failed to connect to RPC")
@@ -40,7 +42,7 @@ def seed_oracle():
     account = w3.eth.account.from_key(PRIVATE_KEY)
     print(f"👤 Using account: {account.address}")
     
-    contract = w3.eth.contract(address=ORACLE_ADDRESS, abi=ABI)
+    contract = Web3Registry.get_contract(ORACLE_ADDRESS, ABI, w3)
     
     # Data to seed
     pair = "ARIA/USD"
@@ -50,12 +52,13 @@ def seed_oracle():
     
     try:
         # Build transaction
-        tx = contract.functions.updatePrice(pair, price).build_transaction({
-            'from': account.address,
-            'nonce': w3.eth.get_transaction_count(account.address),
-            'gas': 200000,
-            'gasPrice': w3.eth.gas_price
-        })
+        update = contract.functions.updatePrice(pair, price)
+        tx = update.build_transaction(get_gas_oracle(w3).tx_params(
+            update,
+            account.address,
+            default_gas=200000,
+            nonce=w3.eth.get_transaction_count(account.address)
+        ))
         
         # Sign and send
         signed_tx = w3.eth.account.sign_transaction(tx, PRIVATE_KEY)
@@ -64,7 +67,9 @@ def seed_oracle():
         print(f"✅ Transaction sent! Hash: {tx_hash.hex()}")
         print("⏳ Waiting for confirmation...")
         
-        receipt = w3.eth.wait_for_transaction_receipt(tx_hash)
+        # In-memory tracker: receipts.db belongs to the running server
+        tracker = ReceiptTracker(w3, db_path=None, confirmations=int(os.getenv("RECEIPT_CONFIRMATIONS", "1")))
+        receipt = tracker.wait(tx_hash, timeout=300, label=f"seed {pair}")
         
         if receipt.status == 1:
             print(f"🎉 Oracle updated successfully! Block: {receipt.blockNumber}")
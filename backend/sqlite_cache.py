@@ -0,0 +1,123 @@
+# backend/sqlite_cache.py
+"""
+SQLite Cache
+Shared storage for the on-disk caches (analysis reports, pinned CIDs):
+one text value per key with TTL and LRU size eviction
+"""
+
+import sqlite3
+import threading
+import time
+from typing import Dict, Optional, Sequence, Tuple
+
+
+class SQLiteCache:
+    """
+    SQLite-backed key -> text store with TTL and LRU size eviction.
+
+    Subclasses pick the table, key columns and value column and expose
+    typed get/put on top of _get/_put.
+    """
+
+    def __init__(
+        self,
+        db_path: str,
+        table: str,
+        key_columns: Sequence[str],
+        value_column: str,
+        max_entries: int,
+        ttl: int,
+        name: str
+    ):
+        self.db_path = db_path
+        self.table = table
+        self.key_columns = list(key_columns)
+        self.value_column = value_column
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.name = name
+        self.hits = 0
+        self.misses = 0
+        self._where = " AND ".join(f"{column} = ?" for column in self.key_columns)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(db_path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        key_definitions = "".join(f"{column} TEXT NOT NULL, " for column in self.key_columns)
+        self._conn.execute(f"""
+            CREATE TABLE IF NOT EXISTS {table} (
+                {key_definitions}{value_column} TEXT NOT NULL,
+                created_at REAL NOT NULL,
+                last_accessed REAL NOT NULL,
+                PRIMARY KEY ({", ".join(self.key_columns)})
+            )
+        """)
+        self._conn.execute(
+            f"CREATE INDEX IF NOT EXISTS idx_{table}_accessed ON {table} (last_accessed)"
+        )
+        self._conn.commit()
+
+    def _get(self, key: Tuple) -> Optional[str]:
+        """Return the stored value or None on a miss / expired entry"""
+        now = time.time()
+        with self._lock:
+            row = self._conn.execute(
+                f"SELECT {self.value_column}, created_at FROM {self.table} WHERE {self._where}", key
+            ).fetchone()
+
+            if row and now - row[1] < self.ttl:
+                self._conn.execute(
+                    f"UPDATE {self.table} SET last_accessed = ? WHERE {self._where}", (now, *key)
+                )
+                self._conn.commit()
+                self.hits += 1
+                return row[0]
+
+            if row:
+                self._conn.execute(f"DELETE FROM {self.table} WHERE {self._where}", key)
+                self._conn.commit()
+            self.misses += 1
+            return None
+
+    def _put(self, key: Tuple, value: str):
+        now = time.time()
+        columns = [*self.key_columns, self.value_column, "created_at", "last_accessed"]
+        with self._lock:
+            self._conn.execute(
+                f"INSERT OR REPLACE INTO {self.table} ({', '.join(columns)}) "
+                f"VALUES ({', '.join('?' for _ in columns)})",
+                (*key, value, now, now)
+            )
+            self._evict(now)
+            self._conn.commit()
+
+    def clear(self):
+        with self._lock:
+            self._conn.execute(f"DELETE FROM {self.table}")
+            self._conn.commit()
+            self.hits = 0
+            self.misses = 0
+        print(f"✅ {self.name} cleared")
+
+    def stats(self) -> Dict:
+        with self._lock:
+            size = self._conn.execute(f"SELECT COUNT(*) FROM {self.table}").fetchone()[0]
+            lookups = self.hits + self.misses
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "hitRate": self.hits / lookups if lookups else 0.0,
+                "size": size,
+                "maxEntries": self.max_entries,
+                "ttl": self.ttl,
+                "path": self.db_path
+            }
+
+    def _evict(self, now: float):
+        """Drop expired rows, then least recently used rows over the size cap"""
+        self._conn.execute(f"DELETE FROM {self.table} WHERE created_at < ?", (now - self.ttl,))
+        self._conn.execute(
+            f"DELETE FROM {self.table} WHERE rowid IN ("
+            f"  SELECT rowid FROM {self.table} ORDER BY last_accessed DESC LIMIT -1 OFFSET ?"
+            ")",
+            (self.max_entries,)
+        )
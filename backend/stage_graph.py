@@ -0,0 +1,89 @@
+# backend/stage_graph.py
+"""
+Stage Graph
+Runs a pipeline as named stages with dependencies: every stage starts as
+soon as the stages it needs have finished, so independent work overlaps,
+and each stage's timing is recorded.
+"""
+
+import time
+from concurrent.futures import FIRST_COMPLETED, Executor, wait
+from typing import Callable, Dict, List, Optional
+
+
+class Stage:
+    def __init__(self, name: str, fn: Callable, needs: List[str], report: bool):
+        self.name = name
+        self.fn = fn
+        self.needs = needs
+        self.report = report
+
+
+class StageGraph:
+    """
+    A small DAG of stages.
+
+    Each stage function receives a dict of the results of the stages it
+    needs. Stages with report=True are announced through on_stage when
+    they start (for job progress); helper stages run silently. The first
+    failing stage cancels everything not yet started and its exception is
+    re-raised from run().
+    """
+
+    def __init__(self, on_stage: Optional[Callable[[str], None]] = None):
+        self.on_stage = on_stage or (lambda name: None)
+        self.stages: Dict[str, Stage] = {}
+        self.results: Dict[str, object] = {}
+        # name -> {"start": offset from run(), "seconds": duration}
+        self.timings: Dict[str, Dict[str, float]] = {}
+
+    def add(self, name: str, fn: Callable[[Dict], object], needs: List[str] = None, report: bool = True):
+        needs = needs or []
+        for dependency in needs:
+            if dependency not in self.stages:
+                raise ValueError(f"Stage '{name}' needs unknown stage '{dependency}'")
+        self.stages[name] = Stage(name, fn, needs, report)
+        return self
+
+    def run(self, executor: Executor) -> Dict[str, object]:
+        """Run every stage on executor and return {stage: result}"""
+        started = time.time()
+        pending = dict(self.stages)
+        running = {}
+
+        def launch(stage: Stage):
+            def body():
+                stage_start = time.time()
+                if stage.report:
+                    self.on_stage(stage.name)
+                try:
+                    return stage.fn({name: self.results[name] for name in stage.needs})
+                finally:
+                    self.timings[stage.name] = {
+                        "start": round(stage_start - started, 3),
+                        "seconds": round(time.time() - stage_start, 3)
+                    }
+            running[executor.submit(body)] = stage.name
+
+        try:
+            while pending or running:
+                for name, stage in list(pending.items()):
+                    if all(dependency in self.results for dependency in stage.needs):
+                        del pending[name]
+                        launch(stage)
+
+                done, _ = wait(list(running), return_when=FIRST_COMPLETED)
+                for future in done:
+                    name = running.pop(future)
+                    # Raises the stage's own exception
+                    self.results[name] = future.result()
+        except BaseException:
+            for future in running:
+                future.cancel()
+            raise
+
+        self.timings["total"] = {"start": 0.0, "seconds": round(time.time() - started, 3)}
+        return self.results
+
+    def stage_seconds(self) -> Dict[str, float]:
+        return {name: timing["seconds"] for name, timing in self.timings.items()}
@@ -0,0 +1,55 @@
+import json
+import os
+import subprocess
+import sys
+
+from local_chain import DEPLOYER_PRIVATE_KEY, LocalChain, deploy_contracts
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Imports app as a WSGI server would (gunicorn's "app:app"), then reports
+# which background threads are running
+PROBE = """
+import json, time
+import app
+from oracle_service import OracleService
+deadline = time.time() + 15
+while time.time() < deadline and not (OracleService.feed and OracleService.feed.snapshot):
+    time.sleep(0.1)
+print(json.dumps({
+    "indexer": app.marketplace_index.stats()["running"],
+    "feed": OracleService.feed.stats()["running"] if OracleService.feed else False,
+    "snapshot": bool(OracleService.feed and OracleService.feed.snapshot)
+}))
+"""
+
+
+def test_wsgi_import_starts_background_services(tmp_path):
+    chain = LocalChain().start()
+    try:
+        deployed = deploy_contracts(chain.url, listings=1)
+        deployed.pop("listedTokenIds")
+        env = {
+            **os.environ,
+            **deployed,
+            "QIE_RPC_URL": chain.url,
+            "SERVER_WALLET_PRIVATE_KEY": DEPLOYER_PRIVATE_KEY,
+            "MARKETPLACE_INDEXER_ENABLED": "true",
+            "ORACLE_FEED_ENABLED": "true",
+            "ANALYSIS_CACHE_PATH": str(tmp_path / "analysis_cache.db"),
+            "PIN_INDEX_PATH": str(tmp_path / "pin_index.db"),
+            "MARKETPLACE_INDEX_PATH": str(tmp_path / "marketplace_index.db"),
+            "RECEIPT_TRACKER_PATH": str(tmp_path / "receipts.db"),
+            "PRICE_HISTORY_DIR": str(tmp_path / "price_history"),
+        }
+        env.pop("WERKZEUG_RUN_MAIN", None)
+        result = subprocess.run(
+            [sys.executable, "-c", PROBE], cwd=BACKEND_DIR, env=env,
+            capture_output=True, text=True, timeout=120
+        )
+    finally:
+        chain.stop()
+
+    assert result.returncode == 0, result.stderr
+    state = json.loads(result.stdout.strip().splitlines()[-1])
+    assert state == {"indexer": True, "feed": True, "snapshot": True}
@@ -0,0 +1,185 @@
+import hashlib
+import itertools
+import time
+from concurrent.futures import Future
+from types import SimpleNamespace
+from unittest.mock import MagicMock
+
+import pytest
+
+from mint_queue import MintCancelledError, MintQueue, MintTicket
+from receipt_tracker import TrackedTransaction
+
+SERVER = "0x" + "11" * 20
+RECIPIENT = "0x" + "22" * 20
+
+
+class FakeTracker:
+    """Records tracked hashes; tests resolve receipts by hand"""
+
+    def __init__(self):
+        self.tracked = {}
+
+    def track(self, tx_hash, label="", confirmations=None, key=None):
+        key = key or tx_hash
+        tracked = self.tracked.get(key)
+        if tracked is None:
+            tracked = self.tracked[key] = TrackedTransaction(key, [tx_hash], label, 1, time.time())
+        elif tx_hash not in tracked.hashes:
+            tracked.hashes.append(tx_hash)
+        return tracked
+
+    def add_hash(self, key, tx_hash):
+        return self.track(tx_hash, key=key)
+
+
+class FakeChain:
+    """Mocked w3 that accepts every raw transaction and remembers it"""
+
+    def __init__(self, nonce=7):
+        self.nonce = nonce
+        self.sent = []
+        self.fail_next = []
+        self._hashes = itertools.count()
+        self.w3 = MagicMock()
+        self.w3.eth.chain_id = 1
+        self.w3.eth.get_transaction_count.side_effect = lambda address, block: self.nonce
+        self.w3.eth.account.sign_transaction.side_effect = lambda tx, private_key: SimpleNamespace(raw_transaction=tx)
+        self.w3.eth.send_raw_transaction.side_effect = self._send
+
+    def _send(self, tx):
+        # fail_next holds one entry per upcoming send: an error or None
+        error = self.fail_next.pop(0) if self.fail_next else None
+        if error:
+            raise error
+        self.sent.append(tx)
+        return hashlib.sha256(str(next(self._hashes)).encode()).digest()
+
+
+def make_queue(chain, tracker, **options):
+    contract = MagicMock()
+    contract.functions.safeMint.return_value.build_transaction.side_effect = lambda params: dict(params)
+    gas = MagicMock()
+    gas.fees.return_value = {"gasPrice": 100}
+    gas.bump.side_effect = lambda fees, factor: {key: int(value * factor) + 1 for key, value in fees.items()}
+    gas.tx_params.side_effect = lambda fn, sender, default, fees=None, **extra: {"from": sender, "gas": default, **fees, **extra}
+    options.setdefault("poll_interval", 3600)
+    return MintQueue(chain.w3, contract, SimpleNamespace(address=SERVER), "0x01", tracker, gas, **options)
+
+
+def mine(tracker, ticket, tx_hash=None, status=1):
+    receipt = SimpleNamespace(status=status, transactionHash=bytes.fromhex((tx_hash or ticket.hashes[-1])[2:]), blockNumber=1)
+    ticket.tracked.receipt.set_result(receipt)
+    return receipt
+
+
+def test_reverted_mint_is_failed():
+    chain, tracker = FakeChain(), FakeTracker()
+    mints = make_queue(chain, tracker)
+    ticket = mints.submit(RECIPIENT, "Qm1")
+    ticket.tx_hash.result(timeout=5)
+
+    mine(tracker, ticket, status=0)
+
+    assert ticket.status == "failed"
+    assert mints.stats()["failed"] == 1
+
+
+def test_exhausted_replacements_cancel_and_queue_recovers():
+    chain, tracker = FakeChain(), FakeTracker()
+    mints = make_queue(chain, tracker, stuck_after=0, max_replacements=1)
+    stuck = mints.submit(RECIPIENT, "Qm1")
+    stuck.tx_hash.result(timeout=5)
+
+    mints._replace_stuck()
+    assert len(stuck.hashes) == 2
+    mints._replace_stuck()
+    cancel = chain.sent[-1]
+    assert stuck.cancel_hash and cancel["to"] == SERVER and cancel["value"] == 0 and cancel["nonce"] == 7
+    assert stuck.cancel_hash in stuck.tracked.hashes
+
+    mine(tracker, stuck, stuck.cancel_hash)
+    with pytest.raises(MintCancelledError):
+        stuck.receipt.result(timeout=1)
+    assert stuck.status == "failed"
+    assert mints.stats()["pending"] == 0
+
+    after = mints.submit(RECIPIENT, "Qm2")
+    after.tx_hash.result(timeout=5)
+    assert after.nonce == 8
+    mine(tracker, after)
+    assert after.status == "confirmed"
+
+
+def test_unsendable_cancel_fails_ticket_and_frees_nonce():
+    chain, tracker = FakeChain(), FakeTracker()
+    mints = make_queue(chain, tracker, stuck_after=0, max_replacements=0)
+    stuck = mints.submit(RECIPIENT, "Qm1")
+    stuck.tx_hash.result(timeout=5)
+
+    chain.fail_next.append(ValueError("insufficient funds"))
+    mints._replace_stuck()
+
+    assert stuck.status == "failed"
+    assert mints.stats()["pending"] == 0
+    assert mints.stats()["freeNonces"] == [7]
+
+    # A late receipt for the abandoned nonce is ignored
+    late = Future()
+    late.set_result(SimpleNamespace(status=1, transactionHash=b"\x00" * 32, blockNumber=1))
+    mints._on_receipt(stuck, late)
+    assert mints.stats()["failed"] == 1
+
+    after = mints.submit(RECIPIENT, "Qm2")
+    after.tx_hash.result(timeout=5)
+    assert after.nonce == 7
+
+
+def test_batch_error_only_fails_unsent_tickets():
+    chain, tracker = FakeChain(), FakeTracker()
+    mints = make_queue(chain, tracker)
+    sent, unsent = MintTicket(RECIPIENT, "Qm1"), MintTicket(RECIPIENT, "Qm2")
+    mints._queue.put(sent)
+    mints._queue.put(unsent)
+
+    # The second broadcast hits a nonce conflict and the resync RPC fails too
+    chain.fail_next = [None, ValueError("nonce too low")]
+    chain.w3.eth.get_transaction_count.side_effect = [7, ConnectionError("rpc down")]
+    mints._ensure_started()
+
+    with pytest.raises(ConnectionError):
+        unsent.tx_hash.result(timeout=5)
+    assert sent.tx_hash.result(timeout=5)
+    assert not sent.receipt.done()
+    assert mints.stats()["pending"] == 1
+
+    mine(tracker, sent)
+    assert sent.status == "confirmed"
+    assert mints.stats()["pending"] == 0
+
+
+def test_given_up_middle_nonce_is_refilled():
+    chain, tracker = FakeChain(), FakeTracker()
+    mints = make_queue(chain, tracker, stuck_after=3600, max_replacements=0)
+    first, middle, last = (mints.submit(RECIPIENT, f"Qm{i}") for i in range(3))
+    for ticket in (first, middle, last):
+        ticket.tx_hash.result(timeout=5)
+    assert [first.nonce, middle.nonce, last.nonce] == [7, 8, 9]
+    mine(tracker, first)
+
+    # Only the middle mint is stuck, and its cancellation can't be sent
+    middle.sent_at = 0
+    chain.fail_next.append(ValueError("insufficient funds"))
+    mints._replace_stuck()
+    assert middle.status == "failed"
+
+    # The next mint fills the gap at 8, so 9 and everything after can be mined
+    refill, after = mints.submit(RECIPIENT, "Qm3"), mints.submit(RECIPIENT, "Qm4")
+    refill.tx_hash.result(timeout=5)
+    after.tx_hash.result(timeout=5)
+    assert (refill.nonce, after.nonce) == (8, 10)
+    assert refill.tracked is not middle.tracked
+    for ticket in (refill, last, after):
+        mine(tracker, ticket)
+        assert ticket.status == "confirmed"
+    assert mints.stats()["freeNonces"] == [] and mints.stats()["pending"] == 0
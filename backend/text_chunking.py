@@ -0,0 +1,74 @@
+# backend/text_chunking.py
+"""
+Token-Budget Text Chunking
+Splits extracted document text into pieces that fit the model's context
+"""
+
+from collections import Counter
+from typing import List
+
+# Llama tokenizers average roughly 4 characters per token on English text
+CHARS_PER_TOKEN = 4
+
+
+def estimate_tokens(text: str) -> int:
+    return (len(text) + CHARS_PER_TOKEN - 1) // CHARS_PER_TOKEN
+
+
+def strip_boilerplate(text: str, min_repeats: int = 3, max_line_chars: int = 120) -> str:
+    """
+    Drop short lines that repeat across the document (page headers,
+    footers, disclaimers) - they cost tokens on every page but carry no
+    extra information. The first occurrence is kept.
+    """
+    lines = text.split("\n")
+    counts = Counter(line.strip() for line in lines if line.strip())
+    repeated = {
+        line for line, count in counts.items()
+        if count >= min_repeats and len(line) <= max_line_chars
+    }
+    if not repeated:
+        return text
+
+    seen = set()
+    kept = []
+    for line in lines:
+        key = line.strip()
+        if key in repeated:
+            if key in seen:
+                continue
+            seen.add(key)
+        kept.append(line)
+    return "\n".join(kept)
+
+
+def split_text(text: str, max_tokens: int) -> List[str]:
+    """
+    Split text into chunks of at most max_tokens (estimated), breaking on
+    line boundaries where possible and hard-splitting overlong lines.
+    """
+    max_chars = max_tokens * CHARS_PER_TOKEN
+    if len(text) <= max_chars:
+        return [text]
+
+    chunks = []
+    current = []
+    current_len = 0
+    for line in text.split("\n"):
+        while len(line) > max_chars:
+            if current:
+                chunks.append("\n".join(current))
+                current, current_len = [], 0
+            chunks.append(line[:max_chars])
+            line = line[max_chars:]
+
+        # +1 for the newline that joins it to the previous line
+        if current and current_len + len(line) + 1 > max_chars:
+            chunks.append("\n".join(current))
+            current, current_len = [], 0
+        current.append(line)
+        current_len += len(line) + 1
+
+    if current:
+        chunks.append("\n".join(current))
+    return [chunk for chunk in chunks if chunk.strip()]
@@ -0,0 +1,405 @@
+# backend/web3_provider.py
+"""
+Shared Web3 Providers
+One registry for every service that talks to the QIE RPC: pooled keep-alive
+sessions per RPC URL, cached contract objects, and failover across several
+RPC endpoints with a circuit breaker per endpoint
+"""
+
+import os
+import threading
+import time
+from typing import Any, Dict, List, Optional, Tuple
+
+import requests
+from eth_utils.abi import get_abi_output_types
+from requests.adapters import HTTPAdapter
+from web3 import Web3
+from web3.exceptions import ContractLogicError
+from web3.providers.base import JSONBaseProvider
+
+# Comma-separated list, tried in order; QIE_RPC_URL is still honoured
+RPC_URLS_ENV = "QIE_RPC_URLS"
+RPC_URL_ENV = "QIE_RPC_URL"
+# Keep-alive connections kept open per RPC host
+POOL_SIZE = int(os.getenv("RPC_POOL_SIZE", "20"))
+REQUEST_TIMEOUT = float(os.getenv("RPC_REQUEST_TIMEOUT", "10"))
+# An endpoint that fails is skipped for this long, doubling per failure
+FAILURE_COOLDOWN = float(os.getenv("RPC_FAILURE_COOLDOWN", "5"))
+MAX_FAILURE_COOLDOWN = float(os.getenv("RPC_MAX_FAILURE_COOLDOWN", "120"))
+# Background liveness probe (eth_blockNumber) per endpoint; 0 disables it
+HEALTH_CHECK_INTERVAL = float(os.getenv("RPC_HEALTH_CHECK_INTERVAL", "15"))
+HEALTH_CHECK_TIMEOUT = float(os.getenv("RPC_HEALTH_CHECK_TIMEOUT", "3"))
+# Calls per JSON-RPC batch; most public nodes cap batches at 100-1000
+BATCH_SIZE = int(os.getenv("RPC_BATCH_SIZE", "100"))
+
+
+def configured_rpc_urls(default_url: str = None) -> List[str]:
+    """RPC URLs from QIE_RPC_URLS, else QIE_RPC_URL, else default_url"""
+    urls = [url.strip() for url in os.getenv(RPC_URLS_ENV, "").split(",") if url.strip()]
+    if not urls and os.getenv(RPC_URL_ENV):
+        urls = [os.getenv(RPC_URL_ENV)]
+    if not urls and default_url:
+        urls = [default_url]
+    return urls
+
+
+class RPCUnavailableError(ConnectionError):
+    """Every RPC endpoint's circuit is open; raised without touching the network"""
+
+
+class RPCEndpointState:
+    """
+    One RPC URL plus its recent health, as a circuit breaker: closed while
+    calls succeed, open for a cooldown after a failure (doubling each
+    time), then half-open, letting a single trial call through.
+    """
+
+    CLOSED = "closed"
+    OPEN = "open"
+    HALF_OPEN = "half-open"
+
+    def __init__(self, url: str, session: requests.Session, timeout: float):
+        self.url = url
+        self.provider = Web3.HTTPProvider(url, request_kwargs={"timeout": timeout}, session=session)
+        self.probe_provider = Web3.HTTPProvider(
+            url, request_kwargs={"timeout": HEALTH_CHECK_TIMEOUT}, session=session
+        )
+        self.consecutive_failures = 0
+        self.cooldown_until = 0.0
+        self.trial_in_flight = False
+        self.latency = None
+        self.calls = 0
+        self.failures = 0
+        self.rejected = 0
+        self.last_error: Optional[str] = None
+        self.last_checked_at: Optional[float] = None
+
+    def state(self, now: float) -> str:
+        if self.consecutive_failures == 0:
+            return self.CLOSED
+        return self.OPEN if now < self.cooldown_until else self.HALF_OPEN
+
+    def healthy(self, now: float) -> bool:
+        return self.state(now) == self.CLOSED
+
+    def allow(self, now: float) -> bool:
+        """Whether a request may use this endpoint now; claims the half-open trial"""
+        state = self.state(now)
+        if state == self.CLOSED:
+            return True
+        if state == self.HALF_OPEN and not self.trial_in_flight:
+            self.trial_in_flight = True
+            return True
+        return False
+
+    def record_success(self, elapsed: float):
+        self.calls += 1
+        self.consecutive_failures = 0
+        self.cooldown_until = 0.0
+        self.trial_in_flight = False
+        # Exponentially weighted so one slow call doesn't dominate
+        self.latency = elapsed if self.latency is None else 0.8 * self.latency + 0.2 * elapsed
+
+    def record_failure(self, error: Exception, now: float):
+        self.calls += 1
+        self.failures += 1
+        self.consecutive_failures += 1
+        self.trial_in_flight = False
+        self.last_error = str(error)
+        cooldown = min(MAX_FAILURE_COOLDOWN, FAILURE_COOLDOWN * (2 ** (self.consecutive_failures - 1)))
+        self.cooldown_until = now + cooldown
+
+    def to_dict(self, now: float) -> Dict:
+        return {
+            "url": self.url,
+            "healthy": self.healthy(now),
+            "state": self.state(now),
+            "coolingDownFor": max(0.0, round(self.cooldown_until - now, 2)),
+            "latencyMs": round(self.latency * 1000, 1) if self.latency is not None else None,
+            "calls": self.calls,
+            "failures": self.failures,
+            "rejected": self.rejected,
+            "lastError": self.last_error,
+            "lastCheckedAgo": round(now - self.last_checked_at, 2) if self.last_checked_at else None
+        }
+
+
+class FailoverHTTPProvider(JSONBaseProvider):
+    """
+    Sends each request to the first endpoint in configured order whose
+    circuit allows it, moving on to the next one on connection errors,
+    timeouts and HTTP errors. JSON-RPC error responses are returned as-is,
+    not retried. With every circuit open, requests fail immediately with
+    RPCUnavailableError instead of waiting on a dead node.
+    """
+
+    def __init__(self, endpoints: List[RPCEndpointState]):
+        super().__init__()
+        if not endpoints:
+            raise ValueError("FailoverHTTPProvider needs at least one RPC endpoint")
+        self.endpoints = endpoints
+        self._lock = threading.Lock()
+        self._chain_id_response = None
+
+    def make_request(self, method, params) -> Any:
+        # web3's validation middleware asks for the chain id before every
+        # eth_call; all endpoints serve one chain, so ask once
+        if method == "eth_chainId" and self._chain_id_response is not None:
+            return self._chain_id_response
+        response = self._with_failover(lambda provider: provider.make_request(method, params))
+        if method == "eth_chainId" and "result" in response:
+            self._chain_id_response = response
+        return response
+
+    def make_batch_request(self, batch_requests) -> Any:
+        return self._with_failover(lambda provider: provider.make_batch_request(batch_requests))
+
+    def available(self) -> bool:
+        """Whether some endpoint's circuit is not open (no network call)"""
+        now = time.time()
+        with self._lock:
+            return any(endpoint.state(now) != RPCEndpointState.OPEN for endpoint in self.endpoints)
+
+    def check_health(self):
+        """Probe every endpoint with eth_blockNumber and update its circuit"""
+        for endpoint in self.endpoints:
+            started = time.time()
+            try:
+                response = endpoint.probe_provider.make_request("eth_blockNumber", [])
+                if "error" in response:
+                    raise ConnectionError(f"eth_blockNumber failed: {response['error']}")
+            except OSError as e:
+                with self._lock:
+                    endpoint.last_checked_at = time.time()
+                    was_open = endpoint.consecutive_failures > 0
+                    endpoint.record_failure(e, endpoint.last_checked_at)
+                if not was_open:
+                    print(f"⚠️ RPC {endpoint.url} failed health check: {e}")
+                continue
+
+            with self._lock:
+                endpoint.last_checked_at = time.time()
+                recovered = endpoint.consecutive_failures > 0
+                endpoint.record_success(endpoint.last_checked_at - started)
+            if recovered:
+                print(f"✅ RPC {endpoint.url} is back")
+
+    def stats(self) -> List[Dict]:
+        now = time.time()
+        with self._lock:
+            return [endpoint.to_dict(now) for endpoint in self.endpoints]
+
+    def _acquire(self, tried: set) -> Optional[RPCEndpointState]:
+        """Next untried endpoint, in configured order, whose circuit allows a call"""
+        now = time.time()
+        with self._lock:
+            for endpoint in self.endpoints:
+                if endpoint not in tried and endpoint.allow(now):
+                    return endpoint
+                if endpoint not in tried:
+                    endpoint.rejected += 1
+        return None
+
+    def _with_failover(self, send):
+        last_error = None
+        tried = set()
+        while True:
+            endpoint = self._acquire(tried)
+            if endpoint is None:
+                break
+            tried.add(endpoint)
+
+            started = time.time()
+            try:
+                response = send(endpoint.provider)
+            except OSError as e:
+                # requests exceptions (connection, timeout, HTTP status) are OSErrors
+                with self._lock:
+                    endpoint.record_failure(e, time.time())
+                if len(self.endpoints) > 1:
+                    print(f"⚠️ RPC {endpoint.url} failed, trying next endpoint: {e}")
+                last_error = e
+                continue
+            except Exception:
+                # Not a transport failure; just give back a half-open trial
+                with self._lock:
+                    endpoint.trial_in_flight = False
+                raise
+
+            with self._lock:
+                endpoint.record_success(time.time() - started)
+            return response
+
+        if last_error is None:
+            raise RPCUnavailableError("All RPC endpoints are unavailable (circuit open)")
+        raise last_error
+
+
+class Web3Registry:
+    """Hands out shared Web3 instances, HTTP sessions and contract objects"""
+
+    _lock = threading.Lock()
+    _sessions: Dict[str, requests.Session] = {}
+    _web3s: Dict[Tuple[str, ...], Web3] = {}
+    _contracts: Dict[Tuple, Tuple[list, Any]] = {}
+    _health_thread: Optional[threading.Thread] = None
+    _health_stop = threading.Event()
+
+    @classmethod
+    def get_session(cls, url: str) -> requests.Session:
+        """Keep-alive session for an RPC URL, shared by every thread"""
+        with cls._lock:
+            session = cls._sessions.get(url)
+            if session is None:
+                session = requests.Session()
+                adapter = HTTPAdapter(pool_connections=1, pool_maxsize=POOL_SIZE)
+                session.mount("http://", adapter)
+                session.mount("https://", adapter)
+                cls._sessions[url] = session
+            return session
+
+    @classmethod
+    def get_web3(cls, default_url: str = None) -> Web3:
+        """
+        Shared Web3 instance for the configured RPC endpoints.
+
+        Args:
+            default_url: Used when neither QIE_RPC_URLS nor QIE_RPC_URL is set
+
+        Returns:
+            A Web3 backed by a FailoverHTTPProvider
+        """
+        urls = tuple(configured_rpc_urls(default_url))
+        if not urls:
+            raise ValueError("No RPC URL configured (set QIE_RPC_URLS or QIE_RPC_URL)")
+
+        with cls._lock:
+            w3 = cls._web3s.get(urls)
+        if w3 is not None:
+            return w3
+
+        endpoints = [RPCEndpointState(url, cls.get_session(url), REQUEST_TIMEOUT) for url in urls]
+        w3 = Web3(FailoverHTTPProvider(endpoints))
+        with cls._lock:
+            # Another thread may have built it meanwhile; keep the first one
+            return cls._web3s.setdefault(urls, w3)
+
+    @classmethod
+    def get_contract(cls, address: str, abi: list, w3: Web3 = None, default_url: str = None):
+        """
+        Cached contract object per Web3 instance, address and ABI.
+
+        ABIs are keyed by identity since they are module-level constants;
+        the cache holds a reference so the id can't be reused.
+        """
+        w3 = w3 or cls.get_web3(default_url)
+        address = Web3.to_checksum_address(address)
+        key = (id(w3), address, id(abi))
+
+        with cls._lock:
+            cached = cls._contracts.get(key)
+        if cached is not None:
+            return cached[1]
+
+        contract = w3.eth.contract(address=address, abi=abi)
+        with cls._lock:
+            return cls._contracts.setdefault(key, (abi, contract))[1]
+
+    @classmethod
+    def start_health_checks(cls, interval: float = HEALTH_CHECK_INTERVAL):
+        """Probe every registered endpoint on a timer so requests don't have to"""
+        if interval <= 0 or (cls._health_thread and cls._health_thread.is_alive()):
+            return
+        cls._health_stop.clear()
+        cls._health_thread = threading.Thread(
+            target=cls._run_health_checks, args=(interval,), name="rpc-health", daemon=True
+        )
+        cls._health_thread.start()
+        print(f"🩺 RPC health checks every {interval}s")
+
+    @classmethod
+    def stop_health_checks(cls):
+        cls._health_stop.set()
+
+    @classmethod
+    def check_health(cls):
+        with cls._lock:
+            providers = [w3.provider for w3 in cls._web3s.values()]
+        for provider in providers:
+            provider.check_health()
+
+    @classmethod
+    def _run_health_checks(cls, interval: float):
+        while not cls._health_stop.wait(interval):
+            try:
+                cls.check_health()
+            except Exception as e:
+                print(f"⚠️ RPC health check failed: {e}")
+
+    @classmethod
+    def stats(cls) -> Dict:
+        with cls._lock:
+            web3s = list(cls._web3s.items())
+            contracts = len(cls._contracts)
+        return {
+            "providers": [
+                {"urls": list(urls), "available": w3.provider.available(), "endpoints": w3.provider.stats()}
+                for urls, w3 in web3s
+            ],
+            "cachedContracts": contracts,
+            "healthChecks": bool(cls._health_thread and cls._health_thread.is_alive())
+        }
+
+
+def batch_call(w3: Web3, calls: List, block_identifier="latest") -> List[Any]:
+    """
+    Run read-only contract calls as JSON-RPC batches, BATCH_SIZE per HTTP
+    request, all against the same block.
+
+    Args:
+        calls: ContractFunction objects, e.g. contract.functions.listings(1)
+
+    Returns:
+        The decoded output of each call in order (a bare value for
+        single-output functions, like ContractFunction.call()), or the
+        exception for calls that reverted
+    """
+    if not calls:
+        return []
+    if isinstance(block_identifier, int):
+        block_identifier = hex(block_identifier)
+
+    batch = [
+        ("eth_call", [{"to": fn.address, "data": fn._encode_transaction_data()}, block_identifier])
+        for fn in calls
+    ]
+    responses = []
+    for start in range(0, len(batch), BATCH_SIZE):
+        chunk = batch[start:start + BATCH_SIZE]
+        response = w3.provider.make_batch_request(chunk)
+        if not isinstance(response, list):
+            # Node refused the batch as a whole; fall back to one call each
+            response = [w3.provider.make_request(method, params) for method, params in chunk]
+        responses.extend(response)
+
+    return [_decode_call(w3, fn, response) for fn, response in zip(calls, responses)]
+
+
+def _decode_call(w3: Web3, fn, response: Dict) -> Any:
+    if "error" in response:
+        error = response["error"]
+        message = error.get("message", str(error)) if isinstance(error, dict) else str(error)
+        return ContractLogicError(message, data=error.get("data") if isinstance(error, dict) else None)
+
+    output_types = get_abi_output_types(fn.abi)
+    try:
+        values = w3.codec.decode(output_types, Web3.to_bytes(hexstr=response["result"]))
+    except Exception as e:
+        return e
+
+    values = [
+        Web3.to_checksum_address(value) if abi_type == "address" else value
+        for abi_type, value in zip(output_types, values)
+    ]
+    return values[0] if len(values) == 1 else values
@@ -20,7 +20,7 @@ import {
 import { FaWallet, FaCopy, FaSignOutAlt } from 'react-icons/fa';
 import { ChevronDownIcon } from '@chakra-ui/icons';
 import { Activity, TrendingUp } from 'lucide-react';
-import { BACKEND_URL } from '../constants';
+import { subscribePrices } from '../utils/priceStream';
 
 const Header = ({ address, loading, onConnect, onDisconnect }) => {
   const { onCopy, hasCopied } = useClipboard(address || '');
@@ -28,28 +28,19 @@ const Header = ({ address, loading, onConnect, onDisconnect }) => {
   const [oraclePrice, setOraclePrice] = useState(null);
   const [oracleStatus, setOracleStatus] = useState('checking');
 
-  // Fetch ARIA price from oracle
-  const fetchOraclePrice = async () => {
-    try {
-      const response = await fetch(`${BACKEND_URL}/oracle/price/ARIA/USD`);
-      if (response.ok) {
-        const data = await response.json();
-        setOraclePrice(data.price);
-        setOracleStatus('active');
-      } else {
-        setOracleStatus('inactive');
-      }
-    } catch (err) {
-      setOracleStatus('inactive');
-      console.error('Oracle fetch error:', err);
-    }
-  };
-
+  // Live ARIA price pushed from the backend price stream
   useEffect(() => {
-    fetchOraclePrice();
-    // Refresh every 30 seconds
-    const interval = setInterval(fetchOraclePrice, 30000);
-    return () => clearInterval(interval);
+    return subscribePrices(
+      { pairs: ['ARIA/USD'] },
+      (update) => {
+        const price = update.pairs['ARIA/USD'];
+        if (price) {
+          setOraclePrice(price.price);
+          setOracleStatus('active');
+        }
+      },
+      () => setOracleStatus('inactive')
+    );
   }, []);
 
   const handleCopy = () => {
@@ -3,7 +3,7 @@ import {
   Box, HStack, VStack, Text, Badge, Spinner, Icon, Tooltip 
 } from '@chakra-ui/react';
 import { TrendingUp, TrendingDown, Activity, RefreshCw } from 'lucide-react';
-import { BACKEND_URL } from '../constants';
+import { subscribePrices } from '../utils/priceStream';
 
 /**
  * LivePriceDisplay Component
@@ -15,40 +15,35 @@ const LivePriceDisplay = ({ tokenId, staticPrice, showMultiCurrency = true }) =>
   const [lastUpdate, setLastUpdate] = useState(null);
   const [trend, setTrend] = useState('stable'); // 'up', 'down', 'stable'
 
-  // Fetch live price from backend
-  const fetchLivePrice = async () => {
-    try {
-      const response = await fetch(`${BACKEND_URL}/oracle/nft-price/${tokenId}`);
-      if (!response.ok) throw new Error('Failed to fetch price');
-      
-      const data = await response.json();
-      
-      // Determine trend
-      if (data.currentPrice > staticPrice) {
-        setTrend('up');
-      } else if (data.currentPrice < staticPrice) {
-        setTrend('down');
-      } else {
-        setTrend('stable');
-      }
-      
-      setPriceData(data);
-      setLastUpdate(new Date());
-      setLoading(false);
-    } catch (err) {
-      console.error('Failed to fetch live price:', err);
-      setLoading(false);
-    }
-  };
-
+  // Live price pushed from the backend price stream
   useEffect(() => {
-    fetchLivePrice();
-    
-    // Refresh every 30 seconds
-    const interval = setInterval(fetchLivePrice, 30000);
-    
-    return () => clearInterval(interval);
-  }, [tokenId]);
+    return subscribePrices(
+      { tokens: [tokenId] },
+      (update) => {
+        const data = update.tokens[String(tokenId)];
+        if (!data) return;
+        if (data.error) {
+          console.error('Failed to fetch live price:', data.error);
+          setLoading(false);
+          return;
+        }
+
+        // Determine trend
+        if (data.currentPrice > staticPrice) {
+          setTrend('up');
+        } else if (data.currentPrice < staticPrice) {
+          setTrend('down');
+        } else {
+          setTrend('stable');
+        }
+
+        setPriceData(data);
+        setLastUpdate(new Date());
+        setLoading(false);
+      },
+      () => setLoading(false)
+    );
+  }, [tokenId, staticPrice]);
 
   if (loading) {
     return (
@@ -0,0 +1,77 @@
+// src/utils/priceStream.js
+
+import { BACKEND_URL } from '../constants';
+
+// One EventSource per page, carrying the union of every component's topics,
+// so price widgets don't each poll the backend (or hold their own connection)
+const listeners = new Set();
+let sources = [];
+let currentQuery = '';
+let reconnectTimer = null;
+
+// Matches the backend's PRICE_STREAM_MAX_TOKENS; larger unions are split
+// over extra streams rather than rejected
+const MAX_TOKENS_PER_STREAM = 5000;
+
+function buildQueries() {
+  const pairs = new Set();
+  const tokens = new Set();
+  listeners.forEach(({ topics }) => {
+    (topics.pairs || []).forEach((pair) => pairs.add(pair));
+    (topics.tokens || []).forEach((token) => tokens.add(String(token)));
+  });
+  if (!pairs.size && !tokens.size) return [];
+
+  const sortedPairs = [...pairs].sort().join(',');
+  const sortedTokens = [...tokens].sort();
+  const queries = [];
+  for (let i = 0; i === 0 || i < sortedTokens.length; i += MAX_TOKENS_PER_STREAM) {
+    // Pairs only ride on the first stream
+    const chunk = sortedTokens.slice(i, i + MAX_TOKENS_PER_STREAM).join(',');
+    queries.push(`pairs=${i === 0 ? sortedPairs : ''}&tokens=${chunk}`);
+  }
+  return queries;
+}
+
+function openStream(query) {
+  const source = new EventSource(`${BACKEND_URL}/oracle/stream?${query}`);
+  source.addEventListener('prices', (event) => {
+    const update = JSON.parse(event.data);
+    listeners.forEach((listener) => listener.onUpdate(update));
+  });
+  source.onerror = () => {
+    listeners.forEach((listener) => listener.onError && listener.onError());
+  };
+  return source;
+}
+
+function reconnect() {
+  // Debounced so a page mounting many widgets opens a single stream
+  clearTimeout(reconnectTimer);
+  reconnectTimer = setTimeout(() => {
+    const queries = buildQueries();
+    const query = queries.join('|');
+    if (query === currentQuery && sources.length) return;
+    sources.forEach((source) => source.close());
+    currentQuery = query;
+    sources = queries.map(openStream);
+  }, 50);
+}
+
+/**
+ * Subscribe to live price pushes from the backend
+ *
+ * @param {Object} topics - { pairs: ['ARIA/USD'], tokens: [1, 2] }
+ * @param {Function} onUpdate - Called with { pairs: {pair: price}, tokens: {tokenId: livePrice} }
+ * @param {Function} onError - Called when the stream drops (the browser reconnects on its own)
+ * @returns {Function} Unsubscribe
+ */
+export function subscribePrices(topics, onUpdate, onError) {
+  const listener = { topics, onUpdate, onError };
+  listeners.add(listener);
+  reconnect();
+  return () => {
+    listeners.delete(listener);
+    reconnect();
+  };
+}